@@ -0,0 +1,161 @@
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from viz_code import RenderState, create_graph_description
+
+
+def get_render_cost(module: dict):
+    """Estimate the render cost of a module from the lines of its definitions, without
+    touching their calls, which a lazy crawl would then parse."""
+    func_defs = list(module["func_defs"])
+    for class_data in module["class_list"]:
+        func_defs.extend(class_data.methods)
+    lines = sum(f.end_lineno - f.start_lineno + 1 for f in func_defs)
+    return lines + len(module["call_list"] or [])
+
+
+def split_render_work(module_info: dict, module_names: list, chunk_count: int):
+    """Split the modules into chunks of about the same render cost, giving each module
+    to the cheapest chunk so far, most expensive modules first.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+        module_names (list): names of the modules to render
+        chunk_count (int): number of chunks
+
+    Returns:
+        list: lists of module names
+    """
+    costs = {name: get_render_cost(module_info[name]) for name in module_names}
+    chunks = [[] for _ in range(min(chunk_count, len(module_names)))]
+    heap = [(0, i) for i in range(len(chunks))]
+    for name in sorted(module_names, key=lambda n: -costs[n]):
+        cost, i = heapq.heappop(heap)
+        chunks[i].append(name)
+        heapq.heappush(heap, (cost + costs[name], i))
+    return chunks
+
+
+def render_modules(module_items: list, render_options: dict):
+    """Render the graphs of several modules with one shared `RenderState`.
+
+    Args:
+        module_items (list): (module name, module) pairs
+        render_options (dict): passed on to `create_graph_description`
+
+    Returns:
+        list: (module name, graph description) pairs
+    """
+    render_state = RenderState()
+    return [
+        (
+            module_name,
+            create_graph_description(
+                module, render_state=render_state, **render_options
+            ),
+        )
+        for module_name, module in module_items
+    ]
+
+
+def render_module_graphs(
+    module_info: dict,
+    module_names: list = None,
+    processes: int = None,
+    **render_options,
+):
+    """Render the graph of every module of a crawl in one pass. Sanitized node ids and
+    the low-level filter are shared by all renders of a worker process, and modules are
+    spread over the processes by their size, so the total time follows the number of
+    edges rather than the number of modules. Each graph is the same as from
+    `create_graph_description`.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+        module_names (list, optional): modules to render. Defaults to all.
+        processes (int, optional): number of worker processes, 1 renders in this
+        process. Defaults to one per CPU.
+        render_options: passed on to `create_graph_description`, e.g.
+        `collapse_multiple_call_edges`
+
+    Returns:
+        dict: module name to graph description, in `module_names` order
+    """
+    if module_names is None:
+        module_names = list(module_info)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes == 1 or len(module_names) < 2:
+        module_items = [(name, module_info[name]) for name in module_names]
+        descriptions = dict(render_modules(module_items, render_options))
+    else:
+        chunks = split_render_work(module_info, module_names, processes)
+        descriptions = {}
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [
+                executor.submit(
+                    render_modules,
+                    [(name, module_info[name]) for name in chunk],
+                    render_options,
+                )
+                for chunk in chunks
+            ]
+            for future in futures:
+                descriptions.update(future.result())
+    return {name: descriptions[name] for name in module_names}
+
+
+def get_module_graph_filename(module_name: str):
+    return f"{module_name}.md"
+
+
+def format_module_graph(module_name: str, description: str):
+    return f"# {module_name}\n\n{description}\n"
+
+
+def format_combined_graphs(descriptions: dict):
+    return "\n".join(
+        f"## {module_name}\n\n{description}\n"
+        for module_name, description in descriptions.items()
+    )
+
+
+def write_module_graphs(
+    module_info: dict,
+    output_dir,
+    module_names: list = None,
+    combined_filename: str = None,
+    processes: int = None,
+    **render_options,
+):
+    """Render the graph of every module, see `render_module_graphs`, and write them to
+    one Markdown file per module, or to a single document with a section per module.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+        output_dir (str): directory to write the Markdown files to
+        module_names (list, optional): modules to render. Defaults to all.
+        combined_filename (str, optional): write all graphs to this one file instead of
+        `<module name>.md` files. Defaults to None.
+        processes (int, optional): number of worker processes. Defaults to one per CPU.
+        render_options: passed on to `create_graph_description`
+
+    Returns:
+        list: paths of the written files
+    """
+    descriptions = render_module_graphs(
+        module_info, module_names=module_names, processes=processes, **render_options
+    )
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if combined_filename is not None:
+        combined_file = output_dir / combined_filename
+        combined_file.write_text(format_combined_graphs(descriptions))
+        return [combined_file]
+    written = []
+    for module_name, description in descriptions.items():
+        module_file = output_dir / get_module_graph_filename(module_name)
+        module_file.write_text(format_module_graph(module_name, description))
+        written.append(module_file)
+    return written
@@ -1,17 +1,33 @@
 import os
+import hashlib
+import random
 from pathlib import Path
-from dep_parser import extract_node_structure_from_script
+from dep_parser import extract_node_structure_from_source
+from git_source import GitBlobReader, list_python_blobs
+from import_scanner import extract_imports_from_source
+from lazy_parser import extract_lazy_node_structure_from_source
+from notebook_parser import (
+    combine_cells,
+    extract_node_structure_from_notebook,
+    extract_notebook_cells,
+)
 
+HASH_CHUNK_SIZE = 1 << 20
+# file sizes in bytes separating the small, medium and large strata of a sample
+SAMPLE_SIZE_CLASS_BOUNDS = [4096, 32768]
 
-def get_python_filenames_from_dir(dir):
+
+def get_python_filenames_from_dir(dir, include_notebooks: bool = False):
     """Find all `.py` files in the current directory, ignoring Jupyter detritus.
 
     Args:
         dir (str): directory name
+        include_notebooks (bool, optional): also find `.ipynb` notebooks. Defaults to False.
 
     Returns:
         list: list of all Python script (relative) filenames
     """
+    suffixes = [".py", ".ipynb"] if include_notebooks else [".py"]
     python_filenames = []
     for root, dirs, files in os.walk(dir):
         root = Path(root)
@@ -19,25 +35,33 @@ def get_python_filenames_from_dir(dir):
             continue
         for file in files:
             file = Path(file)
-            if file.suffix == ".py":
+            if file.suffix in suffixes:
                 python_filenames.append(root / file)
     return python_filenames
 
 
-def get_all_filenames(directories: list = None, other_python_filenames=None):
+def get_all_filenames(
+    directories: list = None, other_python_filenames=None, include_notebooks=False
+):
     """For each directory in the directories list and each other separately specified
     file name, create a combined lists of Python script filenames.
 
     Args:
         directories (list): Python directory strings
         other_python_filenames (list, optional): list of separate Python filenames. Defaults to None.
+        include_notebooks (bool, optional): also find `.ipynb` notebooks in the directories.
+        Defaults to False.
 
     Returns:
         list: combined list of all Python filenames
     """
     if directories is None:
         directories = []
-    filenames = [f for d in directories for f in get_python_filenames_from_dir(d)]
+    filenames = [
+        f
+        for d in directories
+        for f in get_python_filenames_from_dir(d, include_notebooks=include_notebooks)
+    ]
     if other_python_filenames:
         if isinstance(other_python_filenames, str):
             filenames.append(Path(other_python_filenames))
@@ -46,8 +70,92 @@ def get_all_filenames(directories: list = None, other_python_filenames=None):
     return filenames
 
 
+def hash_source(source: bytes):
+    """Compute the content hash of a file's source. This is the same SHA-1 that git
+    uses for blobs, so hashes from a working tree and from git history agree.
+
+    Args:
+        source (bytes): raw file contents
+
+    Returns:
+        str: hex digest of the contents
+    """
+    header = f"blob {len(source)}\0".encode()
+    return hashlib.sha1(header + source).hexdigest()
+
+
+def hash_file(filename):
+    """Compute the `hash_source` hash of a file without reading it into memory at once.
+
+    Args:
+        filename (str): file name
+
+    Returns:
+        str: hex digest of the contents
+    """
+    file_hash = hashlib.sha1(f"blob {os.path.getsize(filename)}\0".encode())
+    with open(filename, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def get_size_class(filename):
+    size = os.path.getsize(filename)
+    return sum(size >= bound for bound in SAMPLE_SIZE_CLASS_BOUNDS)
+
+
+def get_stratified_sample(python_filenames: list, sample_fraction: float, seed=0):
+    """Draw a random sample of files stratified by directory and size class. A
+    directory whose files of a size class would get less than one sampled file shares
+    a stratum with the other such files of the size class. Every stratum gets at least
+    one sampled file.
+
+    Args:
+        python_filenames (list): Path of every discovered file
+        sample_fraction (float): fraction of the files to sample
+        seed (int, optional): random seed, the same seed gives the same sample.
+        Defaults to 0.
+
+    Returns:
+        dict: sampled Path to its sample data, with the stratum and the number of files
+        in the stratum
+    """
+    directory_strata = {}
+    for f in sorted(python_filenames):
+        stratum = (str(f.parent), get_size_class(f))
+        directory_strata.setdefault(stratum, []).append(f)
+    strata = {}
+    for (directory, size_class), filenames in directory_strata.items():
+        if len(filenames) * sample_fraction < 1:
+            directory = None
+        strata.setdefault((directory, size_class), []).extend(filenames)
+
+    rng = random.Random(seed)
+    sample = {}
+    for stratum, filenames in sorted(strata.items(), key=lambda s: str(s[0])):
+        sample_size = min(
+            len(filenames), max(1, round(len(filenames) * sample_fraction))
+        )
+        for f in rng.sample(filenames, sample_size):
+            sample[f] = {
+                "stratum": list(stratum),
+                "stratum_size": len(filenames),
+            }
+    return sample
+
+
 def extract_code_information(
-    directories: list = None, other_python_filenames=None, verbose=False
+    directories: list = None,
+    other_python_filenames=None,
+    verbose=False,
+    previous_module_info: dict = None,
+    include_notebooks: bool = False,
+    node_filter=None,
+    imports_only: bool = False,
+    lazy_calls: bool = False,
+    sample_fraction: float = None,
+    sample_seed: int = 0,
 ):
     """For each Python file in the directories provided as well as the other filename
     list, extract the node structure and create an overall module info dict.
@@ -56,28 +164,188 @@ def extract_code_information(
         directories (list): Python directory strings
         other_python_filenames (list, optional): list of separate Python filenames. Defaults to None.
         verbose (bool): print more information about process
+        previous_module_info (dict, optional): module info from an earlier crawl. Modules whose
+        content hash is unchanged are reused instead of parsed again. Defaults to None.
+        include_notebooks (bool, optional): also parse the code cells of `.ipynb` notebooks
+        in the directories. Defaults to False.
+        node_filter (NodeFilter, optional): calls and classes to leave out while parsing.
+        Defaults to None.
+        imports_only (bool, optional): only extract imports, with the much faster
+        `import_scanner`. Calls, definitions and classes are left empty. Defaults to
+        False.
+        lazy_calls (bool, optional): only parse the calls of a Python file's functions
+        and methods when their `calls` are first used, see `lazy_parser`. The module
+        information is the same, but crawls that look at few definitions are faster.
+        Defaults to False.
+        sample_fraction (float, optional): only crawl a random sample of this fraction
+        of the files, stratified by directory and size, see `get_stratified_sample`.
+        Each module then has a "sample" entry with its stratum, for estimates of the
+        whole crawl such as `sampled_stats.estimate_repo_statistics`. Defaults to None,
+        crawling all files.
+        sample_seed (int, optional): random seed of the sample. Defaults to 0.
 
     Returns:
         dict: module information
     """
-    python_filenames = get_all_filenames(directories, other_python_filenames)
+    extract_structure = extract_node_structure_from_source
+    if lazy_calls:
+        extract_structure = extract_lazy_node_structure_from_source
+    python_filenames = get_all_filenames(
+        directories, other_python_filenames, include_notebooks=include_notebooks
+    )
     if python_filenames is None:
         print("no code found")
         return {}
+    sample = None
+    if sample_fraction is not None:
+        sample = get_stratified_sample(python_filenames, sample_fraction, sample_seed)
+        python_filenames = list(sample)
+    if previous_module_info is None:
+        previous_module_info = {}
+    filter_key = None if node_filter is None else node_filter.key
     module_info = {}
     for f in python_filenames:
         module_name = f.stem
+        is_notebook = f.suffix == ".ipynb"
+        if is_notebook:
+            # notebooks can hold hundreds of MB of outputs we never need in memory
+            content_hash = hash_file(f)
+        else:
+            with open(f, "rb") as script_contents:
+                source = script_contents.read()
+            content_hash = hash_source(source)
+
+        previous = previous_module_info.get(module_name)
+        if (
+            previous is not None
+            and previous.get("content_hash") == content_hash
+            and previous.get("filter_key") == filter_key
+            and previous.get("imports_only", False) == imports_only
+        ):
+            if verbose:
+                print(f"Reusing unchanged {module_name}.")
+            if sample is not None:
+                previous = {**previous, "sample": sample[f]}
+            module_info[module_name] = previous
+            continue
 
-        (
-            import_list,
-            call_list,
-            func_defs,
-            class_list,
-        ) = extract_node_structure_from_script(f, verbose=verbose)
+        line_map = None
+        if imports_only:
+            if is_notebook:
+                source, line_map = combine_cells(extract_notebook_cells(f))
+            import_list = extract_imports_from_source(
+                source, module_name, verbose=verbose
+            )
+            call_list, func_defs, class_list, import_time_literals = [], [], [], []
+        elif is_notebook:
+            (
+                import_list,
+                call_list,
+                func_defs,
+                class_list,
+                import_time_literals,
+                line_map,
+            ) = extract_node_structure_from_notebook(
+                f, verbose=verbose, node_filter=node_filter, with_literals=True
+            )
+        else:
+            (
+                import_list,
+                call_list,
+                func_defs,
+                class_list,
+                import_time_literals,
+            ) = extract_structure(
+                source,
+                module_name,
+                verbose=verbose,
+                node_filter=node_filter,
+                with_literals=True,
+            )
         module_info[module_name] = {
             "import_list": import_list,
             "call_list": call_list,
             "func_defs": func_defs,
             "class_list": class_list,
+            "import_time_literals": import_time_literals,
+            "filename": str(f),
+            "content_hash": content_hash,
+            "filter_key": filter_key,
+            "imports_only": imports_only,
         }
+        if line_map is not None:
+            # notebook line numbers refer to the combined code cells, this maps them
+            # back to (cell, line)
+            module_info[module_name]["line_map"] = line_map
+        if sample is not None:
+            module_info[module_name]["sample"] = sample[f]
+    return module_info
+
+
+def extract_code_information_from_git(
+    repo_dir,
+    commit: str = "HEAD",
+    paths: list = None,
+    verbose=False,
+    parse_cache: dict = None,
+    node_filter=None,
+):
+    """Extract the module info of a past revision straight from git objects, without
+    checking out a worktree.
+
+    Args:
+        repo_dir (str): path to the git repository
+        commit (str, optional): commit, branch or tag to crawl. Defaults to "HEAD".
+        paths (list, optional): only crawl files under these paths. Defaults to None.
+        verbose (bool): print more information about process
+        parse_cache (dict, optional): parsed module data keyed by blob sha, module name and
+        filter. Reuse the same dict across revisions so identical files are only parsed once.
+        Defaults to None.
+        node_filter (NodeFilter, optional): calls and classes to leave out while parsing.
+        Defaults to None.
+
+    Returns:
+        dict: module information
+    """
+    if parse_cache is None:
+        parse_cache = {}
+    python_blobs = list_python_blobs(repo_dir, commit, paths=paths)
+    if not python_blobs:
+        print("no code found")
+        return {}
+    filter_key = None if node_filter is None else node_filter.key
+    module_info = {}
+    with GitBlobReader(repo_dir) as blob_reader:
+        for path, sha in python_blobs:
+            module_name = path.stem
+            cache_key = (sha, module_name, filter_key)
+            if cache_key not in parse_cache:
+                source = blob_reader.read_blob(sha)
+                parse_cache[cache_key] = extract_node_structure_from_source(
+                    source,
+                    module_name,
+                    verbose=verbose,
+                    node_filter=node_filter,
+                    with_literals=True,
+                )
+            elif verbose:
+                print(f"Reusing parsed {module_name} ({sha[:10]}).")
+
+            (
+                import_list,
+                call_list,
+                func_defs,
+                class_list,
+                import_time_literals,
+            ) = parse_cache[cache_key]
+            module_info[module_name] = {
+                "import_list": import_list,
+                "call_list": call_list,
+                "func_defs": func_defs,
+                "class_list": class_list,
+                "import_time_literals": import_time_literals,
+                "filename": str(path),
+                "content_hash": sha,
+                "filter_key": filter_key,
+            }
     return module_info
@@ -1,18 +1,31 @@
 from collections import Counter
 
+# name of the node standing in for a module's top-level code in repo-wide graphs, the
+# same name Python gives module code objects
+MODULE_LEVEL_NAME = "<module>"
+# name of the node standing in for a module's `if __name__ == "__main__":` block
+MAIN_GUARD_NAME = "__main__"
+
+
+def get_call_target_name(call):
+    if call.module:
+        module = ".".join(call.module)
+        return f"{module}.{call.name}"
+    return f"{call.name}"
+
+
+def get_func_def_name(func_def):
+    if func_def.defined_in is not None:
+        return f"{func_def.defined_in}.{func_def.name}"
+    return func_def.name
+
 
 def get_edges_from_func_defs(function_defs):
     edge_list = []
     for f in function_defs:
-        name = f.name
-        if f.defined_in is not None:
-            name = f"{f.defined_in}.{name}"
+        name = get_func_def_name(f)
         for call in f.calls:
-            if call.module:
-                module = ".".join(call.module)
-                edge_list.append((name, f"{module}.{call.name}"))
-            else:
-                edge_list.append((name, f"{call.name}"))
+            edge_list.append((name, get_call_target_name(call)))
     return edge_list
 
 
@@ -30,11 +43,7 @@ def get_edges_from_calls(calls):
     edge_list = []
     name = "main"
     for call in calls:
-        if call.module:
-            module = ".".join(call.module)
-            edge_list.append((name, f"{module}.{call.name}"))
-        else:
-            edge_list.append((name, f"{call.name}"))
+        edge_list.append((name, get_call_target_name(call)))
     return edge_list
 
 
@@ -66,6 +75,50 @@ def create_function_call_edges(
     return edge_list
 
 
+def get_call_site_attributes(call):
+    return {
+        "lineno": call.call_lineno,
+        "loop_depth": call.loop_depth,
+        "in_async_for": call.in_async_for,
+    }
+
+
+def create_call_site_edges(
+    module: dict,
+    wanted_classes: list = None,
+    include_body_commands: bool = True,
+    include_function_defs: bool = True,
+):
+    """Create code dependency graph from function definition data, keeping the
+    attributes of each call site.
+
+    Args:
+        module (dict): parsed module data
+
+    Returns:
+        list: edges (s, t, attributes) with the line number, loop depth and `async for`
+        context of the call
+    """
+    edge_list = []
+    function_defs = []
+    if include_function_defs:
+        function_defs.extend(module["func_defs"])
+    for class_data in module["class_list"]:
+        if wanted_classes is not None and class_data.name not in wanted_classes:
+            continue
+        function_defs.extend(class_data.methods)
+    for f in function_defs:
+        name = get_func_def_name(f)
+        for call in f.calls:
+            attributes = get_call_site_attributes(call)
+            edge_list.append((name, get_call_target_name(call), attributes))
+    if include_body_commands:
+        for call in module["call_list"]:
+            attributes = get_call_site_attributes(call)
+            edge_list.append(("main", get_call_target_name(call), attributes))
+    return edge_list
+
+
 def create_collapsed_function_call_edges(
     module: dict,
     wanted_classes: list = None,
@@ -97,3 +150,234 @@ def create_collapsed_function_call_edges(
         weight = aggregated_calls[combined_name]
         weighted_edge_list.append((s, t, weight))
     return weighted_edge_list
+
+
+def get_repo_definitions(module_info: dict):
+    """Collect every function and method definition of a crawl under a repo-wide
+    qualified name, e.g. `module.function` or `module.Class.method`.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+
+    Returns:
+        dict: qualified name to (module name, FuncDefNode)
+    """
+    definitions = {}
+    for module_name, module in module_info.items():
+        for f in module["func_defs"]:
+            definitions[f"{module_name}.{get_func_def_name(f)}"] = (module_name, f)
+        for class_data in module["class_list"]:
+            for method in class_data.methods:
+                qualified_name = f"{module_name}.{get_func_def_name(method)}"
+                definitions[qualified_name] = (module_name, method)
+    return definitions
+
+
+def get_import_prefixes(module: dict, module_names):
+    """Map the names a module uses to refer to other crawled modules and to the
+    functions it imports from them, e.g. `np` or `create_graph_description`, to their
+    qualified names.
+
+    Args:
+        module (dict): parsed module data
+        module_names (iterable): names of all crawled modules
+
+    Returns:
+        dict: name prefix used in calls to qualified name
+    """
+    prefixes = {m: m for m in module_names}
+    for import_node in module["import_list"]:
+        if not import_node.module:
+            continue
+        crawled_name = import_node.module.split(".")[-1]
+        if crawled_name not in prefixes:
+            continue
+        prefixes[import_node.module] = crawled_name
+        aliases = import_node.alias
+        if isinstance(aliases, str):
+            aliases = [aliases]
+        for alias in aliases or []:
+            prefixes[alias] = crawled_name
+        for function_name in import_node.function_names:
+            prefixes.setdefault(function_name, f"{crawled_name}.{function_name}")
+    return prefixes
+
+
+def resolve_call_target(
+    target: str,
+    module_name: str,
+    definitions: dict,
+    prefixes: dict,
+    class_name=None,
+    scope=None,
+):
+    """Resolve a module-local call target name to a repo-wide qualified definition name.
+
+    Args:
+        target (str): call target as named in the module's edges, e.g. `np.array`
+        module_name (str): module the call was made in
+        definitions (dict): repo definitions from `get_repo_definitions`
+        prefixes (dict): import prefixes from `get_import_prefixes`
+        class_name (str, optional): class of the calling method. Defaults to None.
+        scope (str, optional): local name of the calling function, used to find helper
+        functions defined inside it. Defaults to None.
+
+    Returns:
+        str: qualified definition name, or the unchanged target if it is not defined in
+        the crawl
+    """
+    candidates = [f"{module_name}.{target}"]
+    if scope is not None:
+        candidates.insert(0, f"{module_name}.{scope}.{target}")
+    parts = target.split(".")
+    if class_name is not None and parts[0] in ["self", "cls"] and len(parts) > 1:
+        candidates.append(".".join([module_name, class_name, *parts[1:]]))
+    # prefer the longest import prefix, e.g. `pkg.sub` over `pkg`
+    for i in range(len(parts), 0, -1):
+        crawled_name = prefixes.get(".".join(parts[:i]))
+        if crawled_name is not None:
+            candidates.append(".".join([crawled_name, *parts[i:]]))
+    for candidate in candidates:
+        if candidate in definitions:
+            return candidate
+        # instantiating a class calls its constructor
+        if candidate + ".__init__" in definitions:
+            return candidate + ".__init__"
+    return target
+
+
+def get_repo_edges_from_calls(
+    caller: str,
+    calls: list,
+    module_name: str,
+    definitions: dict,
+    prefixes: dict,
+    class_name=None,
+    scope=None,
+    with_calls: bool = False,
+):
+    edge_list = []
+    for call in calls:
+        target = resolve_call_target(
+            get_call_target_name(call),
+            module_name,
+            definitions,
+            prefixes,
+            class_name=class_name,
+            scope=scope,
+        )
+        if with_calls:
+            edge_list.append((caller, target, call))
+        else:
+            edge_list.append((caller, target))
+    return edge_list
+
+
+def iter_repo_call_edges(
+    module_info: dict,
+    wanted_classes: list = None,
+    include_body_commands: bool = True,
+    include_function_defs: bool = True,
+    definitions: dict = None,
+    with_calls: bool = False,
+    module_names=None,
+):
+    """Yield the edges of `create_repo_call_edges` one at a time, without keeping them."""
+    if definitions is None:
+        definitions = get_repo_definitions(module_info)
+    if module_names is None:
+        module_names = module_info.keys()
+    for module_name, module in module_info.items():
+        prefixes = get_import_prefixes(module, module_names)
+        resolve_args = dict(
+            module_name=module_name,
+            definitions=definitions,
+            prefixes=prefixes,
+            with_calls=with_calls,
+        )
+        if include_function_defs:
+            for f in module["func_defs"]:
+                scope = get_func_def_name(f)
+                yield from get_repo_edges_from_calls(
+                    f"{module_name}.{scope}", f.calls, scope=scope, **resolve_args
+                )
+        for class_data in module["class_list"]:
+            if wanted_classes is not None and class_data.name not in wanted_classes:
+                continue
+            for method in class_data.methods:
+                caller = f"{module_name}.{get_func_def_name(method)}"
+                yield from get_repo_edges_from_calls(
+                    caller, method.calls, class_name=class_data.name, **resolve_args
+                )
+        if include_body_commands:
+            module_calls = [c for c in module["call_list"] if not c.in_main_guard]
+            main_guard_calls = [c for c in module["call_list"] if c.in_main_guard]
+            caller = f"{module_name}.{MODULE_LEVEL_NAME}"
+            yield from get_repo_edges_from_calls(caller, module_calls, **resolve_args)
+            caller = f"{module_name}.{MAIN_GUARD_NAME}"
+            yield from get_repo_edges_from_calls(
+                caller, main_guard_calls, **resolve_args
+            )
+
+
+def create_repo_call_edges(
+    module_info: dict,
+    wanted_classes: list = None,
+    include_body_commands: bool = True,
+    include_function_defs: bool = True,
+    definitions: dict = None,
+    with_calls: bool = False,
+    module_names=None,
+):
+    """Create a call graph across all crawled modules. Callers are qualified as
+    `module.function`, `module.Class.method`, `module.<module>` for top-level code or
+    `module.__main__` for the main guard block, and calls to functions defined elsewhere
+    in the crawl are resolved to their qualified names.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+        definitions (dict, optional): precomputed `get_repo_definitions` result
+        with_calls (bool, optional): add the CallNode of the call site to each edge, for
+        its line number and loop context. Defaults to False.
+        module_names (iterable, optional): names of all crawled modules, when
+        `module_info` only holds part of the crawl and `definitions` covers all of it.
+        Defaults to the keys of `module_info`.
+
+    Returns:
+        list: edges (s, t), or (s, t, call) with `with_calls`, one per call site
+    """
+    return list(
+        iter_repo_call_edges(
+            module_info,
+            wanted_classes=wanted_classes,
+            include_body_commands=include_body_commands,
+            include_function_defs=include_function_defs,
+            definitions=definitions,
+            with_calls=with_calls,
+            module_names=module_names,
+        )
+    )
+
+
+def create_weighted_repo_call_edges(module_info: dict, **edge_options):
+    """Collapse the repo-wide call graph into unique edges weighted by their number of
+    call sites. Edges are ordered by when their caller, then their callee, first shows
+    up in the graph, the order `edge_spill` merges its sorted runs in.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+        edge_options: passed on to `create_repo_call_edges`, except `with_calls`
+
+    Returns:
+        list: unique edges (s, t, w)
+    """
+    node_ids = {}
+    weights = Counter()
+    for s, t in iter_repo_call_edges(module_info, **edge_options):
+        s_id = node_ids.setdefault(s, len(node_ids))
+        t_id = node_ids.setdefault(t, len(node_ids))
+        weights[(s_id, t_id)] += 1
+    names = list(node_ids)
+    return [
+        (names[s_id], names[t_id], w) for (s_id, t_id), w in sorted(weights.items())
+    ]
@@ -3,6 +3,8 @@ from pathlib import Path
 from collections import defaultdict
 import ast
 
+# smallest literal, in number of elements, whose size the parser records
+MIN_RECORDED_LITERAL_ELEMENTS = 100
 
 common_functions_to_skip = [
     "append",
@@ -235,19 +237,20 @@ def process_from_import_node(node: ast.ImportFrom) -> ImportNode:
     )
 
 
-def process_import_node(node: ast.Import) -> ImportNode:
-    """Extract data from import node.
+def process_import_node(node: ast.Import) -> list:
+    """Extract data from import node. `import a, b` imports two modules, so this gives
+    one ImportNode per name.
 
     Args:
         node (ast.Import): ast node for basic import
 
     Returns:
-        ImportNode: import data
+        list: ImportNode for each imported module
     """
-    node_data = node.names[0]
-    return ImportNode(
-        module=node_data.name, function_names=[], alias=node_data.asname, level=-1
-    )
+    return [
+        ImportNode(module=n.name, function_names=[], alias=n.asname, level=-1)
+        for n in node.names
+    ]
 
 
 @dataclass
@@ -256,6 +259,12 @@ class CallNode:
     name: str  # function name
     call_lineno: int  # where was the call
     called_by: str = None  # what was the caller
+    in_main_guard: bool = False  # made under `if __name__ == "__main__":`
+    loop_depth: int = 0  # number of enclosing loops and comprehensions
+    in_async_for: bool = False  # made inside an `async for` loop or comprehension
+    # made in a function or lambda body, so it runs when that is called, not where the
+    # function is defined
+    in_function_body: bool = False
 
 
 def print_call_node_info(node):
@@ -268,12 +277,22 @@ def print_call_node_info(node):
     print("-" * 80)
 
 
-def process_call_node(node: ast.Call, called_by=None, verbose: bool = False):
+def process_call_node(
+    node: ast.Call,
+    called_by=None,
+    verbose: bool = False,
+    node_filter=None,
+    class_names: list = None,
+):
     """Extract function call data from a call node.
 
     Args:
         node (ast.Call): ast call node
         verbose (bool, optional): print information about the function. Defaults to False.
+        node_filter (NodeFilter, optional): skip builtin calls the filter excludes
+        without creating their call data. Defaults to None.
+        class_names (list, optional): classes of the module, which can shadow builtins.
+        Defaults to None.
 
     Returns:
         CallNode: data about the call
@@ -287,28 +306,54 @@ def process_call_node(node: ast.Call, called_by=None, verbose: bool = False):
         value = func_data.value
         submodule_desc = get_submodule_desc(value)
         submodule_desc.reverse()
-
-        call_node = CallNode(
-            module=submodule_desc, name=function_name, call_lineno=node.lineno
-        )
     elif isinstance(func_data, ast.Name):
-        call_node = CallNode(
-            name=func_data.id,
-            module=[],  # the module is provided in the imports or this function is defined in this script
-            call_lineno=node.lineno,
-        )
+        function_name = func_data.id
+        submodule_desc = (
+            []
+        )  # the module is provided in the imports or this function is defined in this script
     else:
-        print("error")
-        print(node)
+        # dynamic calls such as `handlers[k]()` or `f()()` have no static name, these
+        # are left to the runtime tracer
+        if verbose:
+            print("Skipping dynamic call:", ast.dump(func_data))
         return None
 
     # we want to avoid creating nodes for things like `some_list.append(item)`
     # this makes it so that we aren't treating some_list like a model so the
     # edges to this call will eventually be skipped
-    if call_node.name in common_functions_to_skip:
-        call_node.module = []
-    call_node.called_by = called_by
-    return call_node
+    if function_name in common_functions_to_skip:
+        submodule_desc = []
+
+    # a bare builtin call keeps its name through import and object resolution, so the
+    # filter can drop it before anything is allocated for it
+    if (
+        node_filter is not None
+        and not submodule_desc
+        and function_name in builtin_names
+        and function_name not in (class_names or [])
+        and node_filter.excludes(function_name)
+    ):
+        return None
+
+    return CallNode(
+        module=submodule_desc,
+        name=function_name,
+        call_lineno=node.lineno,
+        called_by=called_by,
+        loop_depth=getattr(node, "loop_depth", 0),
+        in_async_for=getattr(node, "in_async_for", False),
+        in_function_body=getattr(node, "in_function_body", False),
+    )
+
+
+@dataclass
+class DefinitionMetrics:
+    lines: int  # lines from the `def` or `class` line to the end of the body
+    statements: int  # statements in the body, nested ones included
+    cyclomatic_complexity: int  # 1 plus the number of branch points
+    max_nesting_depth: int  # deepest nesting of control flow blocks
+    call_sites: int  # calls kept in the graph
+    distinct_callees: int  # distinct targets of those calls
 
 
 @dataclass
@@ -319,6 +364,7 @@ class FuncDefNode:
     start_lineno: int  # where does the definition start
     end_lineno: int  # where does the definition stop
     calls: list  # what functions are called in the definition
+    metrics: DefinitionMetrics = None  # None for helpers defined inside functions
 
 
 def process_func_def_node(node: ast.FunctionDef, module_name=None, defined_in=None):
@@ -337,6 +383,7 @@ class ClassNode:
     name: str
     module: str
     methods: list
+    metrics: DefinitionMetrics = None  # method metrics combined
 
 
 def process_class_node(node: ast.ClassDef, module_name=None, methods=None):
@@ -344,6 +391,9 @@ def process_class_node(node: ast.ClassDef, module_name=None, methods=None):
         name=node.name,
         module=module_name,
         methods=methods,
+        metrics=get_class_metrics(
+            node.end_lineno - node.lineno + 1, len(node.body), methods or []
+        ),
     )
 
 
@@ -368,12 +418,12 @@ def add_import(node, import_list):
         import_list (list): list of import data
     """
     if isinstance(node, ast.Import):
-        import_list.append(process_import_node(node))
+        import_list.extend(process_import_node(node))
     elif isinstance(node, ast.ImportFrom):
         import_list.append(process_from_import_node(node))
 
 
-def add_call_or_import(node, call_list, import_list):
+def add_call_or_import(node, call_list, import_list, node_filter=None):
     """Determine if the note is an import or call, parse, and add to the
     corresponding list.
 
@@ -381,18 +431,23 @@ def add_call_or_import(node, call_list, import_list):
         node (ast.AST): node to parse
         call_list (list): list of call data
         import_list (list): list of import data
+        node_filter (NodeFilter, optional): leave out the calls it excludes. Defaults to None.
     """
     if isinstance(node, ast.Import):
-        import_list.append(process_import_node(node))
+        import_list.extend(process_import_node(node))
     elif isinstance(node, ast.ImportFrom):
         import_list.append(process_from_import_node(node))
     elif isinstance(node, ast.Call):
-        call_data = process_call_node(node)
+        call_data = process_call_node(node, node_filter=node_filter)
+        if call_data is None:
+            return
         if not call_data.module and call_data.name not in builtin_names:
             for import_node in import_list:
-                if call_data.name in import_node.function_names:
+                if import_node.module and call_data.name in import_node.function_names:
                     call_data.module = [import_node.module]
                     break
+        if node_filter is not None and node_filter.excludes_call(call_data):
+            return
         call_list.append(call_data)
 
 
@@ -408,7 +463,9 @@ def walk_node_children(node):
     return list(ast.walk(node))
 
 
-def process_class_function_def(node, context_name, class_names: list = None):
+def process_class_function_def(
+    node, context_name, class_names: list = None, node_filter=None
+):
     class_method_def = process_func_def_node(
         node, context_name, defined_in=context_name
     )
@@ -419,19 +476,22 @@ def process_class_function_def(node, context_name, class_names: list = None):
         module_func_defs=[],
         call_list=class_method_def.calls,
         import_list=[],
+        node_filter=node_filter,
     )
     return class_method_def
 
 
-def process_class_methods(node, class_names: list = None):
+def process_class_methods(node, class_names: list = None, node_filter=None):
     """Process all function definitions inside class and return the FunctionDefs in a list."""
     class_name = node.name
     class_body = node.body
     class_methods = []
     # this should mostly be class methods
     for body_node in class_body:
-        if isinstance(body_node, ast.FunctionDef):
-            method = process_class_function_def(body_node, class_name, class_names)
+        if isinstance(body_node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            method = process_class_function_def(
+                body_node, class_name, class_names, node_filter=node_filter
+            )
             class_methods.append(method)
     return class_methods
 
@@ -477,6 +537,103 @@ def update_call_data_for_object_info(
     return call_data
 
 
+# nodes that add a branch to the control flow, `match` only exists on Python 3.10+
+branch_node_types = (
+    ast.If,
+    ast.IfExp,
+    ast.For,
+    ast.AsyncFor,
+    ast.While,
+    ast.ExceptHandler,
+    getattr(ast, "match_case", ast.ExceptHandler),
+)
+# statements whose bodies are one level deeper
+nesting_block_types = (
+    ast.If,
+    ast.For,
+    ast.AsyncFor,
+    ast.While,
+    ast.With,
+    ast.AsyncWith,
+    ast.Try,
+    getattr(ast, "TryStar", ast.Try),
+    getattr(ast, "Match", ast.If),
+)
+
+
+# every node type that adds to the statement count or the complexity, so the many
+# other nodes of a walk are passed over with one lookup
+metric_node_types = {
+    node_type
+    for node_type in vars(ast).values()
+    if isinstance(node_type, type) and issubclass(node_type, ast.stmt)
+}
+metric_node_types.update([*branch_node_types, ast.comprehension, ast.BoolOp])
+
+
+def get_complexity_increment(node: ast.AST):
+    """Count the branch points a node adds to the cyclomatic complexity."""
+    if isinstance(node, branch_node_types):
+        return 1
+    if isinstance(node, ast.comprehension):
+        return 1 + len(node.ifs)
+    if isinstance(node, ast.BoolOp):
+        return len(node.values) - 1
+    return 0
+
+
+def get_max_nesting_depth(node: ast.AST):
+    """Find the deepest nesting of control flow blocks in the body of a definition. An
+    `elif` counts as the same level as its `if`. Only statements are visited."""
+    max_depth = 0
+    to_visit = [(child, 0) for child in node.body]
+    while to_visit:
+        statement, depth = to_visit.pop()
+        if isinstance(statement, nesting_block_types):
+            depth += 1
+            max_depth = max(max_depth, depth)
+        for field_name in ["body", "orelse", "finalbody", "handlers", "cases"]:
+            children = getattr(statement, field_name, None)
+            if not isinstance(children, list):
+                continue
+            child_depth = depth
+            if (
+                field_name == "orelse"
+                and isinstance(statement, ast.If)
+                and len(children) == 1
+                and isinstance(children[0], ast.If)
+            ):
+                child_depth -= 1
+            to_visit.extend((child, child_depth) for child in children)
+    return max_depth
+
+
+def get_class_metrics(lines: int, body_statement_count: int, methods: list):
+    """Combine the metrics of a class's methods: complexities and calls add up, and the
+    distinct callees are counted over all methods.
+
+    Args:
+        lines (int): lines of the class definition
+        body_statement_count (int): statements directly in the class body
+        methods (list): FuncDefNode list of the methods
+
+    Returns:
+        DefinitionMetrics: metrics of the class
+    """
+    callees = set()
+    for method in methods:
+        callees.update((tuple(c.module or []), c.name) for c in method.calls)
+    method_metrics = [m.metrics for m in methods if m.metrics is not None]
+    return DefinitionMetrics(
+        lines=lines,
+        statements=body_statement_count + sum(m.statements for m in method_metrics),
+        cyclomatic_complexity=sum(m.cyclomatic_complexity for m in method_metrics),
+        max_nesting_depth=max((m.max_nesting_depth for m in method_metrics), default=0),
+        call_sites=sum(m.call_sites for m in method_metrics),
+        distinct_callees=len(callees),
+    )
+
+
 def process_func_def_children(
     node: ast.AST,
     func_def: FuncDefNode,
@@ -484,6 +641,7 @@ def process_func_def_children(
     call_list: list,
     import_list: list,
     class_names: list = None,
+    node_filter=None,
 ):
     # we have already parsed the top level function def node, so we use walk on each node in the
     # body and combine them to get all of the children. It is likely easier to do walk_node_children[1:]
@@ -495,8 +653,15 @@ def process_func_def_children(
     if class_names is None:
         class_names = []
     objects = {}
+    # metrics are counted in the same walk that finds the calls
+    statement_count = 0
+    complexity = 1
     for child in node_children:
-        if isinstance(child, ast.FunctionDef):
+        if type(child) in metric_node_types:
+            if isinstance(child, ast.stmt):
+                statement_count += 1
+            complexity += get_complexity_increment(child)
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
             # TODO: this will be a helper function, which we may want to handle differently
             # for now we just add the function name to the helper function's `.module` and do not worry about process its interior
             helper_function_module = func_def.module + func_def.name
@@ -508,7 +673,14 @@ def process_func_def_children(
             if not isinstance(node, ast.Call):
                 add_import(child, import_list)
             if isinstance(child, ast.Call):
-                call_data = process_call_node(child, func_def.name)
+                call_data = process_call_node(
+                    child,
+                    func_def.name,
+                    node_filter=node_filter,
+                    class_names=class_names,
+                )
+                if call_data is None:
+                    continue
                 call_data = update_call_data_for_object_info(
                     node=child,
                     call_data=call_data,
@@ -519,11 +691,25 @@ def process_func_def_children(
 
                 if not call_data.module and call_data.name not in builtin_names:
                     for import_node in import_list:
-                        if call_data.name in import_node.function_names:
+                        if (
+                            import_node.module
+                            and call_data.name in import_node.function_names
+                        ):
                             call_data.module = [import_node.module]
                             break
+                if node_filter is not None and node_filter.excludes_call(call_data):
+                    continue
                 func_def.calls.append(call_data)
 
+    func_def.metrics = DefinitionMetrics(
+        lines=node.end_lineno - node.lineno + 1,
+        statements=statement_count,
+        cyclomatic_complexity=complexity,
+        max_nesting_depth=get_max_nesting_depth(node),
+        call_sites=len(func_def.calls),
+        distinct_callees=len({(tuple(c.module or []), c.name) for c in func_def.calls}),
+    )
+
 
 def process_script_work(
     node,
@@ -533,6 +719,8 @@ def process_script_work(
     import_list,
     class_names: list = None,
     objects: list = None,
+    in_main_guard: bool = False,
+    node_filter=None,
 ):
     """Walk all children of the node and process them.
 
@@ -542,13 +730,19 @@ def process_script_work(
         func_defs (list): function definitions
         call_list (list): calls
         import_list (list): imports
+        in_main_guard (bool): the node is the `if __name__ == "__main__":` block
+        node_filter (NodeFilter, optional): leave out the calls it excludes. Defaults to None.
     """
     # TODO: clean this up because we've eliminate basically everything but assignments
     # context_name - either the current module name or the class name
     node_children = walk_node_children(node)
     for child in node_children:
         if isinstance(child, ast.Call):
-            call_data = process_call_node(child)
+            call_data = process_call_node(
+                child, node_filter=node_filter, class_names=class_names
+            )
+            if call_data is None:
+                continue
             call_data = update_call_data_for_object_info(
                 node=child,
                 call_data=call_data,
@@ -558,14 +752,171 @@ def process_script_work(
             )
             if not call_data.module and call_data.name not in builtin_names:
                 for import_node in import_list:
-                    if call_data.name in import_node.function_names:
+                    if (
+                        import_node.module
+                        and call_data.name in import_node.function_names
+                    ):
                         call_data.module = [import_node.module]
                         break
+            if node_filter is not None and node_filter.excludes_call(call_data):
+                continue
+            call_data.in_main_guard = in_main_guard
             call_list.append(call_data)
 
 
-def parse_module_node(module_node: ast.Module, current_module_name=None, verbose=False):
-    """Crawl the children of the module node and extract code structure data."""
+def is_main_guard(node: ast.AST):
+    """Check if the node is an `if __name__ == "__main__":` block.
+
+    Args:
+        node (ast.AST): top-level module node
+
+    Returns:
+        bool: whether the node is the main guard
+    """
+    if not isinstance(node, ast.If) or not isinstance(node.test, ast.Compare):
+        return False
+    test = node.test
+    if len(test.ops) != 1 or not isinstance(test.ops[0], ast.Eq):
+        return False
+    operands = [test.left, test.comparators[0]]
+    names = [o.id for o in operands if isinstance(o, ast.Name)]
+    constants = [o.value for o in operands if isinstance(o, ast.Constant)]
+    return names == ["__name__"] and constants == ["__main__"]
+
+
+def get_loop_scoped_children(node: ast.AST, depth: int, in_async_for: bool):
+    """Pair each child of the node with the loop depth and `async for` context it runs
+    in. Loop bodies run once per iteration, so they are one level deeper than the loop,
+    while e.g. the iterable of a `for` loop is only evaluated once.
+
+    Args:
+        node (ast.AST): parent node
+        depth (int): loop depth of the parent node
+        in_async_for (bool): whether the parent node is inside an `async for`
+
+    Returns:
+        list: (child, depth, in_async_for) tuples
+    """
+    if isinstance(node, (ast.For, ast.AsyncFor)):
+        inner_async = in_async_for or isinstance(node, ast.AsyncFor)
+        inner = [(c, depth + 1, inner_async) for c in [node.target, *node.body]]
+        outer = [(c, depth, in_async_for) for c in [node.iter, *node.orelse]]
+        return inner + outer
+    if isinstance(node, ast.While):
+        inner = [(c, depth + 1, in_async_for) for c in [node.test, *node.body]]
+        return inner + [(c, depth, in_async_for) for c in node.orelse]
+    if isinstance(node, (ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)):
+        children = []
+        for generator in node.generators:
+            # the first iterable is evaluated outside of the comprehension's loops
+            children.append((generator.iter, depth, in_async_for))
+            depth += 1
+            in_async_for = in_async_for or bool(generator.is_async)
+            children.extend(
+                (c, depth, in_async_for) for c in [generator.target, *generator.ifs]
+            )
+        if isinstance(node, ast.DictComp):
+            elements = [node.key, node.value]
+        else:
+            elements = [node.elt]
+        return children + [(c, depth, in_async_for) for c in elements]
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+        # a function body runs when it is called, not when it is defined
+        outer = [node.args]
+        if not isinstance(node, ast.Lambda):
+            outer.extend(node.decorator_list)
+            body = node.body
+        else:
+            body = [node.body]
+        return [(c, depth, in_async_for) for c in outer] + [(c, 0, False) for c in body]
+    if isinstance(node, ast.ClassDef):
+        outer = [*node.decorator_list, *node.bases, *node.keywords]
+        return [(c, depth, in_async_for) for c in outer] + [
+            (c, 0, False) for c in node.body
+        ]
+    return [(c, depth, in_async_for) for c in ast.iter_child_nodes(node)]
+
+
+def get_function_body(node: ast.AST):
+    if isinstance(node, ast.Lambda):
+        return [node.body]
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        return node.body
+    return []
+
+
+def annotate_loop_depth(module_node: ast.Module):
+    """Record the loop depth, `async for` context and whether it is in a function body
+    of every call node on the node itself, so `process_call_node` can copy it into the
+    call data.
+
+    Args:
+        module_node (ast.Module): top-level module node
+    """
+    to_visit = [(module_node, 0, False, False)]
+    while to_visit:
+        node, depth, in_async_for, in_function_body = to_visit.pop()
+        if isinstance(node, ast.Call):
+            node.loop_depth = depth
+            node.in_async_for = in_async_for
+            node.in_function_body = in_function_body
+        body_ids = {id(c) for c in get_function_body(node)}
+        to_visit.extend(
+            (
+                child,
+                child_depth,
+                child_in_async_for,
+                in_function_body or id(child) in body_ids,
+            )
+            for child, child_depth, child_in_async_for in get_loop_scoped_children(
+                node, depth, in_async_for
+            )
+        )
+
+
+def find_import_time_literals(
+    module_node: ast.Module, min_elements: int = MIN_RECORDED_LITERAL_ELEMENTS
+):
+    """Find list, tuple, set and dict displays with many elements that are built when
+    the module is imported, i.e. outside of function and lambda bodies.
+
+    Args:
+        module_node (ast.Module): top-level module node
+        min_elements (int, optional): smallest number of elements, nested ones
+        included, to report. Defaults to MIN_RECORDED_LITERAL_ELEMENTS.
+
+    Returns:
+        list: (line, number of elements) of each large literal
+    """
+    large_literals = []
+    to_visit = list(module_node.body)
+    while to_visit:
+        node = to_visit.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            # decorators and default values are evaluated where the function is defined
+            to_visit.extend(getattr(node, "decorator_list", []))
+            to_visit.append(node.args)
+            continue
+        if isinstance(node, (ast.List, ast.Tuple, ast.Set, ast.Dict)):
+            element_count = 0
+            for child in ast.walk(node):
+                if isinstance(child, (ast.List, ast.Tuple, ast.Set)):
+                    element_count += len(child.elts)
+                elif isinstance(child, ast.Dict):
+                    element_count += len(child.keys)
+            if element_count >= min_elements:
+                large_literals.append((node.lineno, element_count))
+            continue
+        to_visit.extend(ast.iter_child_nodes(node))
+    return sorted(large_literals)
+
+
+def parse_module_node(
+    module_node: ast.Module, current_module_name=None, verbose=False, node_filter=None
+):
+    """Crawl the children of the module node and extract code structure data. Calls and
+    classes excluded by the `NodeFilter` are skipped while crawling."""
+    annotate_loop_depth(module_node)
 
     class_list = []
     func_defs = []
@@ -583,8 +934,12 @@ def parse_module_node(module_node: ast.Module, current_module_name=None, verbose
     for class_node in class_nodes:
         class_names.append(class_node.name)
     for class_node in class_nodes:
+        if node_filter is not None and not node_filter.keeps_class(class_node.name):
+            continue
         # TODO: we may have some imports inside classes, so will need to handle that, not high priority though
-        class_methods = process_class_methods(class_node, class_names=class_names)
+        class_methods = process_class_methods(
+            class_node, class_names=class_names, node_filter=node_filter
+        )
         class_data = process_class_node(class_node, methods=class_methods)
         class_list.append(class_data)
 
@@ -592,7 +947,7 @@ def parse_module_node(module_node: ast.Module, current_module_name=None, verbose
         {}
     )  # keeping track of objects instantiated by the script (instead of in function definitions)
     for node in other_module_nodes:
-        if isinstance(node, ast.FunctionDef):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
             function_def = process_func_def_node(node, current_module_name)
             if verbose:
                 print("Function definition:", function_def.name)
@@ -603,6 +958,7 @@ def parse_module_node(module_node: ast.Module, current_module_name=None, verbose
                 call_list=call_list,
                 import_list=import_list,
                 class_names=class_names,
+                node_filter=node_filter,
             )
             func_defs.append(function_def)
         elif isinstance(node, ast.Import) or isinstance(node, ast.ImportFrom):
@@ -617,6 +973,8 @@ def parse_module_node(module_node: ast.Module, current_module_name=None, verbose
                 import_list=import_list,
                 class_names=class_names,
                 objects=script_objects,
+                in_main_guard=is_main_guard(node),
+                node_filter=node_filter,
             )
 
     return import_list, call_list, func_defs, class_list
@@ -709,29 +1067,36 @@ def get_top_level_node_from_filename(filename: Path):
     return module
 
 
-# main method
-def extract_node_structure_from_script(filename: str, verbose=False):
-    """Extract data from the provided script.
+def extract_node_structure_from_source(
+    source,
+    current_module_name: str,
+    verbose=False,
+    node_filter=None,
+    with_literals: bool = False,
+):
+    """Extract data from already loaded Python source.
 
     Args:
-        filename (str): script file name
+        source (str | bytes): Python source code
+        current_module_name (str): name of the module the source belongs to
         verbose (bool): print more information about process
+        node_filter (NodeFilter, optional): calls and classes to leave out. Defaults to None.
+        with_literals (bool, optional): also return the `find_import_time_literals` of
+        the module, from the same parse. Defaults to False.
 
     Returns:
-        list: collections of code data
+        list: collections of code data, the imports, calls, function definitions and
+        classes, followed by the large literals with `with_literals`
     """
-    path = Path(filename)
-    # a module's name is exactly the stem of the file name
-    current_module_name = path.stem
     if verbose:
         print(f"Extracting info from {current_module_name}.")
 
     # we start by parsing to get the top level module object
-    module_node = get_top_level_node_from_filename(path)
+    module_node = ast.parse(source)
 
     # TODO: decide how to use the class data
     import_list, call_list, func_defs, class_list = parse_module_node(
-        module_node, current_module_name, verbose=verbose
+        module_node, current_module_name, verbose=verbose, node_filter=node_filter
     )
 
     # TODO: may no longer be needed
@@ -744,4 +1109,29 @@ def extract_node_structure_from_script(filename: str, verbose=False):
     deduplicated_import_list = manage_module_imports(import_list)
 
     # TODO: option for non-deduped call list in order to provide cleanup suggestions
-    return deduplicated_import_list, call_list, func_defs, class_list
+    node_structure = deduplicated_import_list, call_list, func_defs, class_list
+    if with_literals:
+        return (*node_structure, find_import_time_literals(module_node))
+    return node_structure
+
+
+# main method
+def extract_node_structure_from_script(filename: str, verbose=False, node_filter=None):
+    """Extract data from the provided script.
+
+    Args:
+        filename (str): script file name
+        verbose (bool): print more information about process
+        node_filter (NodeFilter, optional): calls and classes to leave out. Defaults to None.
+
+    Returns:
+        list: collections of code data
+    """
+    path = Path(filename)
+    # a module's name is exactly the stem of the file name
+    current_module_name = path.stem
+    with open(path, "rb") as script_contents:
+        source = script_contents.read()
+    return extract_node_structure_from_source(
+        source, current_module_name, verbose=verbose, node_filter=node_filter
+    )
@@ -0,0 +1,185 @@
+import heapq
+import os
+import tempfile
+from array import array
+from itertools import groupby
+from code_graph import create_weighted_repo_call_edges, iter_repo_call_edges
+
+# an edge is buffered as one unsigned 64 bit integer, caller id in the high half
+ID_BITS = 32
+ID_MASK = (1 << ID_BITS) - 1
+# the buffer holds 8 bytes per edge, but sorting it for a spill briefly needs a Python
+# int and a list slot for each edge as well
+BYTES_PER_BUFFERED_EDGE = 56
+# bytes per (edge, weight) pair read from a run while merging
+BYTES_PER_RUN_ITEM = 16
+# most runs merged at once, more are first merged into fewer, larger runs
+MAX_MERGE_FAN_IN = 64
+
+
+def write_run(items, run_file):
+    """Write sorted (edge, weight) pairs to an open binary file."""
+    block = array("Q")
+    for edge, weight in items:
+        block.append(edge)
+        block.append(weight)
+        if len(block) >= 1 << 16:
+            block.tofile(run_file)
+            del block[:]
+    block.tofile(run_file)
+
+
+def iter_run(path, block_size: int):
+    """Read the (edge, weight) pairs of a run, `block_size` pairs at a time."""
+    with open(path, "rb") as run_file:
+        while True:
+            block = array("Q")
+            try:
+                block.fromfile(run_file, 2 * block_size)
+            except EOFError:
+                # the last block is shorter, what was there has been read
+                pass
+            if not block:
+                return
+            yield from zip(block[::2], block[1::2])
+
+
+def sum_weights(items):
+    """Combine the weights of consecutive pairs with the same edge."""
+    for edge, group in groupby(items, key=lambda item: item[0]):
+        yield edge, sum(weight for _, weight in group)
+
+
+class EdgeAggregator:
+    """Count call edges out of core. Node names are interned to integer ids, edges are
+    buffered as packed id pairs and, whenever the buffer is full, sorted, collapsed and
+    spilled to a temporary run file. Iterating merges the runs into the unique edges
+    with their weights, in the order `code_graph.create_weighted_repo_call_edges` uses.
+    Only the node names, the buffer and one block per run are held in memory.
+
+    Use as a context manager, or call `close`, to remove the run files.
+    """
+
+    def __init__(self, memory_budget: int = 64 * 1024**2, temp_dir=None):
+        self.memory_budget = memory_budget  # bytes for the buffer and merge blocks
+        self.max_buffered_edges = max(1024, memory_budget // BYTES_PER_BUFFERED_EDGE)
+        self.temp_dir = temp_dir
+        self.node_ids = {}  # node name to id
+        self.buffer = array("Q")
+        self.run_paths = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_node_id(self, name: str):
+        node_id = self.node_ids.get(name)
+        if node_id is None:
+            node_id = len(self.node_ids)
+            if node_id > ID_MASK:
+                raise ValueError(f"more than {ID_MASK + 1} nodes")
+            self.node_ids[name] = node_id
+        return node_id
+
+    def add(self, s: str, t: str):
+        s_id = self.get_node_id(s)
+        t_id = self.get_node_id(t)
+        self.buffer.append(s_id << ID_BITS | t_id)
+        if len(self.buffer) >= self.max_buffered_edges:
+            self.spill()
+
+    def add_edges(self, edges):
+        for s, t in edges:
+            self.add(s, t)
+
+    def get_buffered_items(self):
+        items = [
+            (edge, len(list(group))) for edge, group in groupby(sorted(self.buffer))
+        ]
+        del self.buffer[:]
+        return items
+
+    def create_run(self, items):
+        run_file = tempfile.NamedTemporaryFile(
+            prefix="edges_", suffix=".run", dir=self.temp_dir, delete=False
+        )
+        with run_file:
+            write_run(items, run_file)
+        self.run_paths.append(run_file.name)
+
+    def spill(self):
+        """Write the buffered edges to a new sorted run."""
+        if self.buffer:
+            self.create_run(self.get_buffered_items())
+
+    def get_block_size(self, run_count: int):
+        return max(1024, self.memory_budget // (BYTES_PER_RUN_ITEM * run_count))
+
+    def merge_runs(self, run_paths: list):
+        """Merge sorted runs, yielding each edge once with its summed weight."""
+        block_size = self.get_block_size(len(run_paths))
+        runs = [iter_run(path, block_size) for path in run_paths]
+        return sum_weights(heapq.merge(*runs, key=lambda item: item[0]))
+
+    def reduce_runs(self):
+        """Merge runs into larger ones until few enough are left to merge at once."""
+        while len(self.run_paths) > MAX_MERGE_FAN_IN:
+            to_merge = self.run_paths[:MAX_MERGE_FAN_IN]
+            self.run_paths = self.run_paths[MAX_MERGE_FAN_IN:]
+            self.create_run(self.merge_runs(to_merge))
+            for path in to_merge:
+                os.remove(path)
+
+    def iter_weighted_edges(self):
+        """Yield the unique edges (s, t, w), ordered by when their caller, then their
+        callee, was first added."""
+        if self.run_paths:
+            self.spill()
+            self.reduce_runs()
+            items = self.merge_runs(self.run_paths)
+        else:
+            # everything fit in the buffer
+            items = self.get_buffered_items()
+        names = list(self.node_ids)
+        for edge, weight in items:
+            yield names[edge >> ID_BITS], names[edge & ID_MASK], weight
+
+    def __iter__(self):
+        return self.iter_weighted_edges()
+
+    def close(self):
+        for path in self.run_paths:
+            if os.path.exists(path):
+                os.remove(path)
+        self.run_paths = []
+        del self.buffer[:]
+
+
+def iter_weighted_repo_call_edges(
+    module_info: dict, memory_budget: int = None, temp_dir=None, **edge_options
+):
+    """Stream the unique repo-wide call edges with their number of call sites. Without a
+    memory budget this is `code_graph.create_weighted_repo_call_edges`, with one the
+    edges are counted with an `EdgeAggregator` that spills to disk. Both give the same
+    edges in the same order.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+        memory_budget (int, optional): bytes to count edges in before spilling sorted
+        runs to disk. Defaults to None, counting in memory.
+        temp_dir (str, optional): directory for the run files. Defaults to the system
+        temporary directory.
+        edge_options: passed on to `code_graph.create_repo_call_edges`, except
+        `with_calls`
+
+    Yields:
+        tuple: unique edge (s, t, w)
+    """
+    if memory_budget is None:
+        yield from create_weighted_repo_call_edges(module_info, **edge_options)
+        return
+    with EdgeAggregator(memory_budget, temp_dir=temp_dir) as aggregator:
+        aggregator.add_edges(iter_repo_call_edges(module_info, **edge_options))
+        yield from aggregator
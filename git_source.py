@@ -0,0 +1,79 @@
+import subprocess
+from pathlib import PurePosixPath
+
+
+def list_python_blobs(repo_dir, commit: str = "HEAD", paths: list = None):
+    """List the `.py` files of a commit without checking it out.
+
+    Args:
+        repo_dir (str): path to the git repository
+        commit (str, optional): commit, branch or tag to read. Defaults to "HEAD".
+        paths (list, optional): only list files under these paths. Defaults to None.
+
+    Returns:
+        list: (path, blob sha) pairs for every Python file in the commit
+    """
+    command = ["git", "-C", str(repo_dir), "ls-tree", "-r", "-z", commit]
+    if paths:
+        command.append("--")
+        command.extend(str(p) for p in paths)
+    output = subprocess.run(command, check=True, capture_output=True).stdout
+    python_blobs = []
+    for entry in output.split(b"\0"):
+        if not entry:
+            continue
+        # each entry looks like "<mode> <type> <sha>\t<path>"
+        object_info, path = entry.split(b"\t", 1)
+        _, object_type, sha = object_info.split(b" ")
+        path = PurePosixPath(path.decode())
+        if object_type != b"blob" or path.suffix != ".py":
+            continue
+        if ".ipynb_checkpoints" in path.parts:
+            continue
+        python_blobs.append((path, sha.decode()))
+    return python_blobs
+
+
+class GitBlobReader:
+    """Read blob contents through a single long-lived `git cat-file --batch` process
+    rather than starting a new git process for every file."""
+
+    def __init__(self, repo_dir):
+        self.process = subprocess.Popen(
+            ["git", "-C", str(repo_dir), "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def read_blob(self, sha: str):
+        """Read the contents of a blob.
+
+        Args:
+            sha (str): blob sha
+
+        Returns:
+            bytes: contents of the blob
+        """
+        self.process.stdin.write(sha.encode() + b"\n")
+        self.process.stdin.flush()
+        header = self.process.stdout.readline().split()
+        if len(header) != 3:
+            raise KeyError(f"{sha} is not an object in the repository")
+        _, object_type, size = header
+        if object_type != b"blob":
+            raise ValueError(f"{sha} is a {object_type.decode()}, not a blob")
+        contents = self.process.stdout.read(int(size))
+        self.process.stdout.read(1)  # contents are followed by a newline
+        return contents
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+        self.process.stdout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
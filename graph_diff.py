@@ -0,0 +1,99 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from code_graph import create_function_call_edges
+
+
+@dataclass
+class ModuleGraphDiff:
+    module: str  # name of the module that changed
+    added: list = field(default_factory=list)  # (s, t, w) edges only in the new crawl
+    removed: list = field(default_factory=list)  # (s, t, w) edges only in the old crawl
+    reweighted: list = field(default_factory=list)  # (s, t, old_w, new_w) edges
+    unchanged: list = field(default_factory=list)  # (s, t, w) edges in both crawls
+
+    def is_empty(self):
+        return not (self.added or self.removed or self.reweighted)
+
+
+def count_module_edges(module: dict, **edge_options):
+    """Count how many times each edge occurs in a module's call graph.
+
+    Args:
+        module (dict): parsed module data, or None if the module does not exist
+        edge_options: keyword arguments passed on to `create_function_call_edges`
+
+    Returns:
+        Counter: edge (s, t) to number of call sites
+    """
+    if module is None:
+        return Counter()
+    return Counter(create_function_call_edges(module, **edge_options))
+
+
+def diff_module_graphs(
+    module_name: str, old_module: dict, new_module: dict, **edge_options
+):
+    """Compare the call graph of two versions of a module.
+
+    Args:
+        module_name (str): name of the module
+        old_module (dict): parsed module data from the old crawl, None if it was added
+        new_module (dict): parsed module data from the new crawl, None if it was removed
+        edge_options: keyword arguments passed on to `create_function_call_edges`
+
+    Returns:
+        ModuleGraphDiff: added, removed, reweighted and unchanged edges
+    """
+    old_edges = count_module_edges(old_module, **edge_options)
+    new_edges = count_module_edges(new_module, **edge_options)
+    module_diff = ModuleGraphDiff(module=module_name)
+    for edge, new_weight in new_edges.items():
+        old_weight = old_edges.get(edge, 0)
+        if not old_weight:
+            module_diff.added.append((*edge, new_weight))
+        elif old_weight != new_weight:
+            module_diff.reweighted.append((*edge, old_weight, new_weight))
+        else:
+            module_diff.unchanged.append((*edge, new_weight))
+    for edge, old_weight in old_edges.items():
+        if edge not in new_edges:
+            module_diff.removed.append((*edge, old_weight))
+    return module_diff
+
+
+def diff_crawls(old_module_info: dict, new_module_info: dict, **edge_options):
+    """Compare two crawls made with `extract_code_information`. Modules with the same
+    content hash in both crawls are skipped without building their edges, so the work
+    done is proportional to the number of changed modules.
+
+    Args:
+        old_module_info (dict): module info of the old revision
+        new_module_info (dict): module info of the new revision
+        edge_options: keyword arguments passed on to `create_function_call_edges`,
+        e.g. `wanted_classes` or `include_body_commands`
+
+    Returns:
+        dict: module name to ModuleGraphDiff, only for modules whose graph changed
+    """
+    module_diffs = {}
+    module_names = list(new_module_info) + [
+        m for m in old_module_info if m not in new_module_info
+    ]
+    for module_name in module_names:
+        old_module = old_module_info.get(module_name)
+        new_module = new_module_info.get(module_name)
+        if old_module is new_module:
+            continue
+        if (
+            old_module is not None
+            and new_module is not None
+            and old_module.get("content_hash") is not None
+            and old_module.get("content_hash") == new_module.get("content_hash")
+        ):
+            continue
+        module_diff = diff_module_graphs(
+            module_name, old_module, new_module, **edge_options
+        )
+        if not module_diff.is_empty():
+            module_diffs[module_name] = module_diff
+    return module_diffs
@@ -0,0 +1,376 @@
+import sqlite3
+from dep_parser import ImportNode
+from code_graph import (
+    MAIN_GUARD_NAME,
+    MODULE_LEVEL_NAME,
+    get_call_target_name,
+    get_func_def_name,
+    get_import_prefixes,
+    resolve_call_target,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS modules (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    filename TEXT,
+    content_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS imports (
+    id INTEGER PRIMARY KEY,
+    module_id INTEGER NOT NULL REFERENCES modules(id) ON DELETE CASCADE,
+    imported_module TEXT,
+    level INTEGER,
+    aliases TEXT
+);
+CREATE TABLE IF NOT EXISTS imported_names (
+    import_id INTEGER NOT NULL REFERENCES imports(id) ON DELETE CASCADE,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS classes (
+    id INTEGER PRIMARY KEY,
+    module_id INTEGER NOT NULL REFERENCES modules(id) ON DELETE CASCADE,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS definitions (
+    id INTEGER PRIMARY KEY,
+    module_id INTEGER NOT NULL REFERENCES modules(id) ON DELETE CASCADE,
+    class_id INTEGER REFERENCES classes(id) ON DELETE CASCADE,
+    qualified_name TEXT NOT NULL,
+    name TEXT NOT NULL,
+    start_lineno INTEGER,
+    end_lineno INTEGER
+);
+CREATE TABLE IF NOT EXISTS call_sites (
+    id INTEGER PRIMARY KEY,
+    module_id INTEGER NOT NULL REFERENCES modules(id) ON DELETE CASCADE,
+    caller TEXT NOT NULL,
+    caller_class TEXT,
+    caller_scope TEXT,
+    target TEXT NOT NULL,
+    callee TEXT,
+    lineno INTEGER,
+    loop_depth INTEGER,
+    in_async_for INTEGER,
+    in_main_guard INTEGER
+);
+CREATE TABLE IF NOT EXISTS edges (
+    module_id INTEGER NOT NULL REFERENCES modules(id) ON DELETE CASCADE,
+    caller TEXT NOT NULL,
+    callee TEXT NOT NULL,
+    weight INTEGER NOT NULL
+);
+"""
+
+# created after bulk loads, inserting into indexed tables is much slower
+INDEXES = """
+CREATE INDEX IF NOT EXISTS imports_module ON imports(module_id);
+CREATE INDEX IF NOT EXISTS imports_imported_module ON imports(imported_module);
+CREATE INDEX IF NOT EXISTS imported_names_import ON imported_names(import_id);
+CREATE INDEX IF NOT EXISTS classes_module ON classes(module_id);
+CREATE INDEX IF NOT EXISTS definitions_module ON definitions(module_id);
+CREATE INDEX IF NOT EXISTS definitions_class ON definitions(class_id);
+CREATE INDEX IF NOT EXISTS definitions_qualified_name ON definitions(qualified_name);
+CREATE INDEX IF NOT EXISTS call_sites_module ON call_sites(module_id);
+CREATE INDEX IF NOT EXISTS call_sites_caller ON call_sites(caller);
+CREATE INDEX IF NOT EXISTS call_sites_callee ON call_sites(callee);
+CREATE INDEX IF NOT EXISTS edges_module ON edges(module_id);
+CREATE INDEX IF NOT EXISTS edges_caller ON edges(caller);
+CREATE INDEX IF NOT EXISTS edges_callee ON edges(callee);
+"""
+
+
+def get_module_call_sites(module_name: str, module: dict):
+    """List the call sites of a module with the caller context `resolve_call_target`
+    needs, naming callers the way `create_repo_call_edges` does.
+
+    Args:
+        module_name (str): module name
+        module (dict): parsed module data
+
+    Returns:
+        list: (caller, caller class, caller scope, call) tuples
+    """
+    call_sites = []
+    for f in module["func_defs"]:
+        scope = get_func_def_name(f)
+        caller = f"{module_name}.{scope}"
+        call_sites.extend((caller, None, scope, call) for call in f.calls)
+    for class_data in module["class_list"]:
+        for method in class_data.methods:
+            caller = f"{module_name}.{get_func_def_name(method)}"
+            call_sites.extend((caller, class_data.name, None, c) for c in method.calls)
+    for call in module["call_list"]:
+        caller_name = MAIN_GUARD_NAME if call.in_main_guard else MODULE_LEVEL_NAME
+        call_sites.append((f"{module_name}.{caller_name}", None, None, call))
+    return call_sites
+
+
+class GraphStore:
+    """SQLite store of a crawl with indexed tables of modules, imports, classes,
+    definitions, call sites and resolved, weighted edges.
+
+    Args:
+        path (str, optional): database file. Defaults to an in-memory database.
+    """
+
+    def __init__(self, path=":memory:"):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def insert_module(self, module_name: str, module: dict):
+        cursor = self.connection.execute(
+            "INSERT INTO modules (name, filename, content_hash) VALUES (?, ?, ?)",
+            (module_name, module.get("filename"), module.get("content_hash")),
+        )
+        module_id = cursor.lastrowid
+
+        for import_node in module["import_list"]:
+            aliases = import_node.alias
+            if isinstance(aliases, str):
+                aliases = [aliases]
+            cursor = self.connection.execute(
+                "INSERT INTO imports (module_id, imported_module, level, aliases) "
+                "VALUES (?, ?, ?, ?)",
+                (
+                    module_id,
+                    import_node.module,
+                    import_node.level,
+                    ",".join(aliases) if aliases else None,
+                ),
+            )
+            self.connection.executemany(
+                "INSERT INTO imported_names (import_id, name) VALUES (?, ?)",
+                [(cursor.lastrowid, name) for name in import_node.function_names],
+            )
+
+        definition_rows = [
+            (module_id, None, f"{module_name}.{get_func_def_name(f)}", f)
+            for f in module["func_defs"]
+        ]
+        for class_data in module["class_list"]:
+            cursor = self.connection.execute(
+                "INSERT INTO classes (module_id, name) VALUES (?, ?)",
+                (module_id, class_data.name),
+            )
+            definition_rows.extend(
+                (
+                    module_id,
+                    cursor.lastrowid,
+                    f"{module_name}.{get_func_def_name(m)}",
+                    m,
+                )
+                for m in class_data.methods
+            )
+        self.connection.executemany(
+            "INSERT INTO definitions (module_id, class_id, qualified_name, name, "
+            "start_lineno, end_lineno) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (m_id, c_id, qualified_name, f.name, f.start_lineno, f.end_lineno)
+                for m_id, c_id, qualified_name, f in definition_rows
+            ],
+        )
+
+        self.connection.executemany(
+            "INSERT INTO call_sites (module_id, caller, caller_class, caller_scope, "
+            "target, lineno, loop_depth, in_async_for, in_main_guard) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    module_id,
+                    caller,
+                    class_name,
+                    scope,
+                    get_call_target_name(call),
+                    call.call_lineno,
+                    call.loop_depth,
+                    call.in_async_for,
+                    call.in_main_guard,
+                )
+                for caller, class_name, scope, call in get_module_call_sites(
+                    module_name, module
+                )
+            ],
+        )
+        return module_id
+
+    def create_indexes(self):
+        # one statement at a time, `executescript` would commit the open transaction
+        for statement in INDEXES.split(";"):
+            if statement.strip():
+                self.connection.execute(statement)
+
+    def get_import_list(self, module_id: int):
+        """Rebuild the ImportNode list of a stored module."""
+        import_names = {}
+        for import_id, name in self.connection.execute(
+            "SELECT n.import_id, n.name FROM imported_names n "
+            "JOIN imports i ON i.id = n.import_id WHERE i.module_id = ?",
+            (module_id,),
+        ):
+            import_names.setdefault(import_id, []).append(name)
+        import_list = []
+        for import_id, imported_module, level, aliases in self.connection.execute(
+            "SELECT id, imported_module, level, aliases FROM imports "
+            "WHERE module_id = ?",
+            (module_id,),
+        ):
+            import_list.append(
+                ImportNode(
+                    module=imported_module,
+                    function_names=import_names.get(import_id, []),
+                    level=level,
+                    alias=aliases.split(",") if aliases else None,
+                )
+            )
+        return import_list
+
+    def resolve_call_sites(self, module_ids: list):
+        """Resolve the call sites of the given modules against every stored definition
+        and rebuild their edges."""
+        definitions = set(
+            row[0]
+            for row in self.connection.execute("SELECT qualified_name FROM definitions")
+        )
+        module_names = [
+            row[0] for row in self.connection.execute("SELECT name FROM modules")
+        ]
+        for module_id in module_ids:
+            (module_name,) = self.connection.execute(
+                "SELECT name FROM modules WHERE id = ?", (module_id,)
+            ).fetchone()
+            module = {"import_list": self.get_import_list(module_id)}
+            prefixes = get_import_prefixes(module, module_names)
+            call_sites = self.connection.execute(
+                "SELECT id, caller_class, caller_scope, target FROM call_sites "
+                "WHERE module_id = ?",
+                (module_id,),
+            ).fetchall()
+            self.connection.executemany(
+                "UPDATE call_sites SET callee = ? WHERE id = ?",
+                [
+                    (
+                        resolve_call_target(
+                            target,
+                            module_name,
+                            definitions,
+                            prefixes,
+                            class_name=class_name,
+                            scope=scope,
+                        ),
+                        call_site_id,
+                    )
+                    for call_site_id, class_name, scope, target in call_sites
+                ],
+            )
+            self.connection.execute(
+                "DELETE FROM edges WHERE module_id = ?", (module_id,)
+            )
+            self.connection.execute(
+                "INSERT INTO edges (module_id, caller, callee, weight) "
+                "SELECT module_id, caller, callee, COUNT(*) FROM call_sites "
+                "WHERE module_id = ? GROUP BY caller, callee",
+                (module_id,),
+            )
+
+    def get_link_state(self):
+        # calls resolve differently only when module or definition names change
+        definitions = self.connection.execute(
+            "SELECT qualified_name FROM definitions"
+        ).fetchall()
+        module_names = self.connection.execute("SELECT name FROM modules").fetchall()
+        return set(definitions), set(module_names)
+
+    def load(self, module_info: dict):
+        """Replace the stored crawl, inserting everything in one transaction.
+
+        Args:
+            module_info (dict): module information from `extract_code_information`
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM modules")
+            module_ids = [
+                self.insert_module(module_name, module)
+                for module_name, module in module_info.items()
+            ]
+            self.create_indexes()
+            self.resolve_call_sites(module_ids)
+
+    def update(self, module_info: dict):
+        """Bring the store up to date with a new crawl, only rewriting the modules whose
+        content hash changed and removing the modules that are gone. Unchanged modules
+        are only re-linked when the set of defined names changed.
+
+        Args:
+            module_info (dict): module information from `extract_code_information`
+
+        Returns:
+            list: names of the inserted, updated or removed modules
+        """
+        stored_hashes = dict(
+            self.connection.execute("SELECT name, content_hash FROM modules")
+        )
+        changed = [
+            name
+            for name, module in module_info.items()
+            if name not in stored_hashes
+            or module.get("content_hash") is None
+            or stored_hashes[name] != module.get("content_hash")
+        ]
+        removed = [name for name in stored_hashes if name not in module_info]
+        if not changed and not removed:
+            return []
+
+        with self.connection:
+            link_state = self.get_link_state()
+            self.connection.executemany(
+                "DELETE FROM modules WHERE name = ?",
+                [(name,) for name in changed + removed],
+            )
+            module_ids = [
+                self.insert_module(name, module_info[name]) for name in changed
+            ]
+            self.create_indexes()
+            if self.get_link_state() != link_state:
+                module_ids = [
+                    row[0] for row in self.connection.execute("SELECT id FROM modules")
+                ]
+            self.resolve_call_sites(module_ids)
+        return changed + removed
+
+    def get_callers(self, callee: str):
+        """Find every caller of a definition or external function, e.g. `np.linalg.eigs`.
+
+        Returns:
+            list: (caller, number of call sites) pairs
+        """
+        return self.connection.execute(
+            "SELECT caller, SUM(weight) FROM edges WHERE callee = ? GROUP BY caller "
+            "ORDER BY caller",
+            (callee,),
+        ).fetchall()
+
+    def get_callees(self, caller: str):
+        """Find everything a definition calls.
+
+        Returns:
+            list: (callee, number of call sites) pairs
+        """
+        return self.connection.execute(
+            "SELECT callee, SUM(weight) FROM edges WHERE caller = ? GROUP BY callee "
+            "ORDER BY callee",
+            (caller,),
+        ).fetchall()
+
+    def query(self, sql: str, parameters=()):
+        return self.connection.execute(sql, parameters).fetchall()
@@ -0,0 +1,414 @@
+import html
+import json
+import math
+import random
+from collections import Counter, defaultdict
+from pathlib import Path, PurePath
+from code_graph import MAIN_GUARD_NAME, MODULE_LEVEL_NAME, get_repo_definitions
+from edge_spill import iter_weighted_repo_call_edges
+
+EXTERNAL_PACKAGE = "(external)"
+ROOT_PACKAGE = "(root)"
+# force-directed layout is quadratic in the number of nodes, larger overviews use a
+# spiral ordered by degree instead
+MAX_FORCE_LAYOUT_NODES = 300
+
+
+def get_package_name(module: dict):
+    """Name the package of a module after the directory its file is in."""
+    filename = module.get("filename")
+    if not filename:
+        return ROOT_PACKAGE
+    parts = [p for p in PurePath(filename).parent.parts if p not in ["", ".", "/"]]
+    return ".".join(parts) or ROOT_PACKAGE
+
+
+def get_node_paths(module_info: dict, definitions: dict):
+    """Place every definition and module-level node under (package, module, name)."""
+    node_paths = {}
+    for module_name, module in module_info.items():
+        package = get_package_name(module)
+        for name in [MODULE_LEVEL_NAME, MAIN_GUARD_NAME]:
+            qualified_name = f"{module_name}.{name}"
+            node_paths[qualified_name] = (package, module_name, qualified_name)
+    for qualified_name, (module_name, _) in definitions.items():
+        package = get_package_name(module_info[module_name])
+        node_paths[qualified_name] = (package, module_name, qualified_name)
+    return node_paths
+
+
+def get_external_path(name: str):
+    return (EXTERNAL_PACKAGE, name.split(".")[0], name)
+
+
+def layout_overview(nodes: list, edges: Counter, iterations: int = 100, seed: int = 0):
+    """Precompute overview positions with a Fruchterman-Reingold force layout.
+
+    Args:
+        nodes (list): node names
+        edges (Counter): (s, t) to weight
+        iterations (int, optional): layout iterations. Defaults to 100.
+        seed (int, optional): random seed, so exports are reproducible. Defaults to 0.
+
+    Returns:
+        dict: node name to (x, y) in a 1000 by 1000 box
+    """
+    degree = Counter()
+    for (s, t), w in edges.items():
+        degree[s] += w
+        degree[t] += w
+    if len(nodes) > MAX_FORCE_LAYOUT_NODES:
+        # golden angle spiral with the busiest nodes in the middle
+        ordered = sorted(nodes, key=lambda n: (-degree[n], n))
+        positions = {}
+        for i, n in enumerate(ordered):
+            radius = 480 * math.sqrt((i + 0.5) / len(ordered))
+            angle = i * 2.399963
+            positions[n] = (
+                500 + radius * math.cos(angle),
+                500 + radius * math.sin(angle),
+            )
+        return positions
+
+    rng = random.Random(seed)
+    positions = {n: [rng.uniform(0, 1000), rng.uniform(0, 1000)] for n in nodes}
+    k = 1000 / math.sqrt(max(len(nodes), 1))
+    temperature = 100.0
+    links = [(s, t) for (s, t) in edges if s != t]
+    for _ in range(iterations):
+        displacement = {n: [0.0, 0.0] for n in nodes}
+        for i, a in enumerate(nodes):
+            ax, ay = positions[a]
+            for b in nodes[i + 1 :]:
+                dx = ax - positions[b][0]
+                dy = ay - positions[b][1]
+                distance = math.hypot(dx, dy) or 0.01
+                force = k * k / distance
+                displacement[a][0] += dx / distance * force
+                displacement[a][1] += dy / distance * force
+                displacement[b][0] -= dx / distance * force
+                displacement[b][1] -= dy / distance * force
+        for s, t in links:
+            dx = positions[s][0] - positions[t][0]
+            dy = positions[s][1] - positions[t][1]
+            distance = math.hypot(dx, dy) or 0.01
+            force = distance * distance / k
+            displacement[s][0] -= dx / distance * force
+            displacement[s][1] -= dy / distance * force
+            displacement[t][0] += dx / distance * force
+            displacement[t][1] += dy / distance * force
+        for n in nodes:
+            dx, dy = displacement[n]
+            length = math.hypot(dx, dy) or 0.01
+            step = min(length, temperature)
+            positions[n][0] += dx / length * step
+            positions[n][1] += dy / length * step
+        temperature *= 0.95
+
+    # scale the result back into the box
+    xs = [p[0] for p in positions.values()] or [0]
+    ys = [p[1] for p in positions.values()] or [0]
+    scale = 1000 / max(max(xs) - min(xs), max(ys) - min(ys), 1)
+    return {
+        n: ((x - min(xs)) * scale, (y - min(ys)) * scale)
+        for n, (x, y) in positions.items()
+    }
+
+
+def get_script_json(data):
+    """Encode data as JSON that is safe inside an inline script, where a `</script>`
+    in a name would end the script."""
+    return json.dumps(data, separators=(",", ":")).replace("</", "<\\/")
+
+
+def write_shard(shard_dir: Path, shard_id: str, data: dict):
+    """Write a shard as a script that hands its JSON to the viewer. Script tags load
+    from the local file system where fetching JSON files is blocked."""
+    payload = json.dumps(data, separators=(",", ":"))
+    shard_file = shard_dir / f"{shard_id}.js"
+    shard_file.write_text(f"graphShard({json.dumps(shard_id)},{payload});\n")
+
+
+def export_html_viewer(
+    module_info: dict,
+    output_dir,
+    title: str = "Code graph",
+    memory_budget: int = None,
+):
+    """Export the repo-wide call graph as an offline HTML viewer. The page starts with a
+    package overview whose layout is computed here, and loads the module and definition
+    level data of a package or module from its own shard only when it is expanded.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+        output_dir (str): directory to write `index.html` and the `shards` folder to
+        title (str, optional): page title. Defaults to "Code graph".
+        memory_budget (int, optional): count the call edges within this many bytes,
+        spilling to disk, see `edge_spill`. Defaults to None, counting in memory.
+
+    Returns:
+        Path: path of the written `index.html`
+    """
+    output_dir = Path(output_dir)
+    shard_dir = output_dir / "shards"
+    shard_dir.mkdir(parents=True, exist_ok=True)
+
+    definitions = get_repo_definitions(module_info)
+    node_paths = get_node_paths(module_info, definitions)
+    edges = iter_weighted_repo_call_edges(
+        module_info, memory_budget=memory_budget, definitions=definitions
+    )
+
+    package_edges = Counter()
+    module_edges = defaultdict(Counter)  # package to its in and out module edges
+    definition_edges = defaultdict(Counter)  # module to its in and out edges
+    children = defaultdict(set)
+    for s, t, w in edges:
+        s_path = node_paths.get(s) or get_external_path(s)
+        t_path = node_paths.get(t) or get_external_path(t)
+        for path in [s_path, t_path]:
+            children[path[0]].add(path[1])
+            children[path[:2]].add(path[2])
+        package_edges[(s_path[0], t_path[0])] += w
+        module_edge = (s_path[:2], t_path[:2])
+        module_edges[s_path[0]][module_edge] += w
+        module_edges[t_path[0]][module_edge] += w
+        definition_edges[s_path[:2]][(s_path, t_path)] += w
+        definition_edges[t_path[:2]][(s_path, t_path)] += w
+    for qualified_name in definitions:
+        path = node_paths[qualified_name]
+        children[path[0]].add(path[1])
+        children[path[:2]].add(path[2])
+
+    packages = sorted(p for p in children if isinstance(p, str))
+    package_ids = {p: f"p{i}" for i, p in enumerate(packages)}
+    module_keys = sorted(p for p in children if isinstance(p, tuple))
+    module_ids = {m: f"m{i}" for i, m in enumerate(module_keys)}
+
+    for package in packages:
+        write_shard(
+            shard_dir,
+            package_ids[package],
+            {
+                "children": [
+                    {
+                        "name": module_name,
+                        "shard": module_ids[(package, module_name)],
+                        "size": len(children[(package, module_name)]),
+                    }
+                    for module_name in sorted(children[package])
+                ],
+                "edges": [
+                    [list(s), list(t), w] for (s, t), w in module_edges[package].items()
+                ],
+            },
+        )
+    for module_key in module_keys:
+        write_shard(
+            shard_dir,
+            module_ids[module_key],
+            {
+                "children": [
+                    {"name": name, "label": name[len(module_key[1]) + 1 :] or name}
+                    for name in sorted(children[module_key])
+                ],
+                "edges": [
+                    [list(s), list(t), w]
+                    for (s, t), w in definition_edges[module_key].items()
+                ],
+            },
+        )
+
+    positions = layout_overview(packages, package_edges)
+    overview = {
+        "title": title,
+        "nodes": [
+            {
+                "name": p,
+                "shard": package_ids[p],
+                "size": len(children[p]),
+                "x": round(positions[p][0], 1),
+                "y": round(positions[p][1], 1),
+            }
+            for p in packages
+        ],
+        "edges": [[[s], [t], w] for (s, t), w in package_edges.items()],
+    }
+    index_file = output_dir / "index.html"
+    index_file.write_text(
+        viewer_template.replace("__TITLE__", html.escape(title)).replace(
+            "__OVERVIEW__", get_script_json(overview)
+        )
+    )
+    return index_file
+
+
+viewer_template = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+  body { margin: 0; font-family: sans-serif; overflow: hidden; }
+  #info { position: absolute; top: 8px; left: 8px; background: #fffe; padding: 6px 10px;
+          border: 1px solid #ccc; font-size: 13px; }
+  svg { width: 100vw; height: 100vh; cursor: grab; }
+  .node circle { stroke: #333; stroke-width: 1px; cursor: pointer; }
+  .node text { font-size: 11px; pointer-events: none; }
+  .edge { stroke: #999; stroke-opacity: 0.6; fill: none; }
+</style>
+</head>
+<body>
+<div id="info"><b>__TITLE__</b><br>click to expand, shift-click to collapse,
+drag to pan, scroll to zoom</div>
+<svg id="canvas"><defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5"
+markerWidth="6" markerHeight="6" orient="auto"><path d="M0,0L10,5L0,10z" fill="#999"/>
+</marker></defs><g id="scene"><g id="edges"></g><g id="nodes"></g></g></svg>
+<script>
+const overview = __OVERVIEW__;
+const svgNS = "http://www.w3.org/2000/svg";
+const colors = ["#8ecae6", "#ffb703", "#b5e48c"];
+// nodes are keyed by their path joined with "/": package, module, definition
+const nodes = new Map();
+const expanded = new Set();
+const edgeRecords = new Map();
+const pending = new Map();
+let view = {x: 0, y: 0, scale: 1};
+
+function key(path) { return path.join("/"); }
+
+function addEdges(records) {
+  for (const [s, t, w] of records) edgeRecords.set(key(s) + "|" + key(t), [s, t, w]);
+}
+
+function addNode(path, data, x, y) {
+  nodes.set(key(path), {path, x, y, size: data.size || 1, shard: data.shard,
+                        label: data.label || path[path.length - 1]});
+}
+
+for (const n of overview.nodes) addNode([n.name], n, n.x, n.y);
+addEdges(overview.edges);
+
+function loadShard(shardId) {
+  return new Promise(resolve => {
+    pending.set(shardId, resolve);
+    const script = document.createElement("script");
+    script.src = "shards/" + shardId + ".js";
+    document.head.appendChild(script);
+  });
+}
+
+function graphShard(shardId, data) {
+  const resolve = pending.get(shardId);
+  pending.delete(shardId);
+  if (resolve) resolve(data);
+}
+
+async function expand(node) {
+  if (node.path.length >= 3 || expanded.has(key(node.path))) return;
+  const data = await loadShard(node.shard);
+  expanded.add(key(node.path));
+  // place the children on a ring around their parent, no global layout needed
+  const count = data.children.length;
+  const radius = 20 + 12 * Math.sqrt(count) / (node.path.length);
+  data.children.forEach((child, i) => {
+    const angle = 2 * Math.PI * i / Math.max(count, 1);
+    addNode([...node.path, child.name], child,
+            node.x + radius * Math.cos(angle), node.y + radius * Math.sin(angle));
+  });
+  addEdges(data.edges);
+  draw();
+}
+
+function collapse(node) {
+  // the clicked node is always collapsed, so fold its parent back up
+  const parentPath = node.path.length > 1 ? node.path.slice(0, -1) : node.path;
+  const prefix = key(parentPath) + "/";
+  for (const k of [...expanded]) if (k === key(parentPath) || k.startsWith(prefix))
+    expanded.delete(k);
+  for (const k of [...nodes.keys()]) if (k.startsWith(prefix)) nodes.delete(k);
+  draw();
+}
+
+// the visible node standing in for a path, or null if the record is coarser than what
+// is shown, in which case a finer record from an expanded shard covers it
+function visible(path) {
+  for (let depth = 1; depth <= path.length; depth++) {
+    const k = key(path.slice(0, depth));
+    if (!expanded.has(k)) return nodes.has(k) ? k : null;
+  }
+  return null;
+}
+
+function draw() {
+  const edgeLayer = document.getElementById("edges");
+  const nodeLayer = document.getElementById("nodes");
+  edgeLayer.replaceChildren();
+  nodeLayer.replaceChildren();
+  const weights = new Map();
+  for (const [s, t, w] of edgeRecords.values()) {
+    const vs = visible(s), vt = visible(t);
+    if (!vs || !vt || vs === vt) continue;
+    const k = vs + "|" + vt;
+    weights.set(k, (weights.get(k) || 0) + w);
+  }
+  for (const [k, w] of weights) {
+    const [s, t] = k.split("|").map(n => nodes.get(n));
+    const line = document.createElementNS(svgNS, "line");
+    line.setAttribute("class", "edge");
+    line.setAttribute("x1", s.x); line.setAttribute("y1", s.y);
+    line.setAttribute("x2", t.x); line.setAttribute("y2", t.y);
+    line.setAttribute("stroke-width", Math.min(1 + Math.log2(w), 6));
+    line.setAttribute("marker-end", "url(#arrow)");
+    const title = document.createElementNS(svgNS, "title");
+    title.textContent = s.label + " \\u2192 " + t.label + " (" + w + ")";
+    line.appendChild(title);
+    edgeLayer.appendChild(line);
+  }
+  for (const [k, node] of nodes) {
+    if (expanded.has(k)) continue;
+    const group = document.createElementNS(svgNS, "g");
+    group.setAttribute("class", "node");
+    const circle = document.createElementNS(svgNS, "circle");
+    circle.setAttribute("cx", node.x); circle.setAttribute("cy", node.y);
+    circle.setAttribute("r", 3 + Math.min(Math.sqrt(node.size), 12) / node.path.length);
+    circle.setAttribute("fill", colors[node.path.length - 1]);
+    circle.addEventListener("click", event => {
+      event.stopPropagation();
+      if (event.shiftKey) collapse(node); else expand(node);
+    });
+    const text = document.createElementNS(svgNS, "text");
+    text.setAttribute("x", node.x + 6); text.setAttribute("y", node.y + 3);
+    text.textContent = node.label;
+    group.append(circle, text);
+    nodeLayer.appendChild(group);
+  }
+}
+
+function applyView() {
+  document.getElementById("scene").setAttribute("transform",
+    `translate(${view.x},${view.y}) scale(${view.scale})`);
+}
+
+const canvas = document.getElementById("canvas");
+let dragStart = null;
+canvas.addEventListener("mousedown", e => { dragStart = [e.clientX - view.x, e.clientY - view.y]; });
+window.addEventListener("mouseup", () => { dragStart = null; });
+window.addEventListener("mousemove", e => {
+  if (!dragStart) return;
+  view.x = e.clientX - dragStart[0]; view.y = e.clientY - dragStart[1]; applyView();
+});
+canvas.addEventListener("wheel", e => {
+  e.preventDefault();
+  const factor = e.deltaY < 0 ? 1.2 : 1 / 1.2;
+  view.x = e.clientX - (e.clientX - view.x) * factor;
+  view.y = e.clientY - (e.clientY - view.y) * factor;
+  view.scale *= factor;
+  applyView();
+}, {passive: false});
+
+draw();
+</script>
+</body>
+</html>
+"""
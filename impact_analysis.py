@@ -0,0 +1,258 @@
+import os
+import re
+from collections import defaultdict
+from pathlib import Path
+from code_graph import MODULE_LEVEL_NAME, create_repo_call_edges, get_repo_definitions
+
+hunk_header_pattern = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+def get_changed_line_ranges(diff_text: str):
+    """Read the changed line ranges of each file from unified diff output, e.g. from
+    `git diff -U0`.
+
+    Args:
+        diff_text (str): unified diff
+
+    Returns:
+        dict: filename to list of (start, end) line ranges in the new version of the file
+    """
+    changed_ranges = defaultdict(list)
+    filename = None
+    for line in diff_text.splitlines():
+        if line.startswith("+++ "):
+            filename = line[4:].strip()
+            if filename == "/dev/null":
+                filename = None
+            elif filename.startswith("b/"):
+                filename = filename[2:]
+            continue
+        match = hunk_header_pattern.match(line)
+        if match is None or filename is None:
+            continue
+        start = int(match.group(1))
+        length = int(match.group(2)) if match.group(2) is not None else 1
+        # a pure deletion has no lines left, so we flag the line it happened at
+        end = start + max(length, 1) - 1
+        changed_ranges[filename].append((max(start, 1), max(end, 1)))
+    return dict(changed_ranges)
+
+
+def get_strongly_connected_components(node_count: int, adjacency: list):
+    """Find strongly connected components with an iterative version of Tarjan's
+    algorithm. Components are numbered in reverse topological order, so every edge
+    between two components points from a higher to a lower component number.
+
+    Args:
+        node_count (int): number of nodes, labelled 0 to node_count - 1
+        adjacency (list): list of successor lists for each node
+
+    Returns:
+        list: component number of each node
+    """
+    index = [-1] * node_count
+    low_link = [0] * node_count
+    on_stack = [False] * node_count
+    component = [-1] * node_count
+    stack = []
+    next_index = 0
+    component_count = 0
+    for root in range(node_count):
+        if index[root] != -1:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, child_position = work.pop()
+            if child_position == 0:
+                index[node] = low_link[node] = next_index
+                next_index += 1
+                stack.append(node)
+                on_stack[node] = True
+            successors = adjacency[node]
+            recursed = False
+            while child_position < len(successors):
+                successor = successors[child_position]
+                child_position += 1
+                if index[successor] == -1:
+                    work.append((node, child_position))
+                    work.append((successor, 0))
+                    recursed = True
+                    break
+                if on_stack[successor]:
+                    low_link[node] = min(low_link[node], index[successor])
+            if recursed:
+                continue
+            if low_link[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component[member] = component_count
+                    if member == node:
+                        break
+                component_count += 1
+            if work:
+                parent = work[-1][0]
+                low_link[parent] = min(low_link[parent], low_link[node])
+    return component
+
+
+class ImpactIndex:
+    """Reverse call graph index answering "what transitively calls this?" queries.
+
+    Definitions are condensed into strongly connected components of the call graph, and
+    the set of caller components of each component is computed once, on first use, as an
+    integer bitset that later queries reuse.
+    """
+
+    def __init__(self, module_info: dict):
+        self.module_info = module_info
+        self.definitions = get_repo_definitions(module_info)
+        edges = create_repo_call_edges(module_info, definitions=self.definitions)
+
+        self.node_names = []
+        self.node_ids = {}
+        callers = []
+        for s, t in edges:
+            s_id = self.get_node_id(s, callers)
+            t_id = self.get_node_id(t, callers)
+            callers[t_id].append(s_id)
+
+        # callers and callees share the same components, so condense the reverse graph
+        self.component = get_strongly_connected_components(
+            len(self.node_names), callers
+        )
+        component_count = max(self.component, default=-1) + 1
+        self.component_members = [[] for _ in range(component_count)]
+        for node_id, c in enumerate(self.component):
+            self.component_members[c].append(node_id)
+        component_callers = [set() for _ in range(component_count)]
+        for t_id, caller_ids in enumerate(callers):
+            for s_id in caller_ids:
+                if self.component[s_id] != self.component[t_id]:
+                    component_callers[self.component[t_id]].add(self.component[s_id])
+        self.component_callers = [list(c) for c in component_callers]
+        self.reachability = {}
+
+        self.module_filenames = {}
+        for module_name, module in module_info.items():
+            if module.get("filename"):
+                self.module_filenames[os.path.normpath(module["filename"])] = (
+                    module_name
+                )
+
+    def get_node_id(self, name: str, callers: list):
+        node_id = self.node_ids.get(name)
+        if node_id is None:
+            node_id = len(self.node_names)
+            self.node_ids[name] = node_id
+            self.node_names.append(name)
+            callers.append([])
+        return node_id
+
+    def get_component_callers(self, component: int):
+        """Return the bitset of components that transitively call the component,
+        including the component itself.
+
+        Args:
+            component (int): component number
+
+        Returns:
+            int: bitset of component numbers
+        """
+        if component in self.reachability:
+            return self.reachability[component]
+        # components are numbered in reverse topological order of the caller graph, so
+        # callers have lower numbers and are visited before their callees
+        missing = set()
+        to_visit = [component]
+        while to_visit:
+            c = to_visit.pop()
+            if c in missing or c in self.reachability:
+                continue
+            missing.add(c)
+            to_visit.extend(self.component_callers[c])
+        for c in sorted(missing):
+            reachable = 1 << c
+            for caller in self.component_callers[c]:
+                reachable |= self.reachability[caller]
+            self.reachability[c] = reachable
+        return self.reachability[component]
+
+    def get_transitive_callers(self, names):
+        """Find everything that directly or indirectly calls any of the given nodes.
+
+        Args:
+            names (list): qualified names, e.g. `module.Class.method`
+
+        Returns:
+            set: qualified names of the callers, including the given names
+        """
+        reachable = 0
+        for name in names:
+            node_id = self.node_ids.get(name)
+            if node_id is not None:
+                reachable |= self.get_component_callers(self.component[node_id])
+        callers = set(n for n in names if n in self.node_ids)
+        while reachable:
+            lowest_bit = reachable & -reachable
+            c = lowest_bit.bit_length() - 1
+            reachable ^= lowest_bit
+            callers.update(self.node_names[i] for i in self.component_members[c])
+        return callers
+
+    def get_module_name(self, filename: str):
+        """Find the crawled module for a filename, falling back to its stem."""
+        module_name = self.module_filenames.get(os.path.normpath(filename))
+        if module_name is not None:
+            return module_name
+        for crawled_filename, module_name in self.module_filenames.items():
+            if crawled_filename.endswith(os.sep + os.path.normpath(filename)):
+                return module_name
+        stem = Path(filename).stem
+        if stem in self.module_info:
+            return stem
+        return None
+
+    def get_changed_definitions(self, changed_ranges: dict):
+        """Find the definitions overlapping the changed line ranges. Changes outside of
+        any definition are attributed to the module's top-level code.
+
+        Args:
+            changed_ranges (dict): filename to list of (start, end) line ranges
+
+        Returns:
+            set: qualified names of the changed definitions
+        """
+        definitions_by_module = defaultdict(list)
+        for qualified_name, (module_name, f) in self.definitions.items():
+            definitions_by_module[module_name].append((qualified_name, f))
+        changed = set()
+        for filename, line_ranges in changed_ranges.items():
+            module_name = self.get_module_name(filename)
+            if module_name is None:
+                continue
+            for start, end in line_ranges:
+                overlapping = [
+                    qualified_name
+                    for qualified_name, f in definitions_by_module[module_name]
+                    if f.start_lineno <= end and start <= f.end_lineno
+                ]
+                if overlapping:
+                    changed.update(overlapping)
+                else:
+                    changed.add(f"{module_name}.{MODULE_LEVEL_NAME}")
+        return changed
+
+    def get_impacted_definitions(self, changed_ranges: dict):
+        """Find the definitions affected by a change: the changed definitions and
+        everything that transitively calls them.
+
+        Args:
+            changed_ranges (dict): filename to list of (start, end) line ranges, e.g. from
+            `get_changed_line_ranges`
+
+        Returns:
+            set: qualified names of the impacted definitions
+        """
+        changed = self.get_changed_definitions(changed_ranges)
+        return self.get_transitive_callers(changed) | changed
@@ -0,0 +1,277 @@
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from impact_analysis import get_strongly_connected_components
+
+# `python -X importtime` lines: "import time:  self [us] | cumulative | imported package"
+import_time_pattern = re.compile(r"^import time:\s*(\d+) \|\s*(\d+) \| ( *)(\S+)\s*$")
+
+
+@dataclass
+class ImportEdge:
+    importer: str  # importing module
+    imported: str  # crawled module name, or the dotted name of an external module
+    crawled: bool  # the imported module is part of the crawl
+    static: bool = True  # found in the source, rather than only in import time logs
+    self_us: int = 0  # measured time spent in the imported module itself
+    cumulative_us: int = 0  # measured time including everything it imported
+
+
+@dataclass
+class ImportGraph:
+    modules: list  # crawled module names
+    edges: list  # ImportEdge list
+    cycles: list = field(default_factory=list)  # lists of modules importing each other
+
+
+@dataclass
+class ImportTimeEntry:
+    name: str  # dotted module name
+    self_us: int  # time spent in the module itself
+    cumulative_us: int  # time including the modules it imported first
+    children: list = field(default_factory=list)  # ImportTimeEntry list
+
+
+@dataclass
+class ImportChain:
+    modules: list  # chain of graph module names, from a top-level import down
+    self_us: int  # self time of the last module
+    cumulative_us: int  # cumulative time of the last module
+    lazy_candidate: tuple = None  # deepest (crawled importer, imported) link
+
+
+def get_graph_module_name(dotted_name: str, module_names):
+    """Name a module the way the import graph does: crawled modules by their module
+    name, the same match `code_graph.get_import_prefixes` makes, others by their dotted
+    name."""
+    crawled_name = dotted_name.split(".")[-1]
+    if crawled_name in module_names:
+        return crawled_name
+    return dotted_name
+
+
+def get_imported_module_names(import_node, module_names):
+    """List the modules an import brings in.
+
+    Args:
+        import_node (ImportNode): import data
+        module_names (set): names of all crawled modules
+
+    Returns:
+        list: graph module names
+    """
+    imported = []
+    if import_node.module:
+        imported.append(get_graph_module_name(import_node.module, module_names))
+    for name in import_node.function_names:
+        # `from package import module`
+        if name in module_names:
+            imported.append(name)
+    return imported
+
+
+def find_import_cycles(modules: list, edges: list):
+    """Find groups of modules that import each other, directly or through others.
+
+    Args:
+        modules (list): graph module names
+        edges (list): ImportEdge list
+
+    Returns:
+        list: sorted lists of module names, one per cycle
+    """
+    node_ids = {name: i for i, name in enumerate(modules)}
+    adjacency = [[] for _ in modules]
+    self_imports = set()
+    for e in edges:
+        if e.importer in node_ids and e.imported in node_ids:
+            adjacency[node_ids[e.importer]].append(node_ids[e.imported])
+            if e.importer == e.imported:
+                self_imports.add(e.importer)
+    components = get_strongly_connected_components(len(modules), adjacency)
+    members = {}
+    for name, component in zip(modules, components):
+        members.setdefault(component, []).append(name)
+    cycles = [
+        sorted(names)
+        for names in members.values()
+        if len(names) > 1 or names[0] in self_imports
+    ]
+    return sorted(cycles)
+
+
+def create_import_graph(module_info: dict):
+    """Create the module level import graph of a crawl.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+
+    Returns:
+        ImportGraph: import edges and import cycles
+    """
+    module_names = set(module_info)
+    edges = {}
+    for module_name, module in module_info.items():
+        for import_node in module["import_list"]:
+            for imported in get_imported_module_names(import_node, module_names):
+                if (module_name, imported) not in edges:
+                    edges[(module_name, imported)] = ImportEdge(
+                        importer=module_name,
+                        imported=imported,
+                        crawled=imported in module_names,
+                    )
+    edges = list(edges.values())
+    graph = ImportGraph(modules=sorted(module_names), edges=edges)
+    graph.cycles = find_import_cycles(graph.modules, edges)
+    return graph
+
+
+def parse_import_time_log(log_text: str):
+    """Rebuild the import tree from `python -X importtime` output. A module is logged
+    once its import finishes, after the modules it imported, which are indented one
+    level deeper.
+
+    Args:
+        log_text (str): stderr of a `python -X importtime` run
+
+    Returns:
+        list: top-level ImportTimeEntry list, in import order
+    """
+    pending = {}  # depth to finished entries waiting for their importer
+    for line in log_text.splitlines():
+        match = import_time_pattern.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indentation, name = match.groups()
+        depth = len(indentation) // 2
+        entry = ImportTimeEntry(
+            name=name,
+            self_us=int(self_us),
+            cumulative_us=int(cumulative_us),
+            children=pending.pop(depth + 1, []),
+        )
+        pending.setdefault(depth, []).append(entry)
+    return pending.get(0, [])
+
+
+def load_import_time_logs(log_filenames):
+    """Load one or more `python -X importtime` logs.
+
+    Args:
+        log_filenames (str | list): log file name or list of file names
+
+    Returns:
+        list: top-level ImportTimeEntry list of all logs
+    """
+    if isinstance(log_filenames, (str, Path)):
+        log_filenames = [log_filenames]
+    roots = []
+    for filename in log_filenames:
+        roots.extend(parse_import_time_log(Path(filename).read_text()))
+    return roots
+
+
+def iter_import_time_links(roots: list, module_names):
+    """Yield (importer, ImportTimeEntry) for every measured import, with the importer
+    as a graph module name, or None for top-level imports."""
+    to_visit = [(None, entry) for entry in reversed(roots)]
+    while to_visit:
+        importer, entry = to_visit.pop()
+        yield importer, entry
+        name = get_graph_module_name(entry.name, module_names)
+        to_visit.extend((name, child) for child in reversed(entry.children))
+
+
+def apply_import_times(graph: ImportGraph, roots: list):
+    """Attribute measured import times to the edges of the import graph. Python imports
+    a module once, so its cost lands on the edge of the first module importing it.
+    Imports made by crawled modules that the source does not show, e.g. through
+    `importlib`, are added as non-static edges. Times of several logs are summed.
+
+    Args:
+        graph (ImportGraph): graph from `create_import_graph`
+        roots (list): entries from `load_import_time_logs`
+    """
+    module_names = set(graph.modules)
+    edges = {(e.importer, e.imported): e for e in graph.edges}
+    for importer, entry in iter_import_time_links(roots, module_names):
+        if importer not in module_names:
+            continue
+        imported = get_graph_module_name(entry.name, module_names)
+        edge = edges.get((importer, imported))
+        if edge is None:
+            edge = ImportEdge(
+                importer=importer,
+                imported=imported,
+                crawled=imported in module_names,
+                static=False,
+            )
+            edges[(importer, imported)] = edge
+            graph.edges.append(edge)
+        edge.self_us += entry.self_us
+        edge.cumulative_us += entry.cumulative_us
+
+
+def create_import_chain_report(roots: list, module_names, min_fraction: float = 0.01):
+    """Rank the import chains by the time the module at their end took to import,
+    including everything it imported in turn.
+
+    Args:
+        roots (list): entries from `load_import_time_logs`
+        module_names (iterable): names of all crawled modules
+        min_fraction (float, optional): leave out chains ending in modules that took
+        less than this fraction of the total import time. Defaults to 0.01.
+
+    Returns:
+        list: ImportChain list, most expensive first
+    """
+    module_names = set(module_names)
+    total_us = sum(entry.cumulative_us for entry in roots) or 1
+    chains = []
+    to_visit = [([], entry) for entry in roots]
+    while to_visit:
+        chain, entry = to_visit.pop()
+        if entry.cumulative_us < min_fraction * total_us:
+            # children never cost more than their importer
+            continue
+        chain = chain + [get_graph_module_name(entry.name, module_names)]
+        lazy_candidate = None
+        for importer, imported in zip(chain, chain[1:]):
+            if importer in module_names:
+                lazy_candidate = (importer, imported)
+        chains.append(
+            ImportChain(
+                modules=chain,
+                self_us=entry.self_us,
+                cumulative_us=entry.cumulative_us,
+                lazy_candidate=lazy_candidate,
+            )
+        )
+        to_visit.extend((chain, child) for child in entry.children)
+    chains.sort(key=lambda c: (-c.cumulative_us, len(c.modules)))
+    return chains
+
+
+def create_import_chain_report_description(chains: list, limit: int = 30):
+    """Describe the ranked import chains as a markdown table.
+
+    Args:
+        chains (list): ImportChain list from `create_import_chain_report`
+        limit (int, optional): maximum number of rows. Defaults to 30.
+
+    Returns:
+        str: markdown description
+    """
+    contents = [
+        "| chain | cumulative [ms] | self [ms] | import to make lazy |",
+        "| --- | ---: | ---: | --- |",
+    ]
+    for c in chains[:limit]:
+        lazy_candidate = ""
+        if c.lazy_candidate is not None:
+            lazy_candidate = f"{c.lazy_candidate[0]} → {c.lazy_candidate[1]}"
+        contents.append(
+            f"| {' → '.join(c.modules)} | {c.cumulative_us / 1000:.1f} "
+            f"| {c.self_us / 1000:.1f} | {lazy_candidate} |"
+        )
+    return "\n".join(contents)
@@ -0,0 +1,144 @@
+import ast
+import re
+from pathlib import Path
+from dep_parser import (
+    manage_module_imports,
+    process_from_import_node,
+    process_import_node,
+)
+
+# One pass over the source that steps over strings and comments, so only import
+# statements in code are found. Statements that can hide an import in the middle of a
+# line, e.g. `if x: import y`, and quotes that do not close are left to `ast`.
+scan_pattern = re.compile(
+    r"""
+    # tells `re` which characters a match can start at, so it skips the rest quickly
+    (?=['"\#:;\n])
+    (?:
+    (?P<string>
+        '''[^'\\]*(?:(?:\\.|'(?!''))[^'\\]*)*'''
+        | \"\"\"[^"\\]*(?:(?:\\.|"(?!""))[^"\\]*)*\"\"\"
+        | '[^'\\\n]*(?:\\.[^'\\\n]*)*'
+        | "[^"\\\n]*(?:\\.[^"\\\n]*)*"
+    )
+    | (?P<comment>\#[^\n]*)
+    | (?P<statement>\n[ \t]*(?:import|from)(?=[ \t\\(]))
+    | (?P<inline>[:;][ \t]*(?:import|from)[ \t])
+    | (?P<stray>['"])
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def get_statement_end(source: str, start: int):
+    """Find the end of the logical line starting at `start`, following brackets and
+    backslash continuations."""
+    end = start
+    depth = 0
+    while True:
+        line_end = source.find("\n", end)
+        if line_end == -1:
+            return len(source)
+        line = source[end:line_end]
+        code = line.split("#", 1)[0]
+        depth += code.count("(") - code.count(")")
+        end = line_end + 1
+        if depth <= 0 and not code.rstrip().endswith("\\"):
+            return line_end
+
+
+def scan_import_statements(source: str):
+    """Find the source of every import statement without parsing the module.
+
+    Args:
+        source (str): Python source code
+
+    Returns:
+        list: source of each import statement, or None when the source has an import
+        the scan can not reliably find
+    """
+    # statements are matched by the newline before them
+    source = "\n" + source
+    statements = []
+    for match in scan_pattern.finditer(source):
+        kind = match.lastgroup
+        if kind == "statement":
+            start = match.start() + 1
+            statements.append(source[start : get_statement_end(source, start)])
+        elif kind in ["inline", "stray"]:
+            return None
+    return statements
+
+
+def extract_imports_from_source(source, current_module_name: str = "", verbose=False):
+    """Extract the imports of Python source without building and walking its whole
+    syntax tree. Only the import statements found by a regex scan are parsed, and the
+    whole source is parsed only when the scan is unsure. Unlike
+    `extract_node_structure_from_source`, imports in every scope are found, including
+    in class bodies and in top-level `try` and `if` blocks.
+
+    Args:
+        source (str | bytes): Python source code
+        current_module_name (str, optional): name of the module, for messages.
+        verbose (bool): print more information about process
+
+    Returns:
+        list: deduplicated ImportNode list, as `extract_node_structure_from_source`
+        returns it
+    """
+    statements = None
+    if isinstance(source, bytes):
+        try:
+            source = source.decode("utf-8")
+        except UnicodeDecodeError:
+            pass
+    if isinstance(source, str):
+        statements = scan_import_statements(source)
+
+    import_nodes = []
+    if statements is not None:
+        for statement in statements:
+            try:
+                statement_nodes = ast.parse(statement.strip()).body
+            except SyntaxError:
+                # e.g. a continuation line starting with `from` in `raise e \ from x`
+                statements = None
+                break
+            import_nodes.extend(
+                n
+                for n in statement_nodes
+                if isinstance(n, (ast.Import, ast.ImportFrom))
+            )
+    if statements is None:
+        if verbose:
+            print(f"Parsing all of {current_module_name} to find its imports.")
+        import_nodes = [
+            n
+            for n in ast.walk(ast.parse(source))
+            if isinstance(n, (ast.Import, ast.ImportFrom))
+        ]
+
+    import_list = []
+    for node in import_nodes:
+        if isinstance(node, ast.Import):
+            import_list.extend(process_import_node(node))
+        else:
+            import_list.append(process_from_import_node(node))
+    return manage_module_imports(import_list)
+
+
+def extract_imports_from_script(filename, verbose=False):
+    """Extract the imports of the provided script, see `extract_imports_from_source`.
+
+    Args:
+        filename (str): script file name
+        verbose (bool): print more information about process
+
+    Returns:
+        list: deduplicated ImportNode list
+    """
+    path = Path(filename)
+    with open(path, "rb") as script_contents:
+        source = script_contents.read()
+    return extract_imports_from_source(source, path.stem, verbose=verbose)
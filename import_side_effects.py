@@ -0,0 +1,270 @@
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from code_graph import (
+    create_repo_call_edges,
+    get_call_target_name,
+    get_import_prefixes,
+    get_repo_definitions,
+    resolve_call_target,
+)
+
+# glob patterns, matched against call targets resolved through the module's imports,
+# of calls that are slow to run on import
+expensive_call_patterns = {
+    "network I/O": [
+        "urllib.request.*",
+        "*.urlopen",
+        "requests.*",
+        "httpx.*",
+        "http.client.*",
+        "socket.*",
+        "boto3.*",
+        "*.create_engine",
+        "*.connect",
+    ],
+    "model loading": [
+        "torch.load",
+        "joblib.load",
+        "*.load_model",
+        "*.load_weights",
+        "*.from_pretrained",
+        "transformers.pipeline",
+        "spacy.load",
+        "*.InferenceSession",
+        "*.saved_model.load",
+    ],
+    "subprocess": ["subprocess.*", "os.system", "os.popen"],
+    "file I/O": [
+        "open",
+        "io.open",
+        "*.read_text",
+        "*.read_bytes",
+        "*.write_text",
+        "*.write_bytes",
+        "json.load",
+        "pickle.load",
+        "yaml.*load",
+        "csv.reader",
+        "os.listdir",
+        "os.scandir",
+        "os.walk",
+        "glob.glob",
+        "shutil.*",
+        "*.read_csv",
+        "*.read_parquet",
+        "*.read_excel",
+        "*.read_json",
+        "*.read_sql",
+        "numpy.load",
+        "*.loadtxt",
+        "*.genfromtxt",
+    ],
+}
+REGEX_IN_LOOP = "regex compile in loop"
+LARGE_LITERAL = "large literal"
+regex_compile_names = ["re.compile", "regex.compile"]
+
+# how much each kind of work adds to a module's score
+flag_weights = {
+    "network I/O": 5,
+    "model loading": 5,
+    "subprocess": 4,
+    "file I/O": 3,
+    REGEX_IN_LOOP: 2,
+    LARGE_LITERAL: 1,
+}
+
+
+@dataclass
+class ImportTimeCall:
+    module: str  # module whose import runs the call
+    target: str  # call target resolved through the module's imports
+    lineno: int  # line of the call
+    loop_depth: int  # number of enclosing loops and comprehensions
+    flags: list  # kinds of expensive work, see `flag_weights`
+
+
+@dataclass
+class ModuleImportWork:
+    module: str
+    calls: list = field(default_factory=list)  # ImportTimeCall list, flagged first
+    large_literals: list = field(default_factory=list)  # (line, number of elements)
+    score: int = 0  # weighted count of the flagged work
+
+
+def get_import_aliases(module: dict):
+    """Map the names bound by a module's imports to the full names they stand for,
+    e.g. `np` to `numpy` or `join` to `os.path.join`.
+
+    Args:
+        module (dict): parsed module data
+
+    Returns:
+        dict: bound name to full dotted name
+    """
+    aliases = {}
+    for import_node in module["import_list"]:
+        if not import_node.module:
+            continue
+        bound_names = import_node.alias
+        if isinstance(bound_names, str):
+            bound_names = [bound_names]
+        for bound_name in bound_names or []:
+            aliases[bound_name] = import_node.module
+        if import_node.level == -1 and not bound_names:
+            # `import os.path` binds `os`
+            top_level = import_node.module.split(".")[0]
+            aliases.setdefault(top_level, top_level)
+        for function_name in import_node.function_names:
+            aliases[function_name] = f"{import_node.module}.{function_name}"
+    return aliases
+
+
+def resolve_external_target(target: str, aliases: dict):
+    first, _, rest = target.partition(".")
+    if first not in aliases:
+        return target
+    return f"{aliases[first]}.{rest}" if rest else aliases[first]
+
+
+def get_call_flags(target: str, loop_depth: int):
+    flags = [
+        kind
+        for kind, patterns in expensive_call_patterns.items()
+        if any(fnmatchcase(target, p) for p in patterns)
+    ]
+    if loop_depth and target in regex_compile_names:
+        flags.append(REGEX_IN_LOOP)
+    return flags
+
+
+def get_definition_flags(module_info: dict, definitions: dict):
+    """Find the kinds of expensive work each repo definition does, itself or through
+    the repo functions it calls.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+        definitions (dict): repo definitions from `get_repo_definitions`
+
+    Returns:
+        dict: qualified definition name to set of flags
+    """
+    aliases = {name: get_import_aliases(m) for name, m in module_info.items()}
+    flags = {name: set() for name in definitions}
+    callers = {}
+    edges = create_repo_call_edges(
+        module_info,
+        include_body_commands=False,
+        definitions=definitions,
+        with_calls=True,
+    )
+    for s, t, call in edges:
+        if t in definitions:
+            callers.setdefault(t, set()).add(s)
+        else:
+            target = resolve_external_target(t, aliases[definitions[s][0]])
+            flags[s].update(get_call_flags(target, call.loop_depth))
+    # push flags up to the callers until nothing changes
+    to_visit = [name for name, name_flags in flags.items() if name_flags]
+    while to_visit:
+        name = to_visit.pop()
+        for caller in callers.get(name, ()):
+            if not flags[name] <= flags[caller]:
+                flags[caller] |= flags[name]
+                to_visit.append(caller)
+    return flags
+
+
+def create_import_side_effect_report(
+    module_info: dict, min_literal_elements: int = 1000, include_unflagged=True
+):
+    """List the work each module does when it is imported: the calls made by top-level
+    code outside of `if __name__ == "__main__":` blocks, and large literals. Calls are
+    resolved to repo definitions or, through the module's imports, to full external
+    names and flagged when they match `expensive_call_patterns`, or when the repo
+    function they call does such work somewhere down its call chain. Calls in the body
+    of a lambda only run when it is called and are left out. Large literals are the
+    ones the parser recorded, see `dep_parser.find_import_time_literals`.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+        min_literal_elements (int, optional): smallest literal to report, the parser
+        only records literals of at least `dep_parser.MIN_RECORDED_LITERAL_ELEMENTS`.
+        Defaults to 1000.
+        include_unflagged (bool, optional): also list calls that match no pattern.
+        Defaults to True.
+
+    Returns:
+        list: ModuleImportWork list, highest score first
+    """
+    definitions = get_repo_definitions(module_info)
+    definition_flags = get_definition_flags(module_info, definitions)
+    report = []
+    for module_name, module in module_info.items():
+        prefixes = get_import_prefixes(module, module_info.keys())
+        aliases = get_import_aliases(module)
+        work = ModuleImportWork(module=module_name)
+        for call in module["call_list"]:
+            if call.in_main_guard or call.in_function_body:
+                continue
+            target = get_call_target_name(call)
+            resolved = resolve_call_target(target, module_name, definitions, prefixes)
+            if resolved in definitions:
+                flags = sorted(definition_flags[resolved])
+            else:
+                resolved = resolve_external_target(target, aliases)
+                flags = get_call_flags(resolved, call.loop_depth)
+            if not flags and not include_unflagged:
+                continue
+            work.calls.append(
+                ImportTimeCall(
+                    module=module_name,
+                    target=resolved,
+                    lineno=call.call_lineno,
+                    loop_depth=call.loop_depth,
+                    flags=flags,
+                )
+            )
+            work.score += sum(flag_weights[f] for f in flags) * (1 + call.loop_depth)
+
+        work.large_literals = [
+            (lineno, element_count)
+            for lineno, element_count in module.get("import_time_literals", [])
+            if element_count >= min_literal_elements
+        ]
+        work.score += flag_weights[LARGE_LITERAL] * len(work.large_literals)
+
+        work.calls.sort(key=lambda c: (not c.flags, c.lineno))
+        if work.calls or work.large_literals:
+            report.append(work)
+    report.sort(key=lambda w: (-w.score, -len(w.calls), w.module))
+    return report
+
+
+def create_import_side_effect_report_description(report: list, limit: int = 20):
+    """Describe the import time work of each module as markdown.
+
+    Args:
+        report (list): ModuleImportWork list from `create_import_side_effect_report`
+        limit (int, optional): maximum number of calls listed per module. Defaults to 20.
+
+    Returns:
+        str: markdown description
+    """
+    contents = []
+    for work in report:
+        contents.append(f"## {work.module} (score {work.score})")
+        contents.append("")
+        contents.append("| line | call | loop depth | flags |")
+        contents.append("| ---: | --- | ---: | --- |")
+        for c in work.calls[:limit]:
+            contents.append(
+                f"| {c.lineno} | {c.target} | {c.loop_depth} | {', '.join(c.flags)} |"
+            )
+        for lineno, element_count in work.large_literals:
+            contents.append(
+                f"| {lineno} | literal with {element_count} elements | 0 "
+                f"| {LARGE_LITERAL} |"
+            )
+        contents.append("")
+    return "\n".join(contents)
@@ -0,0 +1,259 @@
+import ast
+import re
+from functools import cached_property
+from importlib.util import decode_source
+from dep_parser import (
+    ClassNode,
+    FuncDefNode,
+    add_import,
+    annotate_loop_depth,
+    find_import_time_literals,
+    get_class_metrics,
+    is_main_guard,
+    manage_module_imports,
+    process_func_def_children,
+    process_func_def_node,
+    process_script_work,
+)
+
+# a function body needs a walk at parse time only if it defines helpers or imports
+nested_work_pattern = re.compile(r"\bdef[ \t]|\bimport\b")
+
+
+class LazyModuleSource:
+    """Source of a module and the parse context its lazy definitions need to find their
+    calls later, exactly as `parse_module_node` would have found them."""
+
+    def __init__(self, source: str, class_names: list, node_filter=None):
+        self.source = source
+        # start of every line, and the end of the source for a last line without newline
+        self.line_offsets = [0] + [m.end() for m in re.finditer("\n", source)]
+        self.line_offsets.append(len(source))
+        self.class_names = class_names
+        self.node_filter = node_filter
+        self.import_list = []  # imports in the order `parse_module_node` meets them
+
+    def get_segment(self, start_lineno: int, end_lineno: int):
+        """Get the source of the lines from `start_lineno` to `end_lineno`, inclusive."""
+        start = self.line_offsets[start_lineno - 1]
+        return self.source[start : self.line_offsets[end_lineno]]
+
+    def parse_definition(self, start_lineno: int, end_lineno: int, col_offset: int):
+        """Parse the source of a single definition."""
+        segment = self.get_segment(start_lineno, end_lineno)
+        if col_offset:
+            # an indented definition, e.g. a method, parses as the body of a block
+            node = ast.parse("if 1:\n" + segment).body[0].body[0]
+            ast.increment_lineno(node, start_lineno - 2)
+        else:
+            node = ast.parse(segment).body[0]
+            ast.increment_lineno(node, start_lineno - 1)
+        return node
+
+    def parse_calls(self, func_def):
+        """Parse the calls of a definition, returning a FuncDefNode with its calls and
+        metrics."""
+        node = self.parse_definition(
+            func_def.start_lineno, func_def.end_lineno, func_def.col_offset
+        )
+        annotate_loop_depth(node)
+        parsed_def = process_func_def_node(
+            node, func_def.module, defined_in=func_def.defined_in
+        )
+        if func_def.import_count is None:
+            # methods are parsed without the module's imports
+            import_list = []
+        else:
+            import_list = self.import_list[: func_def.import_count]
+        process_func_def_children(
+            node,
+            parsed_def,
+            module_func_defs=[],
+            call_list=parsed_def.calls,
+            import_list=import_list,
+            class_names=self.class_names,
+            node_filter=self.node_filter,
+        )
+        return parsed_def
+
+
+class LazyFuncDefNode(FuncDefNode):
+    """FuncDefNode whose calls and metrics are parsed from the module source on first
+    access and then kept."""
+
+    def __init__(
+        self,
+        node: ast.AST,
+        module: str,
+        defined_in: str,
+        loader: LazyModuleSource,
+        import_count: int = None,
+    ):
+        self.name = node.name
+        self.module = module
+        self.defined_in = defined_in
+        self.start_lineno = node.lineno
+        self.end_lineno = node.end_lineno
+        self.col_offset = node.col_offset
+        self.import_count = import_count  # imports seen before it, None for methods
+        self.loader = loader
+
+    def __getattr__(self, name):
+        # only called for missing attributes, so once parsed `calls` costs nothing
+        loader = self.__dict__.get("loader")
+        if name != "calls" or loader is None:
+            raise AttributeError(name)
+        parsed_def = loader.parse_calls(self)
+        self.calls = parsed_def.calls
+        self.__dict__["metrics"] = parsed_def.metrics
+        self.loader = None
+        return self.calls
+
+    @cached_property
+    def metrics(self):
+        # shadows the `FuncDefNode` default, parsing the calls also stores the metrics
+        self.calls
+        return self.__dict__["metrics"]
+
+
+class LazyClassNode(ClassNode):
+    """ClassNode whose metrics are combined from its methods on first access, so they
+    do not make the methods parse their calls."""
+
+    def __init__(self, node: ast.AST, methods: list):
+        self.name = node.name
+        self.module = None
+        self.methods = methods
+        self.lines = node.end_lineno - node.lineno + 1
+        self.body_statement_count = len(node.body)
+
+    @cached_property
+    def metrics(self):
+        return get_class_metrics(self.lines, self.body_statement_count, self.methods)
+
+
+def get_nested_work(node: ast.AST):
+    """Walk a function body the way `process_func_def_children` does and return its
+    helper definitions and imports."""
+    return [
+        grandchild
+        for child in node.body
+        for grandchild in ast.walk(child)
+        if isinstance(
+            grandchild,
+            (ast.FunctionDef, ast.AsyncFunctionDef, ast.Import, ast.ImportFrom),
+        )
+    ]
+
+
+def parse_module_skeleton(
+    module_node: ast.Module,
+    loader: LazyModuleSource,
+    current_module_name=None,
+    verbose=False,
+):
+    """Like `parse_module_node`, but only the module's top-level code is walked. The
+    calls of functions and methods are parsed when first used."""
+    class_list = []
+    func_defs = []
+    import_list = loader.import_list
+    call_list = []
+
+    module_body = module_node.body
+    class_nodes = [n for n in module_body if isinstance(n, ast.ClassDef)]
+    other_module_nodes = [n for n in module_body if not isinstance(n, ast.ClassDef)]
+    node_filter = loader.node_filter
+
+    for class_node in class_nodes:
+        if node_filter is not None and not node_filter.keeps_class(class_node.name):
+            continue
+        class_methods = [
+            LazyFuncDefNode(n, class_node.name, class_node.name, loader)
+            for n in class_node.body
+            if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))
+        ]
+        class_list.append(LazyClassNode(class_node, class_methods))
+
+    script_objects = {}
+    for node in other_module_nodes:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            function_def = LazyFuncDefNode(
+                node, current_module_name, None, loader, import_count=len(import_list)
+            )
+            if verbose:
+                print("Function definition:", function_def.name)
+            segment = loader.get_segment(node.lineno, node.end_lineno)
+            if nested_work_pattern.search(segment):
+                for child in get_nested_work(node):
+                    if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        helper_function_module = current_module_name + node.name
+                        func_defs.append(
+                            process_func_def_node(
+                                child, helper_function_module, defined_in=node.name
+                            )
+                        )
+                    else:
+                        add_import(child, import_list)
+            func_defs.append(function_def)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            add_import(node, import_list)
+        else:
+            annotate_loop_depth(node)
+            process_script_work(
+                node,
+                current_module_name,
+                func_defs=func_defs,
+                call_list=call_list,
+                import_list=import_list,
+                class_names=loader.class_names,
+                objects=script_objects,
+                in_main_guard=is_main_guard(node),
+                node_filter=node_filter,
+            )
+
+    return import_list, call_list, func_defs, class_list
+
+
+def extract_lazy_node_structure_from_source(
+    source,
+    current_module_name: str,
+    verbose=False,
+    node_filter=None,
+    with_literals: bool = False,
+):
+    """Extract the same data as `dep_parser.extract_node_structure_from_source`, but
+    leave the calls of every function and method to be parsed on first access. Modules
+    whose definitions are mostly never looked at, e.g. in an import or symbol crawl,
+    are crawled much faster.
+
+    Args:
+        source (str | bytes): Python source code
+        current_module_name (str): name of the module the source belongs to
+        verbose (bool): print more information about process
+        node_filter (NodeFilter, optional): calls and classes to leave out. Defaults to None.
+        with_literals (bool, optional): also return the large literals, like
+        `dep_parser.extract_node_structure_from_source`. Defaults to False.
+
+    Returns:
+        list: collections of code data
+    """
+    if verbose:
+        print(f"Extracting the skeleton of {current_module_name}.")
+    if isinstance(source, bytes):
+        # handles coding declarations and newlines the way `ast.parse` does
+        source = decode_source(source)
+    module_node = ast.parse(source)
+    class_names = [n.name for n in module_node.body if isinstance(n, ast.ClassDef)]
+    loader = LazyModuleSource(source, class_names, node_filter=node_filter)
+    import_list, call_list, func_defs, class_list = parse_module_skeleton(
+        module_node, loader, current_module_name, verbose=verbose
+    )
+    node_structure = (
+        manage_module_imports(import_list),
+        call_list,
+        func_defs,
+        class_list,
+    )
+    if with_literals:
+        return (*node_structure, find_import_time_literals(module_node))
+    return node_structure
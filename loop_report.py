@@ -0,0 +1,111 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from code_graph import create_repo_call_edges, get_repo_definitions
+
+# call names that usually mean a database query, network request or disk access, the
+# calls that turn into N+1 patterns when made once per loop iteration
+query_like_names = [
+    "execute",
+    "executemany",
+    "query",
+    "fetch",
+    "fetchone",
+    "fetchall",
+    "filter",
+    "save",
+    "commit",
+    "refresh_from_db",
+    "request",
+    "urlopen",
+    "post",
+    "put",
+    "patch",
+    "read_csv",
+    "read_sql",
+    "load",
+    "dump",
+]
+
+
+@dataclass
+class LoopCallSite:
+    caller: str  # qualified name of the calling definition
+    callee: str  # qualified name, or external name, of the called function
+    module: str  # module the call is made in
+    lineno: int  # line of the call
+    loop_depth: int  # number of enclosing loops and comprehensions
+    in_async_for: bool  # made inside an `async for`
+    callee_fan_out: int  # number of distinct functions the callee itself calls
+    query_like: bool  # the callee name looks like I/O, see `query_like_names`
+
+
+def create_hot_loop_report(
+    module_info: dict, min_loop_depth: int = 1, ignored_names: list = None
+):
+    """Rank the call sites made inside loops by loop depth and by how much work the
+    callee fans out to, to find N+1 query patterns and expensive calls in inner loops.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+        min_loop_depth (int, optional): skip calls in fewer loops. Defaults to 1.
+        ignored_names (list, optional): callee names to leave out, e.g.
+        `viz_code.low_level_functions`. Defaults to None.
+
+    Returns:
+        list: LoopCallSite list, worst first
+    """
+    if ignored_names is None:
+        ignored_names = []
+    definitions = get_repo_definitions(module_info)
+    edges = create_repo_call_edges(
+        module_info, definitions=definitions, with_calls=True
+    )
+    callees = defaultdict(set)
+    for s, t, _ in edges:
+        callees[s].add(t)
+
+    call_sites = []
+    for s, t, call in edges:
+        if call.loop_depth < min_loop_depth or t in ignored_names:
+            continue
+        module_name = definitions[s][0] if s in definitions else s.split(".")[0]
+        call_sites.append(
+            LoopCallSite(
+                caller=s,
+                callee=t,
+                module=module_name,
+                lineno=call.call_lineno,
+                loop_depth=call.loop_depth,
+                in_async_for=call.in_async_for,
+                callee_fan_out=len(callees.get(t, ())),
+                query_like=call.name in query_like_names,
+            )
+        )
+    call_sites.sort(
+        key=lambda c: (-c.loop_depth, -c.query_like, -c.callee_fan_out, c.caller)
+    )
+    return call_sites
+
+
+def create_hot_loop_report_description(call_sites: list, limit: int = 50):
+    """Describe the ranked loop call sites as a markdown table.
+
+    Args:
+        call_sites (list): LoopCallSite list from `create_hot_loop_report`
+        limit (int, optional): maximum number of rows. Defaults to 50.
+
+    Returns:
+        str: markdown description
+    """
+    contents = [
+        "| caller | callee | location | loop depth | async for | callee fan-out | I/O |",
+        "| --- | --- | --- | ---: | --- | ---: | --- |",
+    ]
+    for c in call_sites[:limit]:
+        async_for = "yes" if c.in_async_for else ""
+        query_like = "yes" if c.query_like else ""
+        contents.append(
+            f"| {c.caller} | {c.callee} | {c.module}:{c.lineno} | {c.loop_depth} "
+            f"| {async_for} | {c.callee_fan_out} | {query_like} |"
+        )
+    return "\n".join(contents)
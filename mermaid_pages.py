@@ -0,0 +1,265 @@
+from collections import defaultdict
+from pathlib import Path
+from code_graph import create_function_call_edges, create_collapsed_function_call_edges
+from viz_code import (
+    NodeIdInterner,
+    generate_desc,
+    get_subgraph_header,
+    low_level_functions,
+)
+
+
+def get_graph_units(module: dict, edges: list, wanted_classes: list = None):
+    """Group the graph nodes into units that should stay on the same page: the methods
+    of a class, the functions of an imported module, or a single other node.
+
+    Args:
+        module (dict): parsed module data
+        edges (list): edges of the module graph
+        wanted_classes (list, optional): only group the methods of these classes.
+        Defaults to None.
+
+    Returns:
+        list: (subgraph header, member node names) pairs, with a None header for single
+        nodes
+    """
+    # dict keeps the nodes in edge order with fast membership checks
+    nodes = dict.fromkeys(n for e in edges for n in e[:2])
+
+    unit_of_node = {}
+    units = []
+    for class_node in module["class_list"]:
+        if wanted_classes is not None and class_node.name not in wanted_classes:
+            continue
+        header = f"subgraph {class_node.name}"
+        members = [f"{class_node.name}.{m.name}" for m in class_node.methods]
+        members = [m for m in members if m in nodes and m not in unit_of_node]
+        if members:
+            unit_of_node.update((m, len(units)) for m in members)
+            units.append((header, members))
+    for imported_module in module["import_list"]:
+        names = [imported_module.module]
+        aliases = imported_module.alias
+        names.extend([aliases] if isinstance(aliases, str) else aliases or [])
+        members = [
+            n
+            for n in nodes
+            if n not in unit_of_node
+            and "." in n
+            and any(n.startswith(name + ".") for name in names if name)
+        ]
+        if members:
+            unit_of_node.update((m, len(units)) for m in members)
+            units.append((get_subgraph_header(imported_module), members))
+    for n in nodes:
+        if n not in unit_of_node:
+            unit_of_node[n] = len(units)
+            units.append((None, [n]))
+    return units
+
+
+def partition_graph(edges: list, units: list, max_nodes: int, max_edges: int):
+    """Assign units to pages under node and edge budgets. Pages are grown greedily by
+    adding the unit most strongly connected to the current page, so cut edges are few.
+    When no connected unit fits, the page is filled up with the other units, biggest
+    first, so small disconnected units share pages. Units bigger than a page are split.
+
+    Args:
+        edges (list): graph edges
+        units (list): units from `get_graph_units`
+        max_nodes (int): maximum number of nodes on a page
+        max_edges (int): maximum number of edges drawn on a page, including the edges
+        to other pages
+
+    Returns:
+        list: pages, each a list of units
+    """
+    split_units = []
+    for header, members in units:
+        for i in range(0, len(members), max_nodes):
+            split_units.append((header, members[i : i + max_nodes]))
+    units = split_units
+
+    unit_of_node = {n: i for i, (_, members) in enumerate(units) for n in members}
+    unit_edges = defaultdict(set)  # unit to indices of the edges touching it
+    connections = defaultdict(lambda: defaultdict(int))
+    for edge_index, e in enumerate(edges):
+        s_unit = unit_of_node[e[0]]
+        t_unit = unit_of_node[e[1]]
+        unit_edges[s_unit].add(edge_index)
+        unit_edges[t_unit].add(edge_index)
+        if s_unit != t_unit:
+            connections[s_unit][t_unit] += 1
+            connections[t_unit][s_unit] += 1
+
+    # units by size, for starting and filling up pages
+    order = sorted(range(len(units)), key=lambda u: (-len(unit_edges[u]), u))
+    remaining = set(range(len(units)))
+    pages = []
+    while remaining:
+        # start each page from the biggest remaining unit
+        first = next(u for u in order if u in remaining)
+        remaining.discard(first)
+        page = [first]
+        node_count = len(units[first][1])
+        page_edges = set(unit_edges[first])
+        candidates = defaultdict(int)
+        for other, weight in connections[first].items():
+            if other in remaining:
+                candidates[other] += weight
+
+        def fits(unit):
+            new_edge_count = len(unit_edges[unit] - page_edges)
+            return (
+                node_count + len(units[unit][1]) <= max_nodes
+                and len(page_edges) + new_edge_count <= max_edges
+            )
+
+        # pages only grow, so a unit that does not fit never fits this page later
+        fill_position = 0
+        while True:
+            if candidates:
+                best = max(candidates, key=lambda u: (candidates[u], -u))
+                del candidates[best]
+                if not fits(best):
+                    continue
+            else:
+                while fill_position < len(order) and (
+                    order[fill_position] not in remaining
+                    or not fits(order[fill_position])
+                ):
+                    fill_position += 1
+                if fill_position == len(order):
+                    break
+                best = order[fill_position]
+            new_edges = unit_edges[best] - page_edges
+            remaining.discard(best)
+            page.append(best)
+            node_count += len(units[best][1])
+            page_edges |= new_edges
+            for other, weight in connections[best].items():
+                if other in remaining:
+                    candidates[other] += weight
+        pages.append([units[u] for u in page])
+    return pages
+
+
+def get_page_filename(page_prefix: str, page_number: int):
+    return f"{page_prefix}_{page_number}.md"
+
+
+def create_page_description(
+    page: list, page_of_node: dict, edges: list, page_prefix: str
+):
+    """Create the mermaid description of one page. Edges to nodes on other pages end in
+    a stub node that links to that page."""
+    members = set(n for _, unit_members in page for n in unit_members)
+    page_edges = [e for e in edges if e[0] in members and e[1] in members]
+    stub_lines = []
+    stubs = {}
+    node_ids = NodeIdInterner()
+    for e in edges:
+        s, t = e[:2]
+        if (s in members) == (t in members):
+            continue
+        outside = t if s in members else s
+        other_page = page_of_node[outside]
+        if outside not in stubs:
+            # interned under a name no graph node can have, so stubs never clash
+            stub_id = node_ids.get_id(f"stub{len(stubs)}<>")
+            stubs[outside] = stub_id
+            stub_lines.append(f'\t{stub_id}[["↪ page {other_page}: {outside}"]];')
+            other_page_filename = get_page_filename(page_prefix, other_page)
+            stub_lines.append(f'\tclick {stub_id} "{other_page_filename}" "{outside}";')
+        inside = s if s in members else t
+        inside_node = f"{node_ids.get_id(inside)}[{inside}]"
+        arrow = "-->"
+        if len(e) == 3 and e[2] != 1:
+            arrow = f"-->|{e[2]}|"
+        if s in members:
+            stub_lines.append(f"\t{inside_node} {arrow} {stubs[outside]};")
+        else:
+            stub_lines.append(f"\t{stubs[outside]} {arrow} {inside_node};")
+
+    subgraphs = []
+    for header, unit_members in page:
+        if header is None:
+            continue
+        member_ids = ["\t" + node_ids.get_id(n) for n in unit_members]
+        subgraphs.append("\n".join([header, *member_ids, "end"]))
+    return generate_desc(
+        page_edges, other_content=stub_lines + subgraphs, node_ids=node_ids
+    )
+
+
+def write_partitioned_graph_pages(
+    module_info: dict,
+    output_dir,
+    page_prefix: str = "graph",
+    max_nodes: int = 60,
+    max_edges: int = 120,
+    collapse_multiple_call_edges: bool = False,
+    wanted_classes: list = None,
+    include_body_commands: bool = True,
+    include_function_defs: bool = True,
+):
+    """Split the graph of a module over several Markdown pages that each render quickly
+    on their own. Classes and imported modules are kept together where they fit, edges
+    between pages become stub nodes linking to the other page, and an index page lists
+    all pages.
+
+    Args:
+        module_info (dict): module info parsed with dep_parser
+        output_dir (str): directory to write the Markdown files to
+        page_prefix (str, optional): file name prefix of the pages. Defaults to "graph".
+        max_nodes (int, optional): node budget of a page. Defaults to 60.
+        max_edges (int, optional): edge budget of a page. Defaults to 120.
+        collapse_multiple_call_edges (bool, optional): see `create_graph_description`.
+        Defaults to False.
+
+    Returns:
+        list: paths of the written files, index first
+    """
+    edge_options = dict(
+        wanted_classes=wanted_classes,
+        include_body_commands=include_body_commands,
+        include_function_defs=include_function_defs,
+    )
+    if collapse_multiple_call_edges:
+        edges = create_collapsed_function_call_edges(module_info, **edge_options)
+        edges = list(dict.fromkeys(edges))
+    else:
+        edges = create_function_call_edges(module_info, **edge_options)
+    edges = [e for e in edges if e[1] not in low_level_functions]
+
+    units = get_graph_units(module_info, edges, wanted_classes=wanted_classes)
+    pages = partition_graph(edges, units, max_nodes=max_nodes, max_edges=max_edges)
+    page_of_node = {
+        n: page_number
+        for page_number, page in enumerate(pages, start=1)
+        for _, members in page
+        for n in members
+    }
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    index_filename = f"{page_prefix}_index.md"
+    written = [output_dir / index_filename]
+    index_lines = [f"# {page_prefix}", ""]
+    for page_number, page in enumerate(pages, start=1):
+        description = create_page_description(page, page_of_node, edges, page_prefix)
+        page_filename = get_page_filename(page_prefix, page_number)
+        headers = [h.replace("subgraph ", "") for h, _ in page if h is not None]
+        node_count = sum(len(members) for _, members in page)
+        summary = f"{node_count} nodes"
+        if headers:
+            summary += ", " + ", ".join(headers)
+        index_lines.append(f"- [Page {page_number}]({page_filename}): {summary}")
+        page_file = output_dir / page_filename
+        page_file.write_text(
+            f"# {page_prefix}, page {page_number} of {len(pages)}\n\n"
+            f"[Index]({index_filename})\n\n{description}\n"
+        )
+        written.append(page_file)
+    (output_dir / index_filename).write_text("\n".join(index_lines) + "\n")
+    return written
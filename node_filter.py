@@ -0,0 +1,73 @@
+import fnmatch
+import re
+
+
+def get_call_node_target_name(module: list, name: str):
+    """Name a call target the way the graphs do, see `code_graph.get_call_target_name`."""
+    if module:
+        return ".".join(module) + "." + name
+    return name
+
+
+class NodeFilter:
+    """Filter applied while parsing, so excluded calls and classes are never stored in
+    the module info. Decisions are memoized per call target name.
+
+    Args:
+        excluded_names (list, optional): call target names to drop, as they appear in
+        graphs, e.g. `len` or `np.array`. `viz_code.low_level_functions` gives the
+        render time defaults. Defaults to None.
+        excluded_patterns (list, optional): glob patterns, or regular expressions
+        prefixed with `re:`, matched against the whole target name. Defaults to None.
+        excluded_modules (list, optional): drop calls into these modules and their
+        submodules, e.g. `os` drops `os.path.join`. Defaults to None.
+        wanted_classes (list, optional): only keep these classes. Defaults to all.
+    """
+
+    def __init__(
+        self,
+        excluded_names: list = None,
+        excluded_patterns: list = None,
+        excluded_modules: list = None,
+        wanted_classes: list = None,
+    ):
+        self.excluded_names = frozenset(excluded_names or [])
+        self.excluded_modules = tuple(excluded_modules or [])
+        self.wanted_classes = None if wanted_classes is None else set(wanted_classes)
+        excluded_patterns = list(excluded_patterns or [])
+        regexes = [
+            p[len("re:") :] if p.startswith("re:") else fnmatch.translate(p)
+            for p in excluded_patterns
+        ]
+        self.pattern = None
+        if regexes:
+            self.pattern = re.compile("|".join(f"(?:{r})" for r in regexes))
+        # identifies the filter so parse results made with another filter are not reused
+        self.key = (
+            tuple(sorted(self.excluded_names)),
+            tuple(excluded_patterns),
+            tuple(sorted(self.excluded_modules)),
+            None if wanted_classes is None else tuple(sorted(self.wanted_classes)),
+        )
+        self.decisions = {}  # target name to whether it is excluded
+
+    def excludes(self, target_name: str):
+        excluded = self.decisions.get(target_name)
+        if excluded is None:
+            excluded = target_name in self.excluded_names
+            if not excluded and self.pattern is not None:
+                excluded = self.pattern.fullmatch(target_name) is not None
+            if not excluded and self.excluded_modules:
+                module_name = target_name.rpartition(".")[0]
+                excluded = any(
+                    module_name == m or module_name.startswith(m + ".")
+                    for m in self.excluded_modules
+                )
+            self.decisions[target_name] = excluded
+        return excluded
+
+    def excludes_call(self, call):
+        return self.excludes(get_call_node_target_name(call.module, call.name))
+
+    def keeps_class(self, class_name: str):
+        return self.wanted_classes is None or class_name in self.wanted_classes
@@ -0,0 +1,306 @@
+import itertools
+import json
+import re
+from pathlib import Path
+from dep_parser import extract_node_structure_from_source
+
+CHUNK_SIZE = 1 << 20
+
+# cell magics whose body is still Python code
+python_cell_magics = ["time", "timeit", "capture", "prun", "python", "python3"]
+# line magics that run the Python statement that follows them
+python_line_magics = ["time", "timeit", "prun"]
+
+string_end_pattern = re.compile(r'["\\]')
+structure_pattern = re.compile(r'["\[\]{}]')
+magic_assignment_pattern = re.compile(r"^(\s*[\w.\[\], ]+=\s*)[!%]")
+help_pattern = re.compile(r"^(\?{1,2}[\w.]+|[\w.]+\?{1,2})$")
+
+
+class JsonStreamReader:
+    """Minimal pull reader over a JSON file. Small values are decoded with `json`, large
+    values can be skipped without ever being held in memory as a whole."""
+
+    def __init__(self, file):
+        self.file = file
+        self.buffer = ""
+        self.position = 0
+        self.decoder = json.JSONDecoder()
+
+    def read_more(self):
+        chunk = self.file.read(CHUNK_SIZE)
+        if not chunk:
+            raise ValueError("unexpected end of JSON document")
+        # drop what has already been consumed so memory stays bounded
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+
+    def peek(self):
+        while True:
+            while self.position < len(self.buffer):
+                if not self.buffer[self.position].isspace():
+                    return self.buffer[self.position]
+                self.position += 1
+            self.read_more()
+
+    def expect(self, character: str):
+        if self.peek() != character:
+            raise ValueError(f"expected {character!r} in JSON document")
+        self.position += 1
+
+    def read_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                self.read_more()
+                continue
+            # a number may continue in the next chunk
+            if end == len(self.buffer) and isinstance(value, (int, float)):
+                try:
+                    self.read_more()
+                    continue
+                except ValueError:
+                    pass
+            self.position = end
+            return value
+
+    def skip_string(self):
+        self.position += 1  # opening quote
+        while True:
+            match = string_end_pattern.search(self.buffer, self.position)
+            if match is None:
+                self.position = len(self.buffer)
+                self.read_more()
+                continue
+            if match.group() == '"':
+                self.position = match.end()
+                return
+            # escaped character, make sure it is in the buffer before stepping over it
+            if match.end() >= len(self.buffer):
+                self.position = match.start()
+                self.read_more()
+                continue
+            self.position = match.end() + 1
+
+    def skip_value(self):
+        """Step over the next value without decoding it."""
+        first = self.peek()
+        if first == '"':
+            self.skip_string()
+            return
+        if first not in "[{":
+            self.read_value()
+            return
+        self.position += 1
+        depth = 1
+        while depth:
+            match = structure_pattern.search(self.buffer, self.position)
+            if match is None:
+                self.position = len(self.buffer)
+                self.read_more()
+                continue
+            character = match.group()
+            if character == '"':
+                self.position = match.start()
+                self.skip_string()
+                continue
+            depth += 1 if character in "[{" else -1
+            self.position = match.end()
+
+    def iter_object_keys(self):
+        """Yield the keys of the next object. The caller must read or skip each value
+        before asking for the next key."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.position += 1
+                continue
+            self.expect("}")
+            return
+
+    def iter_array(self):
+        """Yield once per element of the next array. The caller must read or skip each
+        element before asking for the next one."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield
+            if self.peek() == ",":
+                self.position += 1
+                continue
+            self.expect("]")
+            return
+
+
+def read_cell(reader: JsonStreamReader):
+    cell_type = None
+    source = ""
+    for key in reader.iter_object_keys():
+        if key == "cell_type":
+            cell_type = reader.read_value()
+        elif key in ["source", "input"]:
+            source = reader.read_value()
+        else:
+            # outputs, metadata and attachments can be huge and are never needed
+            reader.skip_value()
+    if isinstance(source, list):
+        source = "".join(source)
+    return cell_type, source
+
+
+def iter_code_cells(reader: JsonStreamReader, cell_numbers=None):
+    """Yield the (cell number, source) of every code cell, for nbformat 4 and older
+    worksheet based notebooks. Cells are numbered from 1 over all cells, markdown cells
+    included, so the numbers are the ones shown in the notebook."""
+    if cell_numbers is None:
+        cell_numbers = itertools.count(1)
+    for key in reader.iter_object_keys():
+        if key == "cells":
+            for _ in reader.iter_array():
+                cell_type, source = read_cell(reader)
+                cell_number = next(cell_numbers)
+                if cell_type == "code":
+                    yield cell_number, source
+        elif key == "worksheets":
+            for _ in reader.iter_array():
+                yield from iter_code_cells(reader, cell_numbers)
+        else:
+            reader.skip_value()
+
+
+def strip_magic_line(line: str):
+    """Turn a line of IPython syntax into plain Python with the same indentation.
+
+    Args:
+        line (str): line from a notebook cell
+
+    Returns:
+        str: the line itself, the statement behind a timing magic, or `pass`
+    """
+    stripped = line.lstrip()
+    indentation = line[: len(line) - len(stripped)]
+    if stripped.startswith("%") and not stripped.startswith("%%"):
+        magic, _, statement = stripped[1:].partition(" ")
+        if magic in python_line_magics and statement.strip():
+            return indentation + statement
+        return indentation + "pass"
+    if stripped.startswith(("!", "?")):
+        return indentation + "pass"
+    if help_pattern.match(stripped.rstrip()):
+        # help lookups like `np.array?`
+        return indentation + "pass"
+    match = magic_assignment_pattern.match(line)
+    if match is not None:
+        # `files = !ls` or `result = %timeit f()`
+        return match.group(1) + "None"
+    return line
+
+
+def clean_cell_source(source: str):
+    """Strip IPython magics and shell escapes from a cell, keeping its line count.
+
+    Args:
+        source (str): cell source
+
+    Returns:
+        list: cleaned lines of the cell
+    """
+    lines = source.splitlines()
+    if not lines:
+        return []
+    first = lines[0].strip()
+    if first.startswith("%%"):
+        cell_magic = first[2:].split(" ")[0]
+        if cell_magic not in python_cell_magics:
+            # e.g. %%bash or %%sql, nothing in the cell is Python
+            return ["" for _ in lines]
+        lines[0] = ""
+        return [lines[0]] + [strip_magic_line(line) for line in lines[1:]]
+    return [strip_magic_line(line) for line in lines]
+
+
+def extract_notebook_cells(filename):
+    """Stream the code cells out of a notebook, stripped of IPython syntax.
+
+    Args:
+        filename (str): notebook file name
+
+    Returns:
+        dict: cell number to the cleaned lines of each code cell
+    """
+    cells = {}
+    with open(filename, "r", encoding="utf-8") as notebook_file:
+        reader = JsonStreamReader(notebook_file)
+        for cell_number, cell_source in iter_code_cells(reader):
+            cells[cell_number] = clean_cell_source(cell_source)
+    return cells
+
+
+def combine_cells(cells: dict):
+    """Combine notebook cells into the source of one module.
+
+    Args:
+        cells (dict): cell number to the lines of each cell
+
+    Returns:
+        tuple: (source, line_map) where line_map[i] is the (cell number, line) pair,
+        both counted from 1, of line i + 1 of the source
+    """
+    lines = []
+    line_map = []
+    for cell_number, cell_lines in cells.items():
+        lines.extend(cell_lines)
+        line_map.extend((cell_number, i) for i in range(1, len(cell_lines) + 1))
+    return "\n".join(lines) + "\n", line_map
+
+
+def extract_node_structure_from_notebook(
+    filename, verbose=False, node_filter=None, with_literals: bool = False
+):
+    """Extract data from the code cells of a notebook.
+
+    Args:
+        filename (str): notebook file name
+        verbose (bool): print more information about process
+        node_filter (NodeFilter, optional): calls and classes to leave out. Defaults to None.
+        with_literals (bool, optional): passed on to `extract_node_structure_from_source`.
+        Defaults to False.
+
+    Returns:
+        tuple: the `extract_node_structure_from_source` collections followed by the
+        line map of the combined source
+    """
+    current_module_name = Path(filename).stem
+    cells = extract_notebook_cells(filename)
+    while True:
+        source, line_map = combine_cells(cells)
+        try:
+            node_structure = extract_node_structure_from_source(
+                source,
+                current_module_name,
+                verbose=verbose,
+                node_filter=node_filter,
+                with_literals=with_literals,
+            )
+            return (*node_structure, line_map)
+        except SyntaxError as error:
+            # a cell that does not parse, e.g. unfinished work, is left out rather than
+            # losing the whole notebook
+            if not error.lineno or error.lineno > len(line_map):
+                raise
+            bad_cell = line_map[error.lineno - 1][0]
+            if not any(cells[bad_cell]):
+                raise
+            if verbose:
+                print(f"Skipping cell {bad_cell} of {current_module_name}: {error}")
+            cells[bad_cell] = ["" for _ in cells[bad_cell]]
@@ -0,0 +1,178 @@
+import pstats
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from code_graph import MODULE_LEVEL_NAME, create_repo_call_edges, get_repo_definitions
+
+builtin_method_pattern = re.compile(r"<built-in method (?:[\w.]+\.)?(\w+)>")
+object_method_pattern = re.compile(r"<method '(\w+)' of")
+
+
+@dataclass
+class ProfileStats:
+    calls: int = 0  # total number of calls, including recursive ones
+    primitive_calls: int = 0  # calls that were not induced by recursion
+    self_time: float = 0.0  # time spent in the function itself
+    cumulative_time: float = 0.0  # time spent in the function and its callees
+
+
+@dataclass
+class ProfileOverlay:
+    nodes: dict = field(default_factory=dict)  # qualified name to ProfileStats
+    edges: dict = field(default_factory=dict)  # (caller, callee) to ProfileStats
+    total_time: float = 0.0  # sum of all self times
+    unmatched: list = field(default_factory=list)  # names of external profile entries
+
+
+def load_profile_stats(profile_filenames):
+    """Load one or more profile files written by `cProfile`. Multiple files are summed.
+
+    Args:
+        profile_filenames (str | list): profile file name or list of file names
+
+    Returns:
+        dict: pstats entries, (file, line, function) to (cc, nc, tt, ct, callers)
+    """
+    if isinstance(profile_filenames, (str, Path)):
+        profile_filenames = [profile_filenames]
+    return pstats.Stats(*[str(f) for f in profile_filenames]).stats
+
+
+def get_external_profile_name(profile_key: tuple):
+    """Name a profile entry that is not defined in the crawl the way static call targets
+    are named, e.g. `<built-in method builtins.len>` becomes `len`.
+
+    Args:
+        profile_key (tuple): (file, line, function) pstats key
+
+    Returns:
+        str: name of the function
+    """
+    filename, _, function_name = profile_key
+    match = builtin_method_pattern.match(function_name) or object_method_pattern.match(
+        function_name
+    )
+    if match is not None:
+        return match.group(1)
+    if filename == "~":
+        return function_name
+    return f"{Path(filename).stem}.{function_name}"
+
+
+def get_profile_definition_index(module_info: dict):
+    """Group the repo definitions by module for matching against profile entries."""
+    definitions_by_module = defaultdict(list)
+    for qualified_name, (module_name, f) in get_repo_definitions(module_info).items():
+        definitions_by_module[module_name].append((qualified_name, f))
+    return definitions_by_module
+
+
+def match_profile_entry(profile_key: tuple, definitions_by_module: dict):
+    """Match a pstats entry to the definition it profiled. Code objects of decorated
+    functions start at the first decorator, so a definition with the same name starting
+    shortly after the profiled line also matches.
+
+    Args:
+        profile_key (tuple): (file, line, function) pstats key
+        definitions_by_module (dict): from `get_profile_definition_index`
+
+    Returns:
+        str: qualified name of the definition, None if it is not part of the crawl
+    """
+    filename, lineno, function_name = profile_key
+    module_name = Path(filename).stem
+    if module_name not in definitions_by_module:
+        return None
+    if function_name == MODULE_LEVEL_NAME:
+        return f"{module_name}.{MODULE_LEVEL_NAME}"
+    candidates = definitions_by_module[module_name]
+    same_name = [(q, f) for q, f in candidates if f.name == function_name]
+    containing = [
+        (q, f) for q, f in same_name if f.start_lineno <= lineno <= f.end_lineno
+    ]
+    if containing:
+        # the innermost definition starts last
+        return max(containing, key=lambda d: d[1].start_lineno)[0]
+    decorated = [(q, f) for q, f in same_name if f.start_lineno > lineno]
+    if decorated:
+        return min(decorated, key=lambda d: d[1].start_lineno)[0]
+    return None
+
+
+def create_profile_overlay(module_info: dict, profile_stats: dict):
+    """Match profile entries to crawled definitions and collect node and edge timings.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+        profile_stats (dict): pstats entries from `load_profile_stats`
+
+    Returns:
+        ProfileOverlay: profile data keyed by qualified names
+    """
+    definitions_by_module = get_profile_definition_index(module_info)
+    names = {}
+    overlay = ProfileOverlay()
+    for profile_key in profile_stats:
+        name = match_profile_entry(profile_key, definitions_by_module)
+        if name is None:
+            name = get_external_profile_name(profile_key)
+            overlay.unmatched.append(name)
+        names[profile_key] = name
+
+    for profile_key, (cc, nc, tt, ct, callers) in profile_stats.items():
+        name = names[profile_key]
+        node_stats = overlay.nodes.setdefault(name, ProfileStats())
+        node_stats.calls += nc
+        node_stats.primitive_calls += cc
+        node_stats.self_time += tt
+        node_stats.cumulative_time += ct
+        overlay.total_time += tt
+        for caller_key, caller_stats in callers.items():
+            caller_name = names.get(caller_key)
+            if caller_name is None:
+                caller_name = get_external_profile_name(caller_key)
+            # caller entries list the total call count first
+            edge_stats = overlay.edges.setdefault((caller_name, name), ProfileStats())
+            edge_stats.calls += caller_stats[0]
+            edge_stats.primitive_calls += caller_stats[1]
+            edge_stats.self_time += caller_stats[2]
+            edge_stats.cumulative_time += caller_stats[3]
+    return overlay
+
+
+def get_edge_profile(s: str, t: str, overlay: ProfileOverlay, edges_by_callee_name):
+    edge_stats = overlay.edges.get((s, t))
+    if edge_stats is not None:
+        return edge_stats
+    # external targets are named differently by the parser and the profiler, e.g.
+    # `np.array` and `numpy.array`, so fall back to the function name itself
+    return edges_by_callee_name.get((s, t.split(".")[-1]))
+
+
+def create_profiled_call_edges(
+    module_info: dict, overlay: ProfileOverlay, edges: list = None
+):
+    """Annotate the collapsed repo-wide static call graph with profile data.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+        overlay (ProfileOverlay): overlay from `create_profile_overlay`
+        edges (list, optional): precomputed `create_repo_call_edges` result. Defaults to
+        None.
+
+    Returns:
+        list: edges (s, t, w, edge_stats) with the static call-site count w and
+        ProfileStats of the edge, or None if the edge never ran
+    """
+    if edges is None:
+        edges = create_repo_call_edges(module_info)
+    edges_by_callee_name = {
+        (s, t.split(".")[-1]): edge_stats
+        for (s, t), edge_stats in overlay.edges.items()
+    }
+    aggregated_calls = Counter(edges)
+    return [
+        (s, t, w, get_edge_profile(s, t, overlay, edges_by_callee_name))
+        for (s, t), w in aggregated_calls.items()
+    ]
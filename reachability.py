@@ -0,0 +1,186 @@
+from array import array
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from code_graph import (
+    MAIN_GUARD_NAME,
+    MODULE_LEVEL_NAME,
+    create_repo_call_edges,
+    get_repo_definitions,
+)
+
+# entry point names that stand for a group of nodes rather than a single definition
+MODULE_LEVEL_ENTRY = "module"  # top-level code of every module, run on import
+MAIN_GUARD_ENTRY = "main"  # every `if __name__ == "__main__":` block
+
+
+@dataclass
+class UnreachableDefinition:
+    name: str  # qualified name of the definition
+    module: str  # module the definition is in
+    start_lineno: int
+    end_lineno: int
+    lines: int  # size of the definition in lines
+
+
+@dataclass
+class ReachabilityReport:
+    entry_points: list  # entry point specifications used
+    reached_by: dict = field(default_factory=dict)  # definition name to entry points
+    unreachable: list = field(default_factory=list)  # UnreachableDefinition list
+    total_lines: int = 0  # lines in all definitions
+    unreachable_lines: int = 0  # lines in unreachable definitions
+
+
+def create_csr_graph(node_count: int, edges):
+    """Pack integer edges into compressed sparse row arrays, dropping duplicates.
+
+    Args:
+        node_count (int): number of nodes
+        edges (iterable): (s, t) integer pairs
+
+    Returns:
+        tuple: (offsets, targets) where the successors of node i are
+        targets[offsets[i]:offsets[i + 1]]
+    """
+    edges = sorted(set(edges))
+    offsets = array("q", [0] * (node_count + 1))
+    for s, _ in edges:
+        offsets[s + 1] += 1
+    for i in range(node_count):
+        offsets[i + 1] += offsets[i]
+    targets = array("q", [t for _, t in edges])
+    return offsets, targets
+
+
+def propagate_entry_bits(offsets, targets, entry_masks: dict):
+    """Propagate entry point bitsets along the graph. Each node ends up with one bit for
+    every entry point group it can be reached from, so all groups are handled in a
+    single pass instead of one traversal per entry point.
+
+    Args:
+        offsets (array): CSR offsets from `create_csr_graph`
+        targets (array): CSR targets from `create_csr_graph`
+        entry_masks (dict): entry node id to its initial bitset
+
+    Returns:
+        list: bitset of reaching entry point groups for each node
+    """
+    masks = [0] * (len(offsets) - 1)
+    for node_id, mask in entry_masks.items():
+        masks[node_id] |= mask
+    to_visit = list(entry_masks)
+    while to_visit:
+        node_id = to_visit.pop()
+        mask = masks[node_id]
+        for successor in targets[offsets[node_id] : offsets[node_id + 1]]:
+            if mask & ~masks[successor]:
+                masks[successor] |= mask
+                to_visit.append(successor)
+    return masks
+
+
+def get_entry_nodes(entry_point: str, node_ids: dict):
+    """Find the nodes matching an entry point specification.
+
+    Args:
+        entry_point (str): "module" for all top-level module code, "main" for all main
+        guard blocks, otherwise a qualified name or glob pattern such as `cli.main` or
+        `test_*.test_*`
+        node_ids (dict): qualified name to node id
+
+    Returns:
+        list: matching node ids
+    """
+    if entry_point == MODULE_LEVEL_ENTRY:
+        suffix = "." + MODULE_LEVEL_NAME
+        return [i for name, i in node_ids.items() if name.endswith(suffix)]
+    if entry_point == MAIN_GUARD_ENTRY:
+        suffix = "." + MAIN_GUARD_NAME
+        return [i for name, i in node_ids.items() if name.endswith(suffix)]
+    if entry_point in node_ids:
+        return [node_ids[entry_point]]
+    return [i for name, i in node_ids.items() if fnmatchcase(name, entry_point)]
+
+
+def create_reachability_report(
+    module_info: dict, entry_points: list = None, edges: list = None
+):
+    """Find the definitions that can not be reached from any of the entry points.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+        entry_points (list, optional): entry point specifications, see `get_entry_nodes`.
+        Defaults to module-level code and main guard blocks.
+        edges (list, optional): precomputed `create_repo_call_edges` result. Defaults to
+        None.
+
+    Returns:
+        ReachabilityReport: reachable and unreachable definitions
+    """
+    if entry_points is None:
+        entry_points = [MODULE_LEVEL_ENTRY, MAIN_GUARD_ENTRY]
+    definitions = get_repo_definitions(module_info)
+    if edges is None:
+        edges = create_repo_call_edges(module_info, definitions=definitions)
+
+    node_ids = {name: i for i, name in enumerate(definitions)}
+    integer_edges = []
+    for s, t in edges:
+        s_id = node_ids.setdefault(s, len(node_ids))
+        t_id = node_ids.setdefault(t, len(node_ids))
+        integer_edges.append((s_id, t_id))
+    offsets, targets = create_csr_graph(len(node_ids), integer_edges)
+
+    entry_masks = {}
+    for bit, entry_point in enumerate(entry_points):
+        for node_id in get_entry_nodes(entry_point, node_ids):
+            entry_masks[node_id] = entry_masks.get(node_id, 0) | (1 << bit)
+    masks = propagate_entry_bits(offsets, targets, entry_masks)
+
+    report = ReachabilityReport(entry_points=list(entry_points))
+    for name, (module_name, f) in definitions.items():
+        lines = f.end_lineno - f.start_lineno + 1
+        report.total_lines += lines
+        mask = masks[node_ids[name]]
+        if mask:
+            report.reached_by[name] = [
+                e for bit, e in enumerate(entry_points) if mask & (1 << bit)
+            ]
+            continue
+        report.unreachable.append(
+            UnreachableDefinition(
+                name=name,
+                module=module_name,
+                start_lineno=f.start_lineno,
+                end_lineno=f.end_lineno,
+                lines=lines,
+            )
+        )
+        report.unreachable_lines += lines
+    report.unreachable.sort(key=lambda d: (-d.lines, d.name))
+    return report
+
+
+def create_reachability_report_description(report: ReachabilityReport):
+    """Describe the unreachable definitions as a markdown table, largest first.
+
+    Args:
+        report (ReachabilityReport): report from `create_reachability_report`
+
+    Returns:
+        str: markdown description
+    """
+    contents = [
+        f"Entry points: {', '.join(report.entry_points)}",
+        "",
+        f"{len(report.unreachable)} unreachable definitions with "
+        f"{report.unreachable_lines} of {report.total_lines} lines.",
+        "",
+        "| definition | module | lines | location |",
+        "| --- | --- | ---: | --- |",
+    ]
+    for d in report.unreachable:
+        contents.append(
+            f"| {d.name} | {d.module} | {d.lines} | {d.start_lineno}-{d.end_lineno} |"
+        )
+    return "\n".join(contents)
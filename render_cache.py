@@ -0,0 +1,185 @@
+import hashlib
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from batch_render import (
+    format_combined_graphs,
+    format_module_graph,
+    get_module_graph_filename,
+    render_module_graphs,
+)
+from code_graph import create_function_call_edges
+from viz_code import get_definition_metrics, get_subgraph_calls, low_level_functions
+
+# bump when the rendered output changes for the same graph, to invalidate old outputs
+RENDER_CACHE_VERSION = 1
+RENDER_CACHE_FILENAME = "render_cache.json"
+
+
+@dataclass
+class RenderCacheResult:
+    paths: list  # every output file, regenerated or reused
+    regenerated: list = field(default_factory=list)  # output files written by this run
+    digests: dict = field(default_factory=dict)  # output file name to graph digest
+
+
+def get_graph_digest(
+    module: dict,
+    collapse_multiple_call_edges: bool = False,
+    wanted_classes: list = None,
+    include_body_commands: bool = True,
+    include_function_defs: bool = True,
+    node_metric: str = None,
+):
+    """Compute a stable digest of everything a `create_graph_description` render of the
+    module depends on: its edges as a sorted multiset, the class and imported module
+    subgraphs, the metric values when nodes are styled by one, and the render options.
+    Graphs with the same digest render the same, up to the order of their lines.
+
+    Returns:
+        str: hex SHA-1 digest
+    """
+    edges = create_function_call_edges(
+        module,
+        wanted_classes=wanted_classes,
+        include_body_commands=include_body_commands,
+        include_function_defs=include_function_defs,
+    )
+    classes = [
+        [class_node.name, [method.name for method in class_node.methods]]
+        for class_node in module["class_list"]
+        if wanted_classes is None or class_node.name in wanted_classes
+    ]
+    subgraph_calls = get_subgraph_calls(module, include_function_defs)
+    normalized = {
+        "version": RENDER_CACHE_VERSION,
+        "edges": sorted([s, t, w] for (s, t), w in Counter(edges).items()),
+        "classes": sorted(classes),
+        "imports": sorted(
+            {json.dumps([i.module, i.alias]) for i in module["import_list"]}
+        ),
+        "subgraph_calls": sorted(
+            {json.dumps([c.module, c.name]) for c in subgraph_calls if c.module}
+        ),
+        "metrics": [],
+        "options": {
+            "node_metric": node_metric,
+            "collapse_multiple_call_edges": collapse_multiple_call_edges,
+            "wanted_classes": sorted(wanted_classes or []),
+            "all_classes": wanted_classes is None,
+            "include_body_commands": include_body_commands,
+            "include_function_defs": include_function_defs,
+            "low_level_functions": sorted(set(low_level_functions)),
+        },
+    }
+    if node_metric is not None:
+        drawn_nodes = set(n for e in edges for n in e)
+        metrics = get_definition_metrics(module, node_metric, node_names=drawn_nodes)
+        normalized["metrics"] = sorted(metrics.items())
+    encoded = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(encoded.encode()).hexdigest()
+
+
+def read_render_cache(output_dir: Path):
+    cache_file = output_dir / RENDER_CACHE_FILENAME
+    if not cache_file.is_file():
+        return {}
+    return json.loads(cache_file.read_text())
+
+
+def is_output_fresh(
+    output_dir: Path, filename: str, digests: dict, cached_digests: dict
+):
+    """Check if an output file exists and was rendered from a graph with its digest."""
+    return (
+        cached_digests.get(filename) == digests[filename]
+        and (output_dir / filename).is_file()
+    )
+
+
+def write_cached_module_graphs(
+    module_info: dict,
+    output_dir,
+    module_names: list = None,
+    combined_filename: str = None,
+    processes: int = None,
+    **render_options,
+):
+    """Like `batch_render.write_module_graphs`, but only render the graphs whose digest,
+    see `get_graph_digest`, changed since the last run into the same directory. The
+    digests are kept in `render_cache.json` next to the outputs, and outputs that are
+    missing are always rendered. The result lists the regenerated files, so slow
+    downstream steps, like turning the diagrams into images, can skip the others.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+        output_dir (str): directory to write the Markdown files to
+        module_names (list, optional): modules to render. Defaults to all.
+        combined_filename (str, optional): write all graphs to this one file, which is
+        rendered again when any of its graphs changed. Defaults to None.
+        processes (int, optional): number of worker processes. Defaults to one per CPU.
+        render_options: passed on to `create_graph_description`
+
+    Returns:
+        RenderCacheResult: all output files and the regenerated ones
+    """
+    if module_names is None:
+        module_names = list(module_info)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cached_digests = read_render_cache(output_dir)
+    module_digests = {
+        name: get_graph_digest(module_info[name], **render_options)
+        for name in module_names
+    }
+
+    if combined_filename is not None:
+        combined_digest = hashlib.sha1(
+            json.dumps(list(module_digests.items())).encode()
+        ).hexdigest()
+        digests = {combined_filename: combined_digest}
+        to_render = []
+        if not is_output_fresh(output_dir, combined_filename, digests, cached_digests):
+            to_render = module_names
+    else:
+        digests = {
+            get_module_graph_filename(name): digest
+            for name, digest in module_digests.items()
+        }
+        to_render = [
+            name
+            for name in module_names
+            if not is_output_fresh(
+                output_dir, get_module_graph_filename(name), digests, cached_digests
+            )
+        ]
+
+    descriptions = {}
+    if to_render:
+        descriptions = render_module_graphs(
+            module_info, module_names=to_render, processes=processes, **render_options
+        )
+    regenerated = []
+    if combined_filename is not None:
+        if descriptions:
+            (output_dir / combined_filename).write_text(
+                format_combined_graphs(descriptions)
+            )
+            regenerated.append(output_dir / combined_filename)
+    else:
+        for module_name, description in descriptions.items():
+            module_file = output_dir / get_module_graph_filename(module_name)
+            module_file.write_text(format_module_graph(module_name, description))
+            regenerated.append(module_file)
+
+    # keep the digests of outputs this run did not touch, e.g. of other modules
+    cached_digests.update(digests)
+    (output_dir / RENDER_CACHE_FILENAME).write_text(
+        json.dumps(cached_digests, indent=1, sort_keys=True)
+    )
+    return RenderCacheResult(
+        paths=[output_dir / filename for filename in digests],
+        regenerated=regenerated,
+        digests=digests,
+    )
@@ -0,0 +1,248 @@
+import os
+import random
+import sys
+import threading
+from array import array
+from collections import Counter
+from code_graph import MAIN_GUARD_NAME, MODULE_LEVEL_NAME, create_repo_call_edges
+from profile_overlay import (
+    get_external_profile_name,
+    get_profile_definition_index,
+    match_profile_entry,
+)
+
+# sys.monitoring tool id used when it is available (Python 3.12+)
+MONITORING_TOOL_ID = 2  # sys.monitoring.PROFILER_ID
+NO_CALLER = -1
+# calls into the tracer itself are never recorded
+TRACER_FILENAME = os.path.abspath(__file__)
+
+STATIC_EDGE = "static"
+DYNAMIC_EDGE = "dynamic"
+BOTH_EDGE = "both"
+
+
+class ThreadBuffer:
+    """Preallocated buffer of (caller id, callee id) pairs owned by a single thread."""
+
+    def __init__(self, buffer_size: int):
+        self.pairs = array("q", [0] * (2 * buffer_size))
+        self.position = 0
+        self.countdown = 1  # calls left until the next one is recorded
+
+
+class CallTracer:
+    """Record caller to callee edges of running code with low overhead.
+
+    Uses `sys.monitoring` where available and falls back to `sys.setprofile`. Each
+    thread writes integer code ids into its own preallocated buffer, which is only
+    aggregated into the shared counter when it fills up or tracing stops.
+
+    Args:
+        paths (list, optional): only record calls into code under these directories or
+        files. Defaults to the current working directory.
+        buffer_size (int, optional): calls buffered per thread before aggregating.
+        Defaults to 65536.
+        sample_rate (int, optional): record one of every `sample_rate` calls on average;
+        counts are scaled back up when read. Defaults to 1.
+    """
+
+    def __init__(self, paths: list = None, buffer_size: int = 65536, sample_rate=1):
+        if paths is None:
+            paths = [os.getcwd()]
+        self.paths = tuple(os.path.abspath(p) for p in paths)
+        # directories only match whole path components, so `/repo` leaves `/repo2` out
+        self.path_prefixes = tuple(p.rstrip(os.sep) + os.sep for p in self.paths)
+        self.buffer_size = buffer_size
+        self.sample_rate = max(int(sample_rate), 1)
+        self.tracked = {}  # code object to whether it is under the paths
+        self.code_ids = {}  # code object to id
+        self.code_keys = []  # id to (filename, first line, function name)
+        self.edge_counts = Counter()
+        self.buffers = []
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.use_monitoring = hasattr(sys, "monitoring")
+        self.running = False
+
+    def get_code_id(self, code):
+        code_id = self.code_ids.get(code)
+        if code_id is None:
+            with self.lock:
+                code_id = self.code_ids.get(code)
+                if code_id is None:
+                    code_id = len(self.code_keys)
+                    filename = os.path.abspath(code.co_filename)
+                    self.code_keys.append((filename, code.co_firstlineno, code.co_name))
+                    self.code_ids[code] = code_id
+        return code_id
+
+    def is_tracked(self, code):
+        tracked = self.tracked.get(code)
+        if tracked is None:
+            filename = os.path.abspath(code.co_filename)
+            tracked = filename != TRACER_FILENAME and (
+                filename in self.paths or filename.startswith(self.path_prefixes)
+            )
+            self.tracked[code] = tracked
+        return tracked
+
+    def get_thread_buffer(self):
+        thread_buffer = getattr(self.local, "buffer", None)
+        if thread_buffer is None:
+            thread_buffer = ThreadBuffer(self.buffer_size)
+            self.local.buffer = thread_buffer
+            with self.lock:
+                self.buffers.append(thread_buffer)
+        return thread_buffer
+
+    def record(self, caller_code, callee_code):
+        thread_buffer = self.get_thread_buffer()
+        thread_buffer.countdown -= 1
+        if thread_buffer.countdown > 0:
+            return
+        # a random gap between samples avoids aliasing with periodic call patterns
+        thread_buffer.countdown = random.randint(1, 2 * self.sample_rate - 1)
+        pairs = thread_buffer.pairs
+        position = thread_buffer.position
+        pairs[position] = (
+            NO_CALLER if caller_code is None else self.get_code_id(caller_code)
+        )
+        pairs[position + 1] = self.get_code_id(callee_code)
+        thread_buffer.position = position + 2
+        if thread_buffer.position == len(pairs):
+            self.flush(thread_buffer)
+
+    def flush(self, thread_buffer: ThreadBuffer):
+        pairs = thread_buffer.pairs
+        position = thread_buffer.position
+        batch = Counter(zip(pairs[0:position:2], pairs[1:position:2]))
+        thread_buffer.position = 0
+        with self.lock:
+            self.edge_counts.update(batch)
+
+    def on_py_start(self, code, instruction_offset):
+        if not self.is_tracked(code):
+            # stop receiving start events for this code object entirely
+            return sys.monitoring.DISABLE
+        caller_frame = sys._getframe(1).f_back
+        self.record(None if caller_frame is None else caller_frame.f_code, code)
+
+    def on_profile_event(self, frame, event, arg):
+        if event != "call" or not self.is_tracked(frame.f_code):
+            return
+        caller_frame = frame.f_back
+        self.record(None if caller_frame is None else caller_frame.f_code, frame.f_code)
+
+    def start(self):
+        if self.running:
+            return
+        if self.use_monitoring:
+            monitoring = sys.monitoring
+            monitoring.use_tool_id(MONITORING_TOOL_ID, "pycodecrawler")
+            monitoring.register_callback(
+                MONITORING_TOOL_ID, monitoring.events.PY_START, self.on_py_start
+            )
+            monitoring.set_events(MONITORING_TOOL_ID, monitoring.events.PY_START)
+            # code disabled by an earlier tracer may be under this tracer's paths
+            monitoring.restart_events()
+        else:
+            threading.setprofile(self.on_profile_event)
+            sys.setprofile(self.on_profile_event)
+        self.running = True
+
+    def stop(self):
+        if not self.running:
+            return
+        if self.use_monitoring:
+            monitoring = sys.monitoring
+            monitoring.set_events(MONITORING_TOOL_ID, monitoring.events.NO_EVENTS)
+            monitoring.register_callback(
+                MONITORING_TOOL_ID, monitoring.events.PY_START, None
+            )
+            monitoring.free_tool_id(MONITORING_TOOL_ID)
+        else:
+            sys.setprofile(None)
+            threading.setprofile(None)
+        self.running = False
+        for thread_buffer in list(self.buffers):
+            self.flush(thread_buffer)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def get_edge_counts(self):
+        """Return the recorded edges, with counts scaled up by the sample rate.
+
+        Returns:
+            Counter: (caller key, callee key) to estimated number of calls, where keys
+            are (filename, first line, function name) like pstats keys and the caller
+            key is None for calls without a calling frame
+        """
+        edge_counts = Counter()
+        for (caller_id, callee_id), count in self.edge_counts.items():
+            caller_key = None if caller_id == NO_CALLER else self.code_keys[caller_id]
+            callee_key = self.code_keys[callee_id]
+            edge_counts[(caller_key, callee_key)] += count * self.sample_rate
+        return edge_counts
+
+
+def get_traced_name(code_key: tuple, definitions_by_module: dict):
+    if code_key is None:
+        return "<runtime>"
+    name = match_profile_entry(code_key, definitions_by_module)
+    if name is None:
+        name = get_external_profile_name(code_key)
+    return name
+
+
+def get_main_guard_caller(s: str, t: str, static_counts: Counter):
+    """Runtime frames of a script's main guard block are `<module>` frames, while the
+    static graph calls them `module.__main__`. Give a traced top-level call the main
+    guard caller when only that caller has the edge statically."""
+    suffix = "." + MODULE_LEVEL_NAME
+    if not s.endswith(suffix) or (s, t) in static_counts:
+        return s
+    main_guard_caller = s[: -len(suffix)] + "." + MAIN_GUARD_NAME
+    if (main_guard_caller, t) in static_counts:
+        return main_guard_caller
+    return s
+
+
+def merge_traced_edges(module_info: dict, traced_edge_counts, edges: list = None):
+    """Merge traced runtime edges into the repo-wide static call graph.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+        traced_edge_counts (Counter): edges from `CallTracer.get_edge_counts`
+        edges (list, optional): precomputed `create_repo_call_edges` result. Defaults to
+        None.
+
+    Returns:
+        list: edges (s, t, static call sites, traced calls, label) where label is one of
+        "static", "dynamic" or "both"
+    """
+    if edges is None:
+        edges = create_repo_call_edges(module_info)
+    definitions_by_module = get_profile_definition_index(module_info)
+    static_counts = Counter(edges)
+    dynamic_counts = Counter()
+    for (caller_key, callee_key), count in traced_edge_counts.items():
+        s = get_traced_name(caller_key, definitions_by_module)
+        t = get_traced_name(callee_key, definitions_by_module)
+        s = get_main_guard_caller(s, t, static_counts)
+        dynamic_counts[(s, t)] += count
+
+    merged_edges = []
+    for (s, t), static_weight in static_counts.items():
+        dynamic_weight = dynamic_counts.get((s, t), 0)
+        label = BOTH_EDGE if dynamic_weight else STATIC_EDGE
+        merged_edges.append((s, t, static_weight, dynamic_weight, label))
+    for (s, t), dynamic_weight in dynamic_counts.items():
+        if (s, t) not in static_counts:
+            merged_edges.append((s, t, 0, dynamic_weight, DYNAMIC_EDGE))
+    return merged_edges
@@ -0,0 +1,459 @@
+import hashlib
+import math
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from code_extraction import extract_code_information, get_all_filenames
+from code_graph import get_call_target_name
+from import_side_effects import get_import_aliases, resolve_external_target
+
+# z score of the reported error bounds, about 95% for normally distributed errors
+ERROR_BOUND_Z = 1.96
+# per file statistics estimated with the stratified estimator
+FILE_STATISTICS = ["definitions", "call_sites"]
+# counters per row of the count-min sketch of each stratum
+STRATUM_SKETCH_WIDTH = 1024
+
+
+def get_hash(item: str, byte_count: int = 8):
+    """Hash that is the same in every process, unlike `hash`, so sketches merge."""
+    digest = hashlib.blake2b(item.encode(), digest_size=byte_count).digest()
+    return int.from_bytes(digest, "big")
+
+
+class HyperLogLog:
+    """Estimate the number of distinct items in fixed memory, with a relative standard
+    error of 1.04 / sqrt(2 ** precision). Sketches of separate streams merge into the
+    sketch of the combined stream."""
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, item: str):
+        item_hash = get_hash(item)
+        index = item_hash >> (64 - self.precision)
+        rest = item_hash & ((1 << (64 - self.precision)) - 1)
+        rank = 64 - self.precision - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def count(self):
+        register_count = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / register_count)
+        estimate = (
+            alpha
+            * register_count**2
+            / sum(2.0**-register for register in self.registers)
+        )
+        empty_count = self.registers.count(0)
+        if estimate <= 2.5 * register_count and empty_count:
+            # few items, counting empty registers is more accurate
+            estimate = register_count * math.log(register_count / empty_count)
+        return estimate
+
+
+class CountMinSketch:
+    """Estimate weighted item counts in fixed memory. Estimates are never too low, and
+    with probability 1 - exp(-depth) too high by at most e / width of the total weight.
+    Sketches of the same size merge by adding their counters."""
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.rows = [array("d", bytes(8 * width)) for _ in range(depth)]
+        self.total = 0.0
+
+    def get_columns(self, item: str):
+        item_hash = get_hash(item, 8 * len(self.rows))
+        return [(item_hash >> (64 * i)) % self.width for i in range(len(self.rows))]
+
+    def add(self, item: str, weight: float = 1.0):
+        for row, column in zip(self.rows, self.get_columns(item)):
+            row[column] += weight
+        self.total += weight
+
+    def estimate(self, item: str, columns: list = None):
+        """Estimate the weight of an item, `columns` can be reused from `get_columns`
+        of a sketch of the same size."""
+        if columns is None:
+            columns = self.get_columns(item)
+        return min(row[c] for row, c in zip(self.rows, columns))
+
+    def merge(self, other):
+        for row, other_row in zip(self.rows, other.rows):
+            for i, count in enumerate(other_row):
+                row[i] += count
+        self.total += other.total
+
+    @property
+    def error_bound(self):
+        return math.e / self.width * self.total
+
+
+@dataclass
+class Estimate:
+    value: float
+    low: float  # lower error bound, None when unknown
+    high: float  # upper error bound, None when unknown
+
+
+@dataclass
+class RepoStatistics:
+    files: int  # files found in the crawled directories
+    sampled_files: int  # files parsed
+    definitions: Estimate  # functions and methods
+    call_sites: Estimate
+    distinct_callees: Estimate  # distinct call target names
+    top_external_modules: list = field(default_factory=list)  # (module, Estimate)
+
+
+@dataclass
+class StratumTotals:
+    stratum_size: int  # files in the stratum
+    sampled: int = 0  # sampled files seen
+    sums: dict = field(default_factory=dict)  # statistic to sum over sampled files
+    square_sums: dict = field(default_factory=dict)  # statistic to sum of squares
+    # unweighted calls into each external top-level module from the sampled files
+    external_calls: CountMinSketch = field(
+        default_factory=lambda: CountMinSketch(STRATUM_SKETCH_WIDTH)
+    )
+
+
+def get_module_calls(module: dict):
+    calls = list(module["call_list"] or [])
+    for f in module["func_defs"]:
+        calls.extend(f.calls)
+    for class_node in module["class_list"]:
+        for method in class_node.methods:
+            calls.extend(method.calls)
+    return calls
+
+
+class RepoStatisticsSketch:
+    """Mergeable summary of sampled modules: stratum totals for the definition and call
+    site counts, HyperLogLog sketches of the call targets, and a count-min sketch per
+    stratum of the calls into each external top-level module. Counts are weighted up
+    to the whole stratum only when estimating, so sketches of separate samples of the
+    same strata, e.g. built in other processes, merge into one. A file in both samples
+    counts twice."""
+
+    def __init__(self, module_names, max_candidates: int = 1000):
+        # crawled modules and packages are not external
+        self.module_names = set(module_names)
+        self.max_candidates = max_candidates
+        self.strata = {}  # stratum to StratumTotals
+        self.callees = HyperLogLog()
+        # call targets of half of the files, to see how fast new targets show up
+        self.half_callees = HyperLogLog()
+        self.call_sites = 0  # sampled call sites
+        self.half_call_sites = 0
+        self.candidates = set()  # external modules that may be among the top ones
+
+    def add_module(self, module_name: str, module: dict):
+        """Add a module crawled with `extract_code_information(sample_fraction=...)`."""
+        sample = module["sample"]
+        stratum = tuple(sample["stratum"])
+        totals = self.strata.setdefault(stratum, StratumTotals(sample["stratum_size"]))
+        calls = get_module_calls(module)
+        statistics = {
+            "definitions": len(module["func_defs"])
+            + sum(len(c.methods) for c in module["class_list"]),
+            "call_sites": len(calls),
+        }
+        totals.sampled += 1
+        for name, value in statistics.items():
+            totals.sums[name] = totals.sums.get(name, 0) + value
+            totals.square_sums[name] = totals.square_sums.get(name, 0) + value**2
+
+        aliases = get_import_aliases(module)
+        imported_packages = {
+            i.module.split(".")[0]
+            for i in module["import_list"]
+            if i.module and i.level <= 0
+        }
+        in_half = get_hash(module.get("filename") or module_name) & 1
+        for call in calls:
+            target = resolve_external_target(get_call_target_name(call), aliases)
+            self.callees.add(target)
+            if in_half:
+                self.half_callees.add(target)
+            package = target.split(".")[0]
+            if call.module and package in imported_packages:
+                if package not in self.module_names:
+                    totals.external_calls.add(package)
+                    self.candidates.add(package)
+        self.call_sites += len(calls)
+        if in_half:
+            self.half_call_sites += len(calls)
+        if len(self.candidates) > 2 * self.max_candidates:
+            self.prune_candidates()
+
+    def prune_candidates(self):
+        estimates = {m: self.estimate_external_calls(m) for m in self.candidates}
+        self.candidates = set(
+            sorted(self.candidates, key=lambda m: estimates[m].value, reverse=True)[
+                : self.max_candidates
+            ]
+        )
+
+    def estimate_external_calls(self, module: str):
+        """Estimate the calls into an external module from all files, weighting the
+        calls counted in each stratum by its files per sampled file. The bounds only
+        cover the error of the count-min sketches, which never count too few."""
+        value = 0.0
+        error_bound = 0.0
+        columns = None
+        for totals in self.strata.values():
+            if not totals.sampled or not totals.external_calls.total:
+                continue
+            weight = totals.stratum_size / totals.sampled
+            if columns is None:
+                columns = totals.external_calls.get_columns(module)
+            value += weight * totals.external_calls.estimate(module, columns)
+            error_bound += weight * totals.external_calls.error_bound
+        return Estimate(value, max(0.0, value - error_bound), value)
+
+    def merge(self, other):
+        """Merge the sketch of a sample of other files into this one."""
+        for stratum, other_totals in other.strata.items():
+            totals = self.strata.setdefault(
+                stratum, StratumTotals(other_totals.stratum_size)
+            )
+            totals.sampled += other_totals.sampled
+            for name in FILE_STATISTICS:
+                for sums, other_sums in [
+                    (totals.sums, other_totals.sums),
+                    (totals.square_sums, other_totals.square_sums),
+                ]:
+                    sums[name] = sums.get(name, 0) + other_sums.get(name, 0)
+            totals.external_calls.merge(other_totals.external_calls)
+        self.callees.merge(other.callees)
+        self.half_callees.merge(other.half_callees)
+        self.call_sites += other.call_sites
+        self.half_call_sites += other.half_call_sites
+        self.candidates |= other.candidates
+        self.module_names |= other.module_names
+        self.prune_candidates()
+
+    def get_pooled_variances(self, name: str):
+        """Sample variance of a statistic over the sampled files of each size class,
+        and under None over all sampled files, for strata with a single sampled file.
+        Variances of fewer than two files are None."""
+        pooled = {None: [0, 0, 0]}
+        for stratum, totals in self.strata.items():
+            for size_class in [stratum[1], None]:
+                counts = pooled.setdefault(size_class, [0, 0, 0])
+                counts[0] += totals.sampled
+                counts[1] += totals.sums.get(name, 0)
+                counts[2] += totals.square_sums.get(name, 0)
+        return {
+            size_class: get_sample_variance(*counts)
+            for size_class, counts in pooled.items()
+        }
+
+    def estimate_total(self, name: str):
+        """Estimate the total of a per file statistic over all files of the strata with
+        the stratified estimator. The variance of a stratum with a single sampled file
+        is taken from its size class, or from all sampled files when the size class has
+        a single one too. The bounds are unknown when neither has two files."""
+        pooled_variances = self.get_pooled_variances(name)
+        total = 0.0
+        sampled_total = 0
+        variance = 0.0
+        for stratum, totals in self.strata.items():
+            if not totals.sampled:
+                continue
+            stratum_sum = totals.sums.get(name, 0)
+            sampled_total += stratum_sum
+            total += totals.stratum_size * stratum_sum / totals.sampled
+            # merged samples that share files can hold more files than the stratum
+            unsampled_fraction = max(0.0, 1 - totals.sampled / totals.stratum_size)
+            if not unsampled_fraction:
+                # every file of the stratum was parsed
+                continue
+            stratum_variance = get_sample_variance(
+                totals.sampled, stratum_sum, totals.square_sums.get(name, 0)
+            )
+            if stratum_variance is None:
+                stratum_variance = pooled_variances[stratum[1]]
+            if stratum_variance is None:
+                stratum_variance = pooled_variances[None]
+            if stratum_variance is None or variance is None:
+                variance = None
+                continue
+            variance += (
+                totals.stratum_size**2
+                * unsampled_fraction
+                * stratum_variance
+                / totals.sampled
+            )
+        if variance is None:
+            return Estimate(total, None, None)
+        error = ERROR_BOUND_Z * math.sqrt(variance)
+        # files in more than one merged sample count twice in the sampled total
+        low = min(total, max(sampled_total, total - error))
+        return Estimate(total, low, total + error)
+
+    def estimate_distinct_callees(self, call_sites: Estimate):
+        """Extrapolate the distinct call targets of the sample to all files, assuming
+        they grow as a power of the number of call sites (Heaps' law), with the
+        exponent fitted on the targets of half of the sample. The sample's own count
+        bounds the estimate from below."""
+        sampled = self.callees.count()
+        half = self.half_callees.count()
+        error = ERROR_BOUND_Z * self.callees.relative_error
+        exponent = 1.0
+        if 0 < self.half_call_sites < self.call_sites and 0 < half < sampled:
+            exponent = math.log(sampled / half) / math.log(
+                self.call_sites / self.half_call_sites
+            )
+        exponent = min(1.0, max(0.0, exponent))
+        growth = (
+            (call_sites.value / self.call_sites) ** exponent if self.call_sites else 1
+        )
+        value = max(sampled, sampled * growth)
+        return Estimate(value, sampled * (1 - error), value * (1 + error))
+
+    def estimate(self, top: int = 10):
+        """Estimate the statistics of all files from the sample.
+
+        Args:
+            top (int, optional): number of external modules to list. Defaults to 10.
+
+        Returns:
+            RepoStatistics: estimates with their error bounds
+        """
+        totals = {name: self.estimate_total(name) for name in FILE_STATISTICS}
+        external_calls = {m: self.estimate_external_calls(m) for m in self.candidates}
+        top_modules = sorted(
+            external_calls.items(), key=lambda item: item[1].value, reverse=True
+        )[:top]
+        return RepoStatistics(
+            files=sum(t.stratum_size for t in self.strata.values()),
+            sampled_files=sum(t.sampled for t in self.strata.values()),
+            definitions=totals["definitions"],
+            call_sites=totals["call_sites"],
+            distinct_callees=self.estimate_distinct_callees(totals["call_sites"]),
+            top_external_modules=top_modules,
+        )
+
+
+def get_sample_variance(count: int, total: float, square_total: float):
+    if count < 2:
+        return None
+    return max(0.0, (square_total - total**2 / count) / (count - 1))
+
+
+def get_crawled_names(filenames: list, directories: list = None):
+    """Get the names the crawled code is imported by: the module name of each file and
+    the names of the directories holding it, up to the crawled directories and on
+    through the packages above them.
+
+    Args:
+        filenames (list): Path of every crawled file
+        directories (list, optional): crawled directory strings. Defaults to None.
+
+    Returns:
+        set: crawled module and package names
+    """
+    roots = {Path(d).resolve() for d in directories or []}
+    names = set()
+    seen_directories = set()
+    for f in filenames:
+        names.add(f.stem)
+        directory = Path(f).resolve().parent
+        while directory.name and directory not in seen_directories:
+            seen_directories.add(directory)
+            in_crawl = directory in roots or not roots.isdisjoint(directory.parents)
+            if not in_crawl and not (directory / "__init__.py").is_file():
+                break
+            names.add(directory.name)
+            directory = directory.parent
+    return names
+
+
+def estimate_repo_statistics(
+    directories: list = None,
+    other_python_filenames=None,
+    sample_fraction: float = 0.05,
+    sample_seed: int = 0,
+    top: int = 10,
+    **crawl_options,
+):
+    """Estimate repo-wide statistics from a stratified sample of the files, for a quick
+    look at a repo before crawling all of it. Totals come with error bounds for the
+    sampling error, distinct call targets are extrapolated from a HyperLogLog sketch of
+    the sample, and the external modules called most are found with a count-min
+    sketch, whose bounds cover the sketch error only.
+
+    Args:
+        directories (list, optional): Python directory strings. Defaults to None.
+        other_python_filenames (list, optional): list of separate Python filenames.
+        Defaults to None.
+        sample_fraction (float, optional): fraction of the files to parse. Defaults to
+        0.05.
+        sample_seed (int, optional): random seed of the sample. Defaults to 0.
+        top (int, optional): number of external modules to list. Defaults to 10.
+        crawl_options: passed on to `extract_code_information`, e.g. `lazy_calls`
+
+    Returns:
+        RepoStatistics: estimates with their error bounds
+    """
+    filenames = get_all_filenames(
+        directories,
+        other_python_filenames,
+        include_notebooks=crawl_options.get("include_notebooks", False),
+    )
+    module_info = extract_code_information(
+        directories,
+        other_python_filenames,
+        sample_fraction=sample_fraction,
+        sample_seed=sample_seed,
+        **crawl_options,
+    )
+    sketch = RepoStatisticsSketch(get_crawled_names(filenames, directories))
+    for module_name, module in module_info.items():
+        sketch.add_module(module_name, module)
+    statistics = sketch.estimate(top=top)
+    # files with the same module name as another file are not in the module info
+    statistics.files = len(filenames)
+    return statistics
+
+
+def create_repo_statistics_description(statistics: RepoStatistics):
+    """Describe estimated repo statistics as a markdown table.
+
+    Args:
+        statistics (RepoStatistics): estimates from `estimate_repo_statistics`
+
+    Returns:
+        str: markdown description
+    """
+    contents = [
+        f"Parsed {statistics.sampled_files} of {statistics.files} files.",
+        "",
+        "| statistic | estimate | error bounds |",
+        "| --- | ---: | --- |",
+    ]
+    rows = [
+        ("definitions", statistics.definitions),
+        ("call sites", statistics.call_sites),
+        ("distinct callees", statistics.distinct_callees),
+    ]
+    rows.extend(
+        (f"calls into {module}", estimate)
+        for module, estimate in statistics.top_external_modules
+    )
+    for name, estimate in rows:
+        bounds = "unknown"
+        if estimate.low is not None:
+            bounds = f"{estimate.low:,.0f} to {estimate.high:,.0f}"
+        contents.append(f"| {name} | {estimate.value:,.0f} | {bounds} |")
+    return "\n".join(contents)
@@ -0,0 +1,308 @@
+import hashlib
+import json
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from code_extraction import extract_code_information, get_all_filenames
+from code_graph import create_repo_call_edges, get_repo_definitions
+
+PARTIAL_FORMAT_VERSION = 1
+
+
+def get_shard_index(filename, shard_count: int):
+    """Assign a file to a shard by a hash of its path, so the assignment is the same on
+    every machine and in every run.
+
+    Args:
+        filename (str): file name as listed in the manifest
+        shard_count (int): number of shards
+
+    Returns:
+        int: shard index
+    """
+    path_hash = hashlib.sha1(Path(filename).as_posix().encode()).digest()
+    return int.from_bytes(path_hash[:8], "big") % shard_count
+
+
+def create_shard_manifest(
+    directories: list = None,
+    other_python_filenames=None,
+    shard_count: int = 2,
+    include_notebooks: bool = False,
+):
+    """List the files of a crawl and assign each to one of `shard_count` shards.
+
+    Args:
+        directories (list, optional): Python directory strings. Defaults to None.
+        other_python_filenames (list, optional): list of separate Python filenames.
+        Defaults to None.
+        shard_count (int, optional): number of shards. Defaults to 2.
+        include_notebooks (bool, optional): also crawl `.ipynb` notebooks. Defaults to
+        False.
+
+    Returns:
+        dict: manifest with the sorted file names of each shard under "shards"
+    """
+    filenames = get_all_filenames(
+        directories, other_python_filenames, include_notebooks=include_notebooks
+    )
+    shards = [[] for _ in range(shard_count)]
+    for f in sorted(set(Path(f).as_posix() for f in filenames)):
+        shards[get_shard_index(f, shard_count)].append(f)
+    return {"shard_count": shard_count, "shards": shards}
+
+
+def write_shard_manifest(manifest: dict, manifest_path):
+    Path(manifest_path).write_text(json.dumps(manifest, indent=1))
+
+
+def read_shard_manifest(manifest_path):
+    return json.loads(Path(manifest_path).read_text())
+
+
+def get_symbol_table(module_info: dict):
+    """Collect the definitions of each module of a (partial) crawl, enough to resolve
+    calls into them without the parsed modules.
+
+    Args:
+        module_info (dict): module information from `extract_code_information`
+
+    Returns:
+        dict: module name to {qualified name: (start line, end line)}
+    """
+    symbols = {module_name: {} for module_name in module_info}
+    for qualified_name, (module_name, f) in get_repo_definitions(module_info).items():
+        symbols[module_name][qualified_name] = (f.start_lineno, f.end_lineno)
+    return symbols
+
+
+def write_partial(module_info: dict, output_path, shards: list):
+    """Write a partial crawl as a stream of pickles: a header holding the symbol table
+    and the file of each module, then one record per module. Readers can link or merge
+    partials holding only the headers and a single module in memory.
+
+    Args:
+        module_info (dict): module information of the partial crawl
+        output_path (str): file to write
+        shards (list): indices of the shards the partial covers
+    """
+    header = {
+        "version": PARTIAL_FORMAT_VERSION,
+        "shards": sorted(shards),
+        "filenames": {name: m["filename"] for name, m in module_info.items()},
+        "symbols": get_symbol_table(module_info),
+    }
+    with open(output_path, "wb") as partial_file:
+        pickle.dump(header, partial_file, protocol=pickle.HIGHEST_PROTOCOL)
+        for module_name in sorted(module_info):
+            record = (module_name, module_info[module_name])
+            pickle.dump(record, partial_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def read_partial_header(partial_file):
+    header = pickle.load(partial_file)
+    if header.get("version") != PARTIAL_FORMAT_VERSION:
+        raise ValueError(f"unsupported partial crawl format {header.get('version')}")
+    return header
+
+
+def iter_partial_modules(partial_file):
+    """Yield the (module name, module data) records following a partial's header."""
+    while True:
+        try:
+            yield pickle.load(partial_file)
+        except EOFError:
+            return
+
+
+def crawl_shard(manifest: dict, shard_index: int, output_path, **crawl_options):
+    """Crawl the files of one shard and write the partial result.
+
+    Args:
+        manifest (dict): manifest from `create_shard_manifest`
+        shard_index (int): shard to crawl
+        output_path (str): partial file to write
+        crawl_options: passed on to `extract_code_information`, e.g. `node_filter`
+
+    Returns:
+        str: the output path
+    """
+    filenames = manifest["shards"][shard_index]
+    module_info = {}
+    if filenames:
+        module_info = extract_code_information(
+            other_python_filenames=filenames, **crawl_options
+        )
+    write_partial(module_info, output_path, shards=[shard_index])
+    return str(output_path)
+
+
+def merge_partial_headers(headers: list):
+    """Merge partial headers. Two files with the same module name are resolved the same
+    way in any merge order, by keeping the one with the largest file name, so merges
+    are associative and can run as a tree. Shards crawl their files sorted, and
+    `extract_code_information` keeps the last of two files with the same module name,
+    so this is the file a single crawl of the sorted manifest files keeps too.
+
+    Args:
+        headers (list): headers from `read_partial_header`
+
+    Returns:
+        dict: merged header
+    """
+    filenames = {}
+    symbols = {}
+    shards = set()
+    for header in headers:
+        shards.update(header["shards"])
+        for module_name, filename in header["filenames"].items():
+            if module_name in filenames and filenames[module_name] >= filename:
+                continue
+            filenames[module_name] = filename
+            symbols[module_name] = header["symbols"][module_name]
+    return {
+        "version": PARTIAL_FORMAT_VERSION,
+        "shards": sorted(shards),
+        "filenames": filenames,
+        "symbols": symbols,
+    }
+
+
+def read_merged_header(partial_paths: list):
+    headers = []
+    for path in partial_paths:
+        with open(path, "rb") as partial_file:
+            headers.append(read_partial_header(partial_file))
+    return merge_partial_headers(headers)
+
+
+def iter_merged_modules(partial_paths: list, merged_header: dict):
+    """Stream the module records of several partials, skipping the modules that lost
+    a name clash in `merge_partial_headers`."""
+    winning_filenames = merged_header["filenames"]
+    for path in partial_paths:
+        with open(path, "rb") as partial_file:
+            read_partial_header(partial_file)
+            for module_name, module in iter_partial_modules(partial_file):
+                if winning_filenames[module_name] == module["filename"]:
+                    yield module_name, module
+
+
+def merge_partial_files(partial_paths: list, output_path):
+    """Merge partial crawls into one partial, streaming one module at a time. The result
+    is itself a partial, so merges of merges give the same crawl.
+
+    Args:
+        partial_paths (list): partial files from `crawl_shard` or earlier merges
+        output_path (str): merged partial file to write
+
+    Returns:
+        str: the output path
+    """
+    merged_header = read_merged_header(partial_paths)
+    with open(output_path, "wb") as output_file:
+        pickle.dump(merged_header, output_file, protocol=pickle.HIGHEST_PROTOCOL)
+        for record in iter_merged_modules(partial_paths, merged_header):
+            pickle.dump(record, output_file, protocol=pickle.HIGHEST_PROTOCOL)
+    return str(output_path)
+
+
+def load_partial(partial_paths: list):
+    """Load the module info of one or more partials into memory.
+
+    Args:
+        partial_paths (list): partial files
+
+    Returns:
+        dict: module information, as `extract_code_information` would return it
+    """
+    merged_header = read_merged_header(partial_paths)
+    module_info = dict(iter_merged_modules(partial_paths, merged_header))
+    return {name: module_info[name] for name in sorted(module_info)}
+
+
+def iter_sharded_repo_call_edges(partial_paths: list, **edge_options):
+    """Create the repo-wide call graph of a sharded crawl. Calls are resolved against
+    the merged symbol table, so only one module is held in memory at a time.
+
+    Args:
+        partial_paths (list): partial files
+        edge_options: passed on to `create_repo_call_edges`, e.g. `with_calls`
+
+    Yields:
+        tuple: edges as `create_repo_call_edges` creates them
+    """
+    merged_header = read_merged_header(partial_paths)
+    definitions = {
+        qualified_name: (module_name, *lines)
+        for module_name, module_symbols in merged_header["symbols"].items()
+        for qualified_name, lines in module_symbols.items()
+    }
+    module_names = merged_header["filenames"].keys()
+    for module_name, module in iter_merged_modules(partial_paths, merged_header):
+        yield from create_repo_call_edges(
+            {module_name: module},
+            definitions=definitions,
+            module_names=module_names,
+            **edge_options,
+        )
+
+
+def run_sharded_crawl(
+    directories: list = None,
+    other_python_filenames=None,
+    work_dir="sharded_crawl",
+    shard_count: int = 4,
+    processes: int = None,
+    **crawl_options,
+):
+    """Run a sharded crawl on this machine: write a manifest, crawl every shard in its
+    own process and merge the partials pairwise, as a tree, into one.
+
+    Args:
+        directories (list, optional): Python directory strings. Defaults to None.
+        other_python_filenames (list, optional): list of separate Python filenames.
+        Defaults to None.
+        work_dir (str, optional): directory for the manifest and partial files.
+        Defaults to "sharded_crawl".
+        shard_count (int, optional): number of shards. Defaults to 4.
+        processes (int, optional): number of worker processes. Defaults to one per CPU.
+        crawl_options: passed on to `extract_code_information`
+
+    Returns:
+        str: path of the merged partial
+    """
+    work_dir = Path(work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    manifest = create_shard_manifest(
+        directories,
+        other_python_filenames,
+        shard_count=shard_count,
+        include_notebooks=crawl_options.get("include_notebooks", False),
+    )
+    write_shard_manifest(manifest, work_dir / "manifest.json")
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(
+                crawl_shard,
+                manifest,
+                i,
+                work_dir / f"shard_{i}.pickle",
+                **crawl_options,
+            )
+            for i in range(shard_count)
+        ]
+        partial_paths = [future.result() for future in futures]
+        level = 0
+        while len(partial_paths) > 1:
+            futures = [
+                executor.submit(
+                    merge_partial_files,
+                    partial_paths[i : i + 2],
+                    work_dir / f"merge_{level}_{i // 2}.pickle",
+                )
+                for i in range(0, len(partial_paths), 2)
+            ]
+            partial_paths = [future.result() for future in futures]
+            level += 1
+    return partial_paths[0]
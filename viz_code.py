@@ -1,5 +1,9 @@
-from code_graph import create_function_call_edges, create_collapsed_function_call_edges
-
+import math
+from code_graph import (
+    create_collapsed_function_call_edges,
+    create_function_call_edges,
+    get_func_def_name,
+)
 
 mermaid_keywords = ["map", "find"]
 low_level_functions = [
@@ -42,6 +46,7 @@ low_level_functions = [
 
 MAX_NODE_ID_LENGTH = 20
 
+
 def sanitize_node_id(original_node_id, max_length=MAX_NODE_ID_LENGTH):
     """Sanitize a node id to make it mermaid compatible.
 
@@ -52,7 +57,8 @@ def sanitize_node_id(original_node_id, max_length=MAX_NODE_ID_LENGTH):
     Returns:
         str: the sanitized node id
     """
-    node_id = original_node_id[:max_length]
+    # drop characters mermaid does not allow in ids, e.g. from `module.<module>`
+    node_id = original_node_id.replace("<", "").replace(">", "")[:max_length]
     if node_id in mermaid_keywords:
         node_id = "py." + node_id
 
@@ -76,12 +82,71 @@ def update_module_name_lookup(module_name, module_lookup_dict):
     module_lookup_dict[module_name] = node_id
 
 
+def to_base_36(number: int):
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    encoded = ""
+    while True:
+        number, remainder = divmod(number, 36)
+        encoded = digits[remainder] + encoded
+        if not number:
+            return encoded
+
+
+class NodeIdInterner:
+    """Hand out one mermaid node id per node name for the whole of a render.
+
+    Ids keep the readable `sanitize_node_id` form, so graphs without clashes look the
+    same as before. Names that would sanitize to an id already taken by another name,
+    e.g. two long names sharing their first characters, get a short base 36 suffix
+    instead of being merged into one node.
+    """
+
+    def __init__(self, sanitized_ids: dict = None):
+        self.node_ids = {}  # node name to node id
+        self.used_ids = set()
+        self.suffix_counts = {}  # sanitized id to the next suffix to try
+        # node name to `sanitize_node_id` result, can be shared by many renders
+        self.sanitized_ids = {} if sanitized_ids is None else sanitized_ids
+
+    def get_id(self, name: str):
+        node_id = self.node_ids.get(name)
+        if node_id is not None:
+            return node_id
+        base_id = self.sanitized_ids.get(name)
+        if base_id is None:
+            base_id = sanitize_node_id(name)
+            self.sanitized_ids[name] = base_id
+        node_id = base_id
+        while node_id in self.used_ids:
+            suffix_count = self.suffix_counts.get(base_id, 0)
+            self.suffix_counts[base_id] = suffix_count + 1
+            node_id = sanitize_node_id(f"{base_id}_{to_base_36(suffix_count)}", None)
+        self.used_ids.add(node_id)
+        self.node_ids[name] = node_id
+        return node_id
+
+
+class RenderState:
+    """Work that renders of many modules can share: the sanitized id of every node name
+    and the low-level function names as a set. The ids themselves are still handed out
+    per render, so each graph looks the same as when rendered on its own."""
+
+    def __init__(self):
+        self.sanitized_ids = {}
+        self.low_level_names = set(low_level_functions)
+
+    def create_interner(self):
+        return NodeIdInterner(self.sanitized_ids)
+
+
 def create_graph_description(
     module_info: dict,
     collapse_multiple_call_edges: bool = False,
     wanted_classes: list = None,
     include_body_commands: bool = True,
     include_function_defs: bool = True,
+    render_state: RenderState = None,
+    node_metric: str = None,
 ):
     """Use the parsed module info to create edges between functions defined and called
     in the module. This creates a graph description that can be used to generate a
@@ -92,6 +157,11 @@ def create_graph_description(
         collapse_multiple_call_edges (bool, optional): Rather than have multiple edges between
         a single pair of nodes, only allow a single edge but apply an edge label to count
         the number of calls. Defaults to False.
+        render_state (RenderState, optional): state shared with the renders of other
+        modules, see `batch_render`. Defaults to a new one.
+        node_metric (str, optional): colour and size the module's functions and methods
+        by this `DefinitionMetrics` field, e.g. "cyclomatic_complexity". Defaults to
+        None.
 
     Returns:
         list: edge data
@@ -111,24 +181,42 @@ def create_graph_description(
             include_function_defs=include_function_defs,
         )
 
-    # TODO: propagate this up
-    class_data = get_class_subgraphs(module_info, wanted_classes=wanted_classes)
-    submodule_data = get_module_subgraphs(module_info)
+    if render_state is None:
+        render_state = RenderState()
+    # one interner for the whole render so subgraph members match the edge nodes
+    node_ids = render_state.create_interner()
+    class_data = get_class_subgraphs(
+        module_info, wanted_classes=wanted_classes, node_ids=node_ids
+    )
+    submodule_data = get_module_subgraphs(
+        module_info, node_ids=node_ids, include_function_defs=include_function_defs
+    )
     non_trivial_edges = [
         e
         for e in edges
         if e[1]
-        not in low_level_functions  # we will keep the edge if the source has a low-level name because it could be defining something common for a class, otherwise we exclude edges with low-level target names to reduce clutter
+        not in render_state.low_level_names  # we will keep the edge if the source has a low-level name because it could be defining something common for a class, otherwise we exclude edges with low-level target names to reduce clutter
     ]
-    return generate_desc(non_trivial_edges, other_content=[class_data, submodule_data])
+    other_content = [class_data, submodule_data]
+    if node_metric is not None:
+        other_content.append(
+            get_metric_styles(module_info, non_trivial_edges, node_metric, node_ids)
+        )
+    return generate_desc(
+        non_trivial_edges,
+        other_content=other_content,
+        node_ids=node_ids,
+    )
 
 
-def generate_desc(import_graph_edges: list, other_content: list = None):
+def generate_desc(import_graph_edges: list, other_content: list = None, node_ids=None):
     """Generate a mermaid graph description from the import graph edges.
 
     Args:
         import_graph_edges (list): the import graph edges
         other_content (list, optional): a list of other content as strings to add to the graph description. Defaults to None.
+        node_ids (NodeIdInterner, optional): interner shared with the other content of
+        the render. Defaults to a new one.
 
     Returns:
         str: the mermaid graph description
@@ -139,34 +227,16 @@ def generate_desc(import_graph_edges: list, other_content: list = None):
     footer = "```"
     contents.append(header)
     contents.append(figure_type)
-    # TODO: this is no longer just module lookup, but a general node name lookup
-    module_lookup = {}
+    if node_ids is None:
+        node_ids = NodeIdInterner()
     for e in import_graph_edges:
-        if len(e) == 2:
-            s, t = e
-            s_name = module_lookup.get(s, "")
-            t_name = module_lookup.get(t, "")
-            if not s_name:
-                update_module_name_lookup(s, module_lookup)
-                s_name = module_lookup[s]
-            if not t_name:
-                update_module_name_lookup(t, module_lookup)
-                t_name = module_lookup[t]
+        s, t = e[:2]
+        s_name = node_ids.get_id(s)
+        t_name = node_ids.get_id(t)
+        if len(e) == 3 and e[2] != 1:
+            edge_line = f"\t{s_name}[{s}] -->|{e[2]}| {t_name}[{t}];"
+        else:
             edge_line = f"\t{s_name}[{s}] --> {t_name}[{t}];"
-        if len(e) == 3:
-            s, t, edge_data = e
-            s_name = module_lookup.get(s, "")
-            t_name = module_lookup.get(t, "")
-            if not s_name:
-                update_module_name_lookup(s, module_lookup)
-                s_name = module_lookup[s]
-            if not t_name:
-                update_module_name_lookup(t, module_lookup)
-                t_name = module_lookup[t]
-            if edge_data == 1:
-                edge_line = f"\t{s_name}[{s}] --> {t_name}[{t}];"
-            else:
-                edge_line = f"\t{s_name}[{s}] -->|{edge_data}| {t_name}[{t}];"
 
         contents.append(edge_line)
 
@@ -185,23 +255,31 @@ def get_subgraph_header(imported_module):
     Returns:
         str: the header for the subgraph description
     """
-    if imported_module.alias:
-        header = f"subgraph {imported_module.alias}"
+    aliases = imported_module.alias
+    if isinstance(aliases, list):
+        # merged imports of the same module have a list of aliases, shown as the title
+        header = f'subgraph {imported_module.module}["{", ".join(aliases)}"]'
+    elif aliases:
+        header = f"subgraph {aliases}"
     else:
         header = f"subgraph {imported_module.module}"
     return header
 
 
-def get_class_subgraphs(module, wanted_classes: list):
+def get_class_subgraphs(module, wanted_classes: list, node_ids=None):
     """Get the class subgraph descriptions for a module.
 
     Args:
         module (dict): the module info
         wanted_classes (list): a list of the names of the classes to include in the graph
+        node_ids (NodeIdInterner, optional): interner of the render. Defaults to a new
+        one.
 
     Returns:
         str: the class subgraph descriptions
     """
+    if node_ids is None:
+        node_ids = NodeIdInterner()
     class_list = module["class_list"]
     class_subgraphs = []
     for class_node in class_list:
@@ -213,8 +291,7 @@ def get_class_subgraphs(module, wanted_classes: list):
 
         class_subgraph_methods = []
         for method in class_node.methods:
-            node_id = f"{class_name}.{method.name}"
-            node_id = sanitize_node_id(node_id)
+            node_id = node_ids.get_id(f"{class_name}.{method.name}")
             class_subgraph_methods.append("\t" + node_id)
         methods = "\n".join(class_subgraph_methods)
         footer = "end"
@@ -222,60 +299,78 @@ def get_class_subgraphs(module, wanted_classes: list):
     return "\n".join(class_subgraphs)
 
 
-def get_module_subgraphs(module):
+def get_subgraph_calls(module: dict, include_function_defs: bool = True):
+    """Get the calls the imported module subgraphs are drawn from, those of the
+    module's top-level code and, when they are drawn, of its functions. Calls of
+    functions that are not drawn are never read, so lazily parsed ones stay unparsed.
+
+    Args:
+        module (dict): module info parsed with dep_parser
+        include_function_defs (bool, optional): the functions are drawn. Defaults to
+        True.
+
+    Returns:
+        list: CallNode list
+    """
+    call_list = list(module["call_list"] or [])
+    if include_function_defs:
+        call_list.extend(c for f in module["func_defs"] for c in f.calls)
+    return call_list
+
+
+def get_module_subgraphs(module, node_ids=None, include_function_defs: bool = True):
     """Get the module import subgraph descriptions for a module.
 
     Args:
         module (dict): module info parsed with dep_parser
+        node_ids (NodeIdInterner, optional): interner of the render. Defaults to a new
+        one.
+        include_function_defs (bool, optional): the module's functions are drawn, so
+        their calls go into the subgraphs too. Defaults to True.
 
     Returns:
         str: descriptions of the imported module subgraphs
     """
     module_subgraphs = []
-    collected = []
-    module_lookup = {}
+    if node_ids is None:
+        node_ids = NodeIdInterner()
     module_import_list = module["import_list"]
-    call_list = module["call_list"]
-    function_call_list = [c for f in module["func_defs"] for c in f.calls]
-    if not call_list:
-        call_list = []
-    if not function_call_list:
-        function_call_list = []
-    call_list.extend(function_call_list)
+    if not module_import_list:
+        return ""
+    call_list = get_subgraph_calls(module, include_function_defs)
+    # group the node names of the calls by their main module in one pass, instead of
+    # going over all calls for every import
+    nodes_by_main_module = {}
+    for call_index, c in enumerate(call_list):
+        c_module = c.module
+        # get the main module if using a submodule
+        if isinstance(c_module, list) and c_module:
+            c_main_module = c_module[0]
+        else:
+            c_main_module = c_module
+
+        # if there wasn't a module then we do not need this call for the module subgraph
+        if not c_main_module:
+            continue
+
+        module_name = ".".join(c_module)  # np.linalg
+        full_node_name = module_name + "." + c.name  # np.linalg.norm
+        node_name = node_ids.get_id(full_node_name)
+        main_module_nodes = nodes_by_main_module.setdefault(c_main_module, [])
+        main_module_nodes.append((call_index, node_name))
+
     for imported_module in module_import_list:
         header = get_subgraph_header(imported_module)
+        # check which calls belong to the module we are inspecting
         functions = []
-        for c in call_list:
-            if c in collected:
-                continue
-            # collected.append(c)  # need to handle this better
-            c_module = c.module
-            # get the main module if using a submodule
-            if isinstance(c_module, list) and c_module:
-                c_main_module = c_module[0]
-            else:
-                c_main_module = c_module
-
-            # if there wasn't a module then we do not need this call for the module subgraph
-            if not c_main_module:
-                continue
-
-            module_name = ".".join(c_module)  # np.linalg
-            full_node_name = module_name + "." + c.name  # np.linalg.norm
-            node_name = module_lookup.get(full_node_name, "")
-            if not node_name:
-                update_module_name_lookup(full_node_name, module_lookup)
-                node_name = module_lookup[full_node_name]
-
-            # check if this call belongs to the module we are inspecting
-            if (
-                c_main_module == imported_module.module
-                or c_main_module == imported_module.alias
-            ):
-                functions.append(node_name)
-
-        # adding indentation
-        functions = ["\t" + f for f in set(functions)]
+        aliases = imported_module.alias
+        # merged imports of the same module, e.g. `import numpy as np` and `import numpy
+        # as npy`, have a list of aliases
+        aliases = [aliases] if isinstance(aliases, str) else aliases or []
+        for main_module in dict.fromkeys([imported_module.module, *aliases]):
+            functions.extend(nodes_by_main_module.get(main_module, []))
+        # adding indentation, in call order without repeats
+        functions = ["\t" + f for f in dict.fromkeys(f for _, f in sorted(functions))]
 
         footer = "end"
         # only include the submodule description if it had functions!
@@ -283,3 +378,211 @@ def get_module_subgraphs(module):
             module_subgraphs.append("\n".join([header, *functions, footer]))
     return "\n".join(module_subgraphs)
 
+
+# fill and font size of each metric bucket, from the smallest values to the largest
+metric_bucket_styles = [
+    "fill:#f6f8fa,font-size:12px",
+    "fill:#ddf4ff,font-size:14px",
+    "fill:#80ccff,font-size:16px",
+    "fill:#218bff,color:#ffffff,font-size:19px",
+    "fill:#0550ae,color:#ffffff,font-size:22px",
+]
+
+
+def get_definition_metrics(module: dict, metric: str, node_names=None):
+    """Get a metric of the functions and methods of a module, by graph node name.
+
+    Args:
+        module (dict): module info parsed with dep_parser
+        metric (str): `DefinitionMetrics` field
+        node_names (set, optional): only get the metric of the definitions with these
+        node names, so lazily parsed ones that are not drawn stay unparsed. Defaults to
+        all definitions.
+
+    Returns:
+        dict: node name to metric value
+    """
+    definitions = list(module["func_defs"])
+    for class_node in module["class_list"]:
+        definitions.extend(class_node.methods)
+    if node_names is not None:
+        definitions = [f for f in definitions if get_func_def_name(f) in node_names]
+    return {
+        get_func_def_name(f): getattr(f.metrics, metric)
+        for f in definitions
+        if f.metrics is not None
+    }
+
+
+def get_metric_styles(module: dict, edges: list, metric: str, node_ids):
+    """Style the drawn functions and methods of a module by a metric, in buckets of
+    equal width from zero to the largest value.
+
+    Args:
+        module (dict): module info parsed with dep_parser
+        edges (list): drawn edges
+        metric (str): `DefinitionMetrics` field
+        node_ids (NodeIdInterner): interner of the render
+
+    Returns:
+        str: class definitions and assignments of the metric buckets
+    """
+    drawn_nodes = set(n for e in edges for n in e[:2])
+    values = get_definition_metrics(module, metric, node_names=drawn_nodes)
+    if not values:
+        return ""
+    max_value = max(values.values()) or 1
+    last_bucket = len(metric_bucket_styles) - 1
+    bucket_ids = {}
+    for name, value in values.items():
+        bucket = min(last_bucket, math.ceil(value / max_value * last_bucket))
+        bucket_ids.setdefault(bucket, set()).add(node_ids.get_id(name))
+    styles = []
+    for bucket, ids in sorted(bucket_ids.items()):
+        styles.append(f"\tclassDef {metric}{bucket} {metric_bucket_styles[bucket]};")
+        styles.append(f"\tclass {','.join(sorted(ids))} {metric}{bucket};")
+    return "\n".join(styles)
+
+
+diff_link_styles = {
+    "added": "stroke:#2da44e,stroke-width:2px",
+    "removed": "stroke:#cf222e,stroke-width:2px,stroke-dasharray:4",
+    "reweighted": "stroke:#bf8700,stroke-width:2px",
+}
+
+
+def create_diff_graph_description(module_diff, include_unchanged: bool = False):
+    """Create a mermaid graph description highlighting how a module's call graph
+    changed. Added edges are green, removed edges are dashed red and edges whose call
+    count changed are amber with an `old→new` label.
+
+    Args:
+        module_diff (ModuleGraphDiff): diff created with `graph_diff.diff_module_graphs`
+        include_unchanged (bool, optional): also draw the unchanged edges for context.
+        Defaults to False.
+
+    Returns:
+        str: the mermaid graph description
+    """
+    edges = []
+    edge_kinds = []
+    for kind in ["added", "removed"]:
+        for s, t, weight in getattr(module_diff, kind):
+            edges.append((s, t, weight))
+            edge_kinds.append(kind)
+    for s, t, old_weight, new_weight in module_diff.reweighted:
+        edges.append((s, t, f"{old_weight}→{new_weight}"))
+        edge_kinds.append("reweighted")
+    if include_unchanged:
+        for edge in module_diff.unchanged:
+            edges.append(edge)
+            edge_kinds.append("unchanged")
+
+    kept = [
+        (e, kind)
+        for e, kind in zip(edges, edge_kinds)
+        if e[1] not in low_level_functions
+    ]
+    link_styles = []
+    for kind, style in diff_link_styles.items():
+        # mermaid styles links by their position in the description
+        link_ids = [str(i) for i, (_, k) in enumerate(kept) if k == kind]
+        if link_ids:
+            link_styles.append(f"\tlinkStyle {','.join(link_ids)} {style};")
+    return generate_desc([e for e, _ in kept], other_content=link_styles)
+
+
+hot_link_style = "stroke:#cf222e,stroke-width:3px"
+hot_node_style = "fill:#ffb3b3,stroke:#cf222e"
+
+
+def create_profile_graph_description(
+    profiled_edges: list,
+    overlay,
+    module_name: str = None,
+    hot_fraction: float = 0.1,
+    cold_fraction: float = 0.001,
+):
+    """Create a mermaid graph description of the static call graph weighted with
+    profile data. Edges that never ran or took less than `cold_fraction` of the total
+    time are pruned, and edges and nodes above `hot_fraction` are highlighted.
+
+    Args:
+        profiled_edges (list): edges from `profile_overlay.create_profiled_call_edges`
+        overlay (ProfileOverlay): overlay from `profile_overlay.create_profile_overlay`
+        module_name (str, optional): only draw calls made from this module. Defaults to
+        None.
+        hot_fraction (float, optional): fraction of the total time that makes an edge or
+        node hot. Defaults to 0.1.
+        cold_fraction (float, optional): fraction of the total time below which edges
+        are pruned. Defaults to 0.001.
+
+    Returns:
+        str: the mermaid graph description
+    """
+    total_time = overlay.total_time or 1.0
+    edges = []
+    hot_links = []
+    for s, t, _, edge_stats in profiled_edges:
+        if edge_stats is None or t in low_level_functions:
+            continue
+        if module_name is not None and not s.startswith(module_name + "."):
+            continue
+        if edge_stats.cumulative_time < cold_fraction * total_time:
+            continue
+        if edge_stats.cumulative_time >= hot_fraction * total_time:
+            hot_links.append(str(len(edges)))
+        label = f"{edge_stats.calls}× {edge_stats.cumulative_time:.3g}s"
+        edges.append((s, t, label))
+
+    drawn_nodes = set(n for s, t, _ in edges for n in [s, t])
+    node_ids = NodeIdInterner()
+    hot_nodes = [
+        node_ids.get_id(name)
+        for name, node_stats in overlay.nodes.items()
+        if name in drawn_nodes and node_stats.self_time >= hot_fraction * total_time
+    ]
+    other_content = []
+    if hot_links:
+        other_content.append(f"\tlinkStyle {','.join(hot_links)} {hot_link_style};")
+    if hot_nodes:
+        other_content.append(f"\tclassDef hot {hot_node_style};")
+        other_content.append(f"\tclass {','.join(sorted(set(hot_nodes)))} hot;")
+    return generate_desc(edges, other_content=other_content, node_ids=node_ids)
+
+
+traced_link_styles = {
+    "dynamic": "stroke:#0969da,stroke-width:2px,stroke-dasharray:4",
+    "static": "stroke:#8c959f",
+}
+
+
+def create_traced_graph_description(merged_edges: list, module_name: str = None):
+    """Create a mermaid graph description of the static call graph merged with traced
+    runtime edges. Edges only seen at runtime are dashed blue, edges never seen at
+    runtime are grey and edges seen in both are drawn normally with their traced count.
+
+    Args:
+        merged_edges (list): edges from `runtime_tracer.merge_traced_edges`
+        module_name (str, optional): only draw calls made from this module. Defaults to
+        None.
+
+    Returns:
+        str: the mermaid graph description
+    """
+    edges = []
+    link_ids = {kind: [] for kind in traced_link_styles}
+    for s, t, static_weight, dynamic_weight, label in merged_edges:
+        if t in low_level_functions:
+            continue
+        if module_name is not None and not s.startswith(module_name + "."):
+            continue
+        if label in link_ids:
+            link_ids[label].append(str(len(edges)))
+        edges.append((s, t, dynamic_weight or static_weight))
+    link_styles = [
+        f"\tlinkStyle {','.join(ids)} {traced_link_styles[kind]};"
+        for kind, ids in link_ids.items()
+        if ids
+    ]
+    return generate_desc(edges, other_content=link_styles)